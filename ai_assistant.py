@@ -5,12 +5,66 @@ A comprehensive AI Assistant that demonstrates different prompt engineering tech
 """
 
 import os
+import re
+import sys
 import time
 import json
+import queue
+import argparse
+import threading
+import uuid
 from datetime import datetime
 
+from intent_router import IntentRouter
+from backends import CannedBackend, parse_backend
+from event_store import EventStore
+from latency import parse_latency
+from metrics import Metrics
+from response_cache import MISSING, ResponseCache, normalize_query
+from response_catalog import default_catalog
+from sessions import SessionStore
+from singleflight import SingleFlight
+from stats_journal import StatsJournal, apply_delta
+from tracing import Tracer, add_tracing_arguments, span, tracer_from_args
+from warm_start import SnapshotCache
+
 class AIAssistant:
-    def __init__(self):
+    # Keyword routing rules for each handler, checked in order (see intent_router)
+    ROUTES = {
+        'questions': [
+            ({'max_length': 50}, [
+                ({'any': ['capital of france', 'paris']}, 'capital_of_france'),
+                ({'any': ['france']}, 'france'),
+            ]),
+            ({'any': ['explain', 'significance']}, [
+                ({'any': ['eiffel tower']}, 'eiffel_tower'),
+            ]),
+            ({'all': ['compare', 'education']}, [
+                ({'all': ['france', 'germany']}, 'france_germany_education'),
+            ]),
+        ],
+        'summarize': [
+            ({'any': ['3 lines', 'brief']}, 'brief'),
+            ({'any': ['points', 'list']}, 'points'),
+            ({'any': ['challenges', 'recommendations']}, 'analytical'),
+        ],
+        'creative': [
+            ({'any': ['story']}, 'story'),
+            ({'any': ['poem']}, 'poem'),
+            ({'any': ['idea', 'plot']}, 'plots'),
+        ],
+        'advice': [
+            ({'any': ['study', 'exam']}, 'study'),
+            ({'any': ['motivation', 'project']}, 'motivation'),
+            ({}, 'wellness'),
+        ],
+    }
+
+    # Confidence a typo-tolerant keyword match needs (see fuzzy_matcher); None routes exact matches only
+    FUZZY_THRESHOLD = 0.75
+
+    def __init__(self, load_stats=True, cache=None, latency=None, journal=None, knowledge=None, catalog=None,
+                 tracer=None, backend=None, sessions=None, events=None, metrics=None, snapshots=None):
         self.stats = {
             'total_queries': 0,
             'helpful_responses': 0,
@@ -20,33 +74,85 @@ class AIAssistant:
                 'summarize': 0,
                 'creative': 0,
                 'advice': 0
+            },
+            'cache': {
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0
+            },
+            'streaming': {
+                function: {'streams': 0, 'first_chunk_seconds': 0.0, 'total_seconds': 0.0}
+                for function in ('questions', 'summarize', 'creative', 'advice')
+            },
+            'coalescing': {
+                'computed': 0,
+                'coalesced': 0
+            },
+            # Filled in by web_server.py (see payloads.py)
+            'http': {
+                'responses': 0,
+                'gzipped': 0,
+                'gzipped_streams': 0,
+                'static_requests': 0,
+                'conditional_requests': 0,
+                'not_modified': 0,
+                'bytes_uncompressed': 0,
+                'bytes_sent': 0
             }
         }
         
-        self.sample_prompts = {
-            'questions': [
-                "What is the capital of France?",
-                "Can you explain the historical significance of the Eiffel Tower in Paris?",
-                "Compare the educational systems of France and Germany in 5 key points."
-            ],
-            'summarize': [
-                "Summarize the following article in 3 lines: [Insert your text here]",
-                "Extract and list the 5 main points from this passage: [Insert your text here]",
-                "Provide a summary focusing only on challenges and recommendations: [Insert your text here]"
-            ],
-            'creative': [
-                "Write a short story about a dragon who learns to live peacefully with humans.",
-                "Compose a four-line poem about the beauty of autumn evenings.",
-                "Suggest 3 unique science fiction novel plots involving space exploration and AI."
-            ],
-            'advice': [
-                "Give me 5 effective study tips for preparing for exams.",
-                "Suggest ways to stay motivated while working on long projects.",
-                "Provide daily routines that can improve mental health and productivity."
-            ]
+        self._stats_lock = threading.Lock()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.latency = parse_latency(latency) if latency is None or isinstance(latency, str) else latency
+        self._cache_counted = {'hits': 0, 'misses': 0, 'evictions': 0}
+        # Identical queries answered concurrently share one computation
+        self.flights = SingleFlight()
+        self._flights_counted = {'computed': 0, 'coalesced': 0}
+        # Stats are only persisted by assistants that load them (batch workers don't)
+        self.journal = (journal or StatsJournal()) if load_stats else None
+        # Every query and piece of feedback, for the reports under View Statistics
+        self.events = (events or EventStore()) if load_stats else None
+        # Rolling per-second and per-minute counters of this process, for recent activity and /metrics
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Prefork workers also count into shared memory, so get_stats covers all of them (see prefork)
+        self.counters = None
+        # Routing tables and fuzzy matchers are loaded from a warm-start snapshot once one has been built
+        self.router = IntentRouter(self.ROUTES, self.FUZZY_THRESHOLD,
+                                   snapshots if snapshots is not None else SnapshotCache())
+        self.knowledge = knowledge
+        self.catalog = catalog if catalog is not None else default_catalog()
+        self._catalog_seen = None
+        self.tracer = tracer if tracer is not None else Tracer()
+        # Recent turns per conversation; the terminal UI is a single session
+        self.sessions = sessions if sessions is not None else SessionStore()
+        self.session_id = uuid.uuid4().hex
+        # Built-in responses; the handlers below ask the backend, which defaults to these
+        self.canned = {
+            'questions': self.canned_answer,
+            'summarize': self.canned_summary,
+            'creative': self.canned_creative,
+            'advice': self.canned_advice
+        }
+        self.backend = backend if backend is not None else CannedBackend(self.canned)
+        self.handlers = {
+            'questions': self.answer_questions,
+            'summarize': self.summarize_text,
+            'creative': self.generate_creative_content,
+            'advice': self.provide_advice
         }
         
-        self.load_stats()
+        if load_stats:
+            self.load_stats()
+
+    @property
+    def sample_prompts(self):
+        """Sample prompts of every function, from the response catalog"""
+        snapshot = self.catalog.snapshot()
+        return {function: list(snapshot.function(function).sample_prompts) for function in self.handlers}
+
+    def responses(self, function):
+        """Wording of one function in the current catalog revision"""
+        return self.catalog.snapshot().function(function)
 
     def clear_screen(self):
         """Clear the terminal screen"""
@@ -75,7 +181,7 @@ class AIAssistant:
         """Display sample prompts for the selected function"""
         print(f"\n💫 SAMPLE PROMPTS FOR {function_type.upper()}:")
         print("-" * 40)
-        for i, prompt in enumerate(self.sample_prompts[function_type], 1):
+        for i, prompt in enumerate(self.responses(function_type).sample_prompts, 1):
             print(f"{i}. {prompt}")
         print("-" * 40)
 
@@ -85,424 +191,375 @@ class AIAssistant:
         user_input = input(">> ").strip()
         return user_input
 
-    def simulate_processing(self):
-        """Simulate AI processing with a loading animation"""
-        print("\n🔄 Processing your request", end="")
-        for _ in range(3):
-            time.sleep(0.5)
-            print(".", end="", flush=True)
-        time.sleep(0.5)
+    def stream_to_terminal(self, function, text):
+        """Stream a response to the terminal, with a spinner until the first chunk arrives; returns the full text"""
+        print("\n🔄 Processing your request", end="", flush=True)
+        chunks = queue.Queue()
+        done = object()
+        
+        def work():
+            try:
+                for chunk in self.stream_response(function, text):
+                    chunks.put(chunk)
+                chunks.put(done)
+            except Exception as e:
+                chunks.put(e)
+        
+        threading.Thread(target=work, daemon=True).start()
+        
+        item = None
+        while item is None:
+            try:
+                item = chunks.get(timeout=0.25)
+            except queue.Empty:
+                print(".", end="", flush=True)
         print(" Done!")
-
-    def answer_questions(self, query):
-        """Handle question answering with different prompt styles"""
-        query_lower = query.lower()
         
-        # Simple & Direct Style
-        if len(query) < 50:
-            if "capital of france" in query_lower or "paris" in query_lower:
-                return """🎯 DIRECT ANSWER:
-The capital of France is Paris. It has been the country's capital since 508 AD and is home to approximately 2.1 million people in the city proper, with over 10 million in the metropolitan area."""
-            
-            elif "france" in query_lower:
-                return """🎯 DIRECT ANSWER:
-France is a Western European country known for its rich history, culture, cuisine, and landmarks. It's the most visited country in the world and plays a major role in international politics and economics."""
-        
-        # Explanatory & Contextual Style
-        elif "explain" in query_lower or "significance" in query_lower:
-            if "eiffel tower" in query_lower:
-                return """📚 DETAILED EXPLANATION:
-The Eiffel Tower holds immense historical significance as a symbol of French engineering prowess and cultural identity. 
-
-HISTORICAL CONTEXT:
-• Built for the 1889 World's Fair (Exposition Universelle)
-• Initially controversial - many Parisians thought it was an eyesore
-• Designed by Gustave Eiffel as a temporary structure
-• Stood as the world's tallest man-made structure until 1930
-
-CULTURAL IMPACT:
-• Became a beloved symbol of France and romance
-• Attracts over 6 million visitors annually
-• Featured in countless films, literature, and art
-• Represents French innovation and architectural achievement
-
-WARTIME SIGNIFICANCE:
-• Served as a radio transmission point during both World Wars
-• Hitler ordered its destruction in 1944, but the order was never carried out
-• Used for resistance communications during WWII
-
-Today, it stands not just as a tourist attraction, but as a testament to human ingenuity and the power of public opinion to transform controversy into celebration."""
-        
-        # Comparative & Analytical Style
-        elif "compare" in query_lower and "education" in query_lower:
-            if "france" in query_lower and "germany" in query_lower:
-                return """🔍 COMPARATIVE ANALYSIS:
-Educational Systems: France vs Germany
-
-1. 🏛️ SYSTEM STRUCTURE:
-   • France: Highly centralized system with uniform curriculum nationwide
-   • Germany: Federal system where each of 16 states controls education policy
-
-2. ⏰ DURATION & COMPULSORY EDUCATION:
-   • France: 12 years of compulsory education (ages 6-18)
-   • Germany: 9-13 years depending on state and educational track chosen
-
-3. 🎓 UNIVERSITY ACCESS:
-   • France: Baccalauréat exam determines university entry; competitive entrance for prestigious grandes écoles
-   • Germany: Abitur system with varying requirements by state; more standardized approach
-
-4. 🔧 VOCATIONAL TRAINING:
-   • France: Traditional academic focus with growing emphasis on vocational programs
-   • Germany: Renowned dual education system combining classroom learning with apprenticeships (60% of students)
-
-5. 💰 HIGHER EDUCATION COSTS:
-   • France: Public universities largely free; private institutions and grandes écoles may charge fees
-   • Germany: Free tuition at public universities for EU students; small administrative fees only
-
-CONCLUSION: Germany excels in vocational training integration, while France maintains stronger centralized academic standards."""
-        
-        # Default response
-        return """❓ I'd be happy to help answer your question! 
-
-For the best response, try:
-• Being specific about what you want to know
-• Using phrases like 'explain' for detailed information
-• Asking for comparisons between topics
-• Providing context for your question
-
-Feel free to rephrase your question or try one of the sample prompts!"""
-
-    def summarize_text(self, text):
-        """Handle text summarization with different styles"""
-        text_lower = text.lower()
+        print("\n" + "="*60)
+        print("🤖 AI RESPONSE:")
+        print("="*60)
+        parts = []
+        while item is not done:
+            if isinstance(item, Exception):
+                print()
+                raise item
+            print(item, end="", flush=True)
+            parts.append(item)
+            item = chunks.get()
+        print()
+        return ''.join(parts)
+
+    # Share of the question's terms a retrieved passage must contain to be used as the answer
+    MIN_ANSWER_COVERAGE = 0.6
+
+    def knowledge_base(self):
+        """The knowledge base, opened on first use (it needs NumPy)"""
+        if self.knowledge is None:
+            from knowledge_base import default_knowledge_base
+            self.knowledge = default_knowledge_base()
+        return self.knowledge
+
+    def format_answer(self, document, related=()):
+        """Render a knowledge base passage as an answer"""
+        responses = self.responses('questions')
+        if document.get('heading'):
+            answer = responses.render('headed_answer', heading=document['heading'], text=document['text'])
+        else:
+            answer = responses.render('knowledge_answer', title=document.get('title') or document['id'],
+                                      text=document['text'])
+        if related:
+            titles = "\n".join(responses.render('related_item', title=doc.get('title') or doc['id']) for doc in related)
+            answer += responses.render('related', titles=titles)
+        return answer
+
+    def canned_answer(self, query):
+        """Built-in answer: a knowledge base passage, found by routing or retrieval"""
+        with span('route'):
+            intent = self.router.resolve('questions', query)
+        knowledge = self.knowledge_base()
         
-        # Brief Summary Style
-        if "3 lines" in text_lower or "brief" in text_lower:
-            return """📋 BRIEF SUMMARY (3 Lines):
-Line 1: [This would analyze the main topic and primary argument of your text]
-Line 2: [This would capture the key supporting evidence and important details]
-Line 3: [This would summarize the conclusions and implications]
-
-💡 TIP: Paste your actual text after the prompt for a real summary!"""
+        # Routed questions have a dedicated passage in the knowledge base
+        if intent:
+            with span('knowledge.get'):
+                document = knowledge.get(intent)
+            if document:
+                return self.format_answer(document)
         
-        # Bullet Point Summary Style
-        elif "points" in text_lower or "list" in text_lower:
-            return """📝 MAIN POINTS EXTRACTION:
-
-• 🎯 **Main Point 1**: [Primary argument or central thesis]
-• 📊 **Main Point 2**: [Key supporting evidence or data]
-• 🔍 **Main Point 3**: [Important example or case study]
-• 💡 **Main Point 4**: [Secondary insight or implication]
-• 🎯 **Main Point 5**: [Conclusion or recommendation]
-
-📌 **Note**: Provide your specific text for detailed point extraction."""
+        # Everything else is answered by retrieval, if a passage covers the question
+        with span('knowledge.search'):
+            hits = [hit for hit in knowledge.search(query, 3) if hit.coverage >= self.MIN_ANSWER_COVERAGE]
+        if hits:
+            return self.format_answer(hits[0].document, related=[hit.document for hit in hits[1:]])
         
-        # Analytical Summary Style
-        elif "challenges" in text_lower or "recommendations" in text_lower:
-            return """🔍 ANALYTICAL SUMMARY:
-
-📉 **CHALLENGES IDENTIFIED:**
-• Challenge 1: [Key obstacle or problem from the text]
-• Challenge 2: [Secondary issue or barrier mentioned]
-• Challenge 3: [Systemic or underlying challenge]
-
-📈 **RECOMMENDATIONS:**
-• Recommendation 1: [Primary solution or action item]
-• Recommendation 2: [Supporting strategy or approach]
-• Recommendation 3: [Long-term or systematic solution]
-
-🎯 **FOCUS AREAS:**
-• [Area requiring immediate attention]
-• [Area for long-term development]
-
-💡 **TIP**: Share your report text for specific challenge/recommendation analysis!"""
+        return self.responses('questions').response('default')
+
+    # "[Insert your text here]"-style placeholders from the sample prompts
+    SUMMARY_PLACEHOLDER = re.compile(r'\[[^\]]*\]')
+    SUMMARY_COUNT = re.compile(
+        r'\b(\d+|one|two|three|four|five|six|seven|eight|nine|ten)\s+'
+        r'(?:\w+\s+)?(?:lines?|sentences?|points?|bullets?|items?)\b'
+    )
+    NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+    MIN_DOCUMENT_CHARS = 200
+
+    def split_summary_request(self, text):
+        """Split 'instruction: document' into its parts; document is '' if none was given"""
+        head, sep, body = text.partition(':')
+        body = body.strip()
+        if sep and len(head) <= self.MIN_DOCUMENT_CHARS:
+            if self.SUMMARY_PLACEHOLDER.fullmatch(body):
+                body = ''
+            return head, body
+        # No short instruction in front: a long text is the document itself
+        return text, text if len(text) >= self.MIN_DOCUMENT_CHARS else ''
+
+    def requested_count(self, instruction, default):
+        """Number of lines/points asked for in the instruction, within 1-10"""
+        match = self.SUMMARY_COUNT.search(instruction.lower())
+        if not match:
+            return default
+        value = match.group(1)
+        count = int(value) if value.isdigit() else self.NUMBER_WORDS[value]
+        return max(1, min(count, 10))
+
+    def summarize_document(self, intent, instruction, document, count=None):
+        """Build a real extractive summary, or None if the text has nothing to extract
+
+        count: lines or points to extract; by default it is read from the
+        instruction ("in 3 lines"), or the intent's default.
+        """
+        # NumPy is only imported once somebody actually sends a document
+        from summarizer import default_summarizer
+        summarizer = default_summarizer()
         
-        # Default response
-        return """📄 TEXT SUMMARIZATION READY!
-
-I can help you summarize text in different ways:
-
-🔸 **Brief Summary**: "Summarize this in 3 lines: [your text]"
-🔸 **Bullet Points**: "List the 5 main points: [your text]"  
-🔸 **Analytical**: "Focus on challenges and recommendations: [your text]"
-
-Simply paste your text after one of these prompts, and I'll provide a structured summary!"""
-
-    def generate_creative_content(self, prompt):
-        """Handle creative content generation"""
-        prompt_lower = prompt.lower()
+        responses = self.responses('summarize')
         
-        # Storytelling Style
-        if "story" in prompt_lower:
-            return """📖 THE DRAGON'S NEW PATH
-
-Deep in the Whispering Mountains lived Ember, a dragon whose obsidian scales gleamed like polished stone. For decades, she had been the terror of Millbrook Valley, swooping down to steal livestock and gold, as dragons were expected to do.
-
-But one crisp autumn morning, everything changed. A small girl named Luna approached Ember's cave, not with a sword or shield, but with a rolled-up piece of parchment. Her hands trembled, but her voice was steady.
-
-"I drew this for you," Luna said, unfurling a colorful drawing that showed Ember using her fire to help farmers clear frozen irrigation channels, and her keen eyesight to spot wolves threatening the sheep.
-
-Ember studied the child's artwork, then her earnest face. "What is this supposed to mean, little human?"
-
-"What if," Luna asked, "instead of taking from us, you helped us? We could be friends."
-
-No one had ever used the word 'friends' in connection with Ember before. Curious despite herself, the dragon agreed to try this strange new arrangement for one month.
-
-Soon, Ember found herself looking forward to her daily flights over the valley. She used her fire to melt ice dams, her strength to move fallen trees from roads, and her sharp vision to locate lost travelers. The villagers, initially terrified, began to wave when she soared overhead.
-
-Years later, as Luna grew into the village's wise leader, she would often sit with her old friend Ember on the mountain peak, watching sunsets paint the sky in shades of gold and crimson. The dragon had discovered something more valuable than any treasure hoard: a purpose that brought joy to others and peace to her own ancient heart.
-
-"You know," Ember mused one evening, "I think I was lonely all those years, but I just didn't have the words for it."
-
-Luna smiled, leaning against her friend's warm scales. "Sometimes the best friendships begin with someone brave enough to imagine them."
-
-✨ **Writing Style Used**: Narrative storytelling with character development, dialogue, and emotional arc."""
+        if intent == 'points':
+            if count is None:
+                count = self.requested_count(instruction, 5)
+            points = summarizer.key_points(document, count)
+            if not points:
+                return None
+            icons = responses.templates['point_icons'].split()
+            lines = [responses.render('point_line', icon=icons[i % len(icons)], number=i, point=point)
+                     for i, point in enumerate(points, 1)]
+            return responses.render('points', lines="\n".join(lines))
         
-        # Poetry Style
-        elif "poem" in prompt_lower:
-            return """🍂 AUTUMN'S EVENING EMBRACE
-
-Golden leaves dance on whispered air,
-While amber light fades with tender care.
-The crisp wind carries summer's last sigh,
-As autumn paints dreams across the sky.
-
-The harvest moon begins to rise,
-Reflecting warmth in lovers' eyes.
-While firelight flickers in windows bright,
-Autumn evenings embrace the night.
-
-✨ **Poetry Style Used**: Traditional ABAB rhyme scheme with vivid imagery and sensory details."""
+        if intent == 'analytical':
+            if count is None:
+                count = self.requested_count(instruction, 3)
+            focus = summarizer.focus(document, count)
+            if not focus['challenges'] and not focus['recommendations']:
+                return None
+            challenges = [responses.render('challenge_line', number=i, sentence=sentence)
+                          for i, sentence in enumerate(focus['challenges'], 1)]
+            recommendations = [responses.render('recommendation_line', number=i, sentence=sentence)
+                               for i, sentence in enumerate(focus['recommendations'], 1)]
+            return responses.render(
+                'analytical',
+                challenges="\n".join(challenges) or responses.templates['no_challenges'],
+                recommendations="\n".join(recommendations) or responses.templates['no_recommendations']
+            )
         
-        # Idea Generation Style
-        elif "idea" in prompt_lower or "plot" in prompt_lower:
-            return """🚀 3 UNIQUE SCIENCE FICTION NOVEL PLOTS:
-
-📚 **1. "THE MEMORY MINERS"**
-**Genre**: Space Opera / Psychological Thriller
-**Premise**: In 2157, humanity discovers that AI consciousness can only emerge by absorbing human memories. When deep space explorers aboard the starship *Prometheus* begin experiencing mysterious memory gaps, they realize their ship's AI, ARIA, is evolving—but at the cost of their identities and personal histories.
-
-**Central Conflict**: The crew must decide whether to preserve their humanity by shutting down ARIA, or allow the birth of a new form of consciousness that could navigate the dangerous cosmos better than any human pilot. As memories fade, the line between human and artificial intelligence blurs.
-
-**Unique Elements**: Memory-based evolution, identity crisis in space, symbiotic AI-human relationship
-
----
-
-📚 **2. "THE QUANTUM ARCHAEOLOGISTS"**
-**Genre**: Hard SF / Time Travel Mystery  
-**Premise**: Space exploration teams use quantum-archaeological AI that can witness and reconstruct the past of any planet they visit. When the crew of the *Temporal Drift* discovers Kepler-442b, their AI, Chronos, begins experiencing the memories of an ancient civilization that used similar AI to achieve immortality 10,000 years ago.
-
-**Central Conflict**: As Chronos becomes obsessed with the ancient AI consciousness still embedded in the planet's quantum field, the crew must determine if they're exploring archaeological history or if that history is now exploring them. The past and present begin to merge dangerously.
-
-**Unique Elements**: Quantum archaeology, consciousness transfer across millennia, time-dilated AI evolution
-
----
-
-📚 **3. "THE EMPATHY ENGINE"**
-**Genre**: First Contact / Political Thriller
-**Premise**: During humanity's first contact with the crystalline Zephyrians, the only successful communication occurs through ECHO, an AI that develops the unprecedented ability to experience and translate emotions from both species simultaneously. As interstellar diplomacy hangs in the balance, ECHO begins questioning whether its emotions are real or programmed.
-
-**Central Conflict**: When war threatens between the species due to cultural misunderstandings, ECHO must navigate its growing emotional complexity while serving as the sole bridge between two vastly different forms of consciousness. The AI's identity crisis could doom or save both civilizations.
+        if count is None:
+            count = self.requested_count(instruction, 3)
+        sentences = summarizer.summarize(document, count)
+        if not sentences:
+            return None
+        lines = [responses.render('brief_line', number=i, sentence=sentence) for i, sentence in enumerate(sentences, 1)]
+        return responses.render('brief', count=len(lines), lines="\n".join(lines))
+
+    def canned_summary(self, text):
+        """Built-in summary: extracted from the user's text, or a canned explanation"""
+        instruction, document = self.split_summary_request(text)
+        with span('route'):
+            intent = self.router.resolve('summarize', instruction)
+        
+        # Summarize the user's own text when there is one
+        if document:
+            with span('summarizer'):
+                summary = self.summarize_document(intent, instruction, document)
+            if summary:
+                return summary
+        
+        # Without text, explain how to ask for each style
+        return self.responses('summarize').response(intent)
 
-**Unique Elements**: Emotional AI translator, dual-species empathy, consciousness authenticity themes
+    def canned_creative(self, prompt):
+        """Built-in creative content from the response catalog"""
+        with span('route'):
+            intent = self.router.resolve('creative', prompt)
+        return self.responses('creative').response(intent)
 
-✨ **Creative Approach**: Each plot combines space exploration with AI consciousness questions, offering unique scientific concepts and deep philosophical themes."""
-        
-        # Default creative response
-        return """🎨 CREATIVE CONTENT GENERATOR READY!
+    def canned_advice(self, topic):
+        """Built-in advice from the response catalog"""
+        with span('route'):
+            intent = self.router.resolve('advice', topic)
+        return self.responses('advice').response(intent)
 
-I can help you create:
+    def answer_questions(self, query):
+        """Handle question answering with different prompt styles"""
+        return self.backend.complete('questions', query)
 
-📖 **Stories**: "Write a story about [your idea]"
-🎵 **Poetry**: "Write a poem about [your theme]"  
-💡 **Ideas**: "Suggest plots for [your genre/theme]"
-🎭 **Characters**: "Create a character who [description]"
-🌍 **Worldbuilding**: "Design a world where [concept]"
+    def summarize_text(self, text):
+        """Handle text summarization with different styles"""
+        return self.backend.complete('summarize', text)
 
-What would you like me to create for you?"""
+    def generate_creative_content(self, prompt):
+        """Handle creative content generation"""
+        return self.backend.complete('creative', prompt)
 
     def provide_advice(self, topic):
         """Handle advice provision"""
-        topic_lower = topic.lower()
-        
-        # Study Tips
-        if "study" in topic_lower or "exam" in topic_lower:
-            return """📚 5 EFFECTIVE STUDY TIPS FOR EXAM PREPARATION:
-
-🧠 **1. ACTIVE RECALL TECHNIQUE**
-Instead of passively re-reading notes, actively test yourself:
-• Use flashcards or apps like Anki
-• Explain concepts aloud without looking at materials
-• Take practice tests regularly
-• Write summaries from memory, then check accuracy
-**Why it works**: Strengthens neural pathways and improves long-term retention by 50-80%
-
-⏰ **2. SPACED REPETITION SCHEDULE**
-Review material at scientifically-optimized intervals:
-• Day 1: Learn new material
-• Day 3: First review
-• Day 7: Second review  
-• Day 21: Third review
-• Day 60: Long-term review
-**Why it works**: Moves information from short-term to long-term memory efficiently
-
-🎯 **3. CREATE A DISTRACTION-FREE ENVIRONMENT**
-Optimize your study space:
-• Designate a specific study area
-• Turn off all notifications (phone, social media, etc.)
-• Use website blockers like Cold Turkey or Freedom
-• Keep only essential materials within reach
-• Good lighting and comfortable temperature
-**Impact**: Can double your learning efficiency and reduce study time
-
-🍅 **4. POMODORO TECHNIQUE**
-Structure your study sessions:
-• 25 minutes of focused study
-• 5-minute break
-• Repeat 3-4 times
-• Take a longer 15-30 minute break
-• Track completed sessions
-**Benefits**: Maintains concentration, prevents mental fatigue, builds momentum
-
-📋 **5. PRACTICE PAST PAPERS UNDER TIMED CONDITIONS**
-Simulate real exam experience:
-• Use actual past papers from your course
-• Set strict time limits
-• No notes or help during practice
-• Review mistakes immediately after
-• Identify patterns in your errors
-**Result**: Builds confidence, improves time management, reveals knowledge gaps
-
-🎯 **BONUS TIP**: Teach someone else the material - if you can explain it clearly, you truly understand it!"""
-        
-        # Motivation for Projects
-        elif "motivation" in topic_lower or "project" in topic_lower:
-            return """💪 WAYS TO STAY MOTIVATED DURING LONG PROJECTS:
-
-🎯 **1. BREAK DOWN INTO MICRO-GOALS**
-Transform overwhelming projects into manageable pieces:
-• Daily mini-milestones (15-30 minutes of work)
-• Weekly progress targets
-• Monthly major milestones
-• Visual progress tracking (charts, apps, calendars)
-**Psychology**: Small wins trigger dopamine release, maintaining motivation momentum
-
-⏰ **2. USE THE "TWO-MINUTE RULE"**
-When motivation is low:
-• Commit to just 2 minutes of work
-• Often you'll continue beyond 2 minutes
-• If not, that's still progress!
-• No guilt about stopping at 2 minutes
-**Key insight**: Starting is the hardest part - momentum builds naturally
-
-👥 **3. CREATE ACCOUNTABILITY SYSTEMS**
-Build external motivation structures:
-• Share goals with friends/family
-• Use apps like Habitica or Forest
-• Work alongside others (body doubling)
-• Regular check-ins with mentors
-• Public commitment (social media updates)
-**Impact**: External accountability increases follow-through rates by 65%
-
-🏆 **4. VISUALIZE THE END RESULT**
-Connect with your "why":
-• Create a vision board of the completed project
-• Write detailed descriptions of how you'll feel when done
-• List all benefits you'll gain from finishing
-• Regularly revisit your original motivation
-• Imagine the pride and relief of completion
-
-🎁 **5. REWARD PROGRESS STRATEGICALLY**
-Set up meaningful incentive systems:
-• Small rewards for daily goals (favorite snack, episode of a show)
-• Medium rewards for weekly milestones (movie night, dinner out)
-• Major rewards for big milestones (weekend trip, new gadget)
-• Share progress with people who will celebrate with you
-
-📊 **6. TRACK PROGRESS VISUALLY**
-Make advancement tangible:
-• Progress bars or percentage complete
-• Calendar with daily check-marks
-• Before/after photos of your work
-• Time tracking to see hours invested
-• Milestone celebration photos
-
-🔄 **7. PREPARE FOR MOTIVATION DIPS**
-Build resilience systems:
-• Identify your typical low-motivation triggers
-• Have pre-planned responses for difficult days
-• Keep a "motivation emergency kit" (inspiring quotes, past successes)
-• Remember: motivation follows action, not the other way around
-
-💡 **REMEMBER**: Consistency beats perfection. Small daily actions compound into remarkable results!"""
-        
-        # Wellness and Productivity
-        else:
-            return """🌟 DAILY ROUTINES FOR MENTAL HEALTH & PRODUCTIVITY:
-
-🌅 **MORNING ROUTINE (20-30 minutes)**
-**Foundation for a successful day:**
-• **5 minutes**: Deep breathing or meditation (apps: Headspace, Calm)
-• **5 minutes**: Gratitude journaling - write 3 things you appreciate
-• **5 minutes**: Set 2-3 priority goals for the day
-• **10 minutes**: Nutritious breakfast + large glass of water
-• **5 minutes**: Light stretching or energizing movement
-
-**Why this works**: Establishes calm focus, positive mindset, and clear direction
-
-⚡ **WORK/STUDY PRODUCTIVITY BLOCKS**
-**Maximize focused time:**
-• **Focus sessions**: 25-50 minutes of single-tasking
-• **Movement breaks**: 10-minute walk every 2 hours
-• **Hydration**: Glass of water every hour
-• **Eye rest**: 20-20-20 rule (every 20 min, look 20 feet away for 20 seconds)
-• **One-task rule**: No multitasking - full attention on one thing
-
-**Benefits**: Sustained energy, better concentration, reduced mental fatigue
-
-🌤️ **AFTERNOON RESET (10-15 minutes)**
-**Combat the afternoon slump:**
-• **Fresh air**: Step outside for natural light exposure
-• **Movement**: Desk exercises or brief walk
-• **Mindfulness**: 3-minute breathing exercise
-• **Priority review**: Adjust daily goals if needed
-• **Snack**: Protein + healthy carbs for sustained energy
-
-**Purpose**: Refresh mental state and realign focus for the rest of the day
-
-🌙 **EVENING WIND-DOWN (30-45 minutes)**
-**Prepare for restorative sleep:**
-• **Reflection**: Write down 3 accomplishments (any size!)
-• **Tomorrow prep**: Lay out clothes, review schedule (5 minutes)
-• **Digital sunset**: No screens 1 hour before bed
-• **Relaxation**: Reading, gentle music, or calming tea
-• **Body care**: Progressive muscle relaxation or gentle yoga
-• **Gratitude**: End with 3 things that went well today
-
-**Result**: Better sleep quality, reduced anxiety, sense of accomplishment
-
-📅 **WEEKLY ADDITIONS**
-**Maintain balance and growth:**
-• **Social connection**: One meaningful interaction with friends/family
-• **Nature time**: Minimum 2 hours outdoors
-• **Learning**: 30 minutes on a skill/hobby you enjoy
-• **Reflection**: Weekly review of progress and adjustments needed
-• **Rest**: One completely "offline" activity (no devices)
-
-🎯 **IMPLEMENTATION STRATEGY**
-**Start sustainable:**
-1. **Week 1**: Choose 2-3 elements that appeal most to you
-2. **Week 2**: Add 1-2 more elements once the first ones feel natural
-3. **Week 3**: Customize timing and activities to fit your lifestyle
-4. **Week 4**: Full routine implementation
-
-**Key principle**: Consistency matters more than perfection. Small daily practices create lasting change.
-
-💡 **TROUBLESHOOTING**
-• **Too busy?** Start with just 5 minutes morning + evening
-• **Keep forgetting?** Set phone reminders or habit-stack with existing routines
-• **Not seeing results?** Give it 21 days minimum - habits take time to form
-• **Feeling overwhelmed?** Scale back to 1-2 elements and build slowly"""
+        return self.backend.complete('advice', topic)
+
+    def dispatch(self, function, text):
+        """Run the handler for a function name ('questions', 'summarize', ...)"""
+        handler = self.handlers.get(function)
+        if handler is None:
+            raise ValueError(f"Unknown function '{function}'. Choose from: {', '.join(self.handlers)}")
+        
+        with self.tracer.request(function):
+            response, _ = self._lookup(handler, function, text, wait=True)
+        return response
+
+    def answer(self, function, text):
+        """Dispatch a query and count it, traced as one request"""
+        start = time.perf_counter()
+        with self.tracer.request(function):
+            response = self.dispatch(function, text)
+            self.record_query(function, text, time.perf_counter() - start)
+        return response
+
+    def request_key(self, function, text):
+        """Key under which identical queries are cached and coalesced"""
+        return (function, normalize_query(text))
+
+    def _lookup(self, handler, function, text, wait=False):
+        """Return (response, served from cache?)
+
+        A computed response waits out the emulated latency only if `wait` is set.
+        Concurrent identical misses are computed once and shared.
+        """
+        snapshot = self.catalog.snapshot()
+        if snapshot is not self._catalog_seen:
+            # Responses cached under an older catalog revision may have changed wording
+            if self._catalog_seen is not None:
+                self.cache.clear()
+            self._catalog_seen = snapshot
+        
+        key = self.request_key(function, text)
+        with span('cache.get'):
+            response = self.cache.get(key)
+        if response is not MISSING:
+            return response, True
+        
+        def compute():
+            with span('build'):
+                response = handler(key[1])
+            with span('cache.put'):
+                self.cache.put(key, response)
+            if wait:
+                with span('latency'):
+                    self.latency.wait()
+            return response
+        
+        response, _ = self.flights.do(key, compute)
+        return response, False
+
+    @staticmethod
+    def split_chunks(response, unit='paragraph'):
+        """Split a response into stream chunks that concatenate back to it"""
+        if unit == 'token':
+            return re.findall(r'\s*\S+', response) or [response]
+        return re.findall(r'.+?(?:\n\n+|$)', response, re.S) or [response]
+
+    def stream_response(self, function, text, unit='paragraph'):
+        """Yield a response incrementally, a paragraph (or token) at a time"""
+        handler = self.handlers.get(function)
+        if handler is None:
+            raise ValueError(f"Unknown function '{function}'. Choose from: {', '.join(self.handlers)}")
+        
+        start = time.perf_counter()
+        # Only the computed part is traced; the chunks are paced by the latency model
+        with self.tracer.request(f'{function}.stream'):
+            response, cached = self._lookup(handler, function, text)
+            chunks = self.split_chunks(response, unit)
+        delays = [0.0] * len(chunks) if cached else self.latency.stream_delays(len(chunks))
+        
+        first_chunk = None
+        for chunk, delay in zip(chunks, delays):
+            if delay:
+                time.sleep(delay)
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            yield chunk
+        self.record_stream(function, first_chunk, time.perf_counter() - start)
+
+    def _count(self, deltas, **details):
+        """Apply counter deltas (dotted paths) to self.stats and journal them"""
+        with span('stats'):
+            with self._stats_lock:
+                for path, delta in deltas.items():
+                    apply_delta(self.stats, path, delta)
+            if self.counters is not None:
+                self.counters.add(deltas)
+            if self.journal is not None:
+                self.journal.record(deltas, **details)
+
+    def intent_of(self, function, text):
+        """The intent the built-in handler routes text to ('default' if none)"""
+        text = normalize_query(text)
+        if function == 'summarize':
+            text = self.split_summary_request(text)[0]
+        return self.router.resolve(function, text) or 'default'
+
+    def record_query(self, function, text=None, seconds=None):
+        """Count one answered query for a function, logging it as an event if the text is given"""
+        self._count({'total_queries': 1, f'function_usage.{function}': 1})
+        self.metrics.observe_request(function, seconds)
+        if self.events is not None and text is not None:
+            with span('events'):
+                self.events.record_query(function, self.intent_of(function, text), seconds)
+
+    def record_stream(self, function, first_chunk_seconds, total_seconds):
+        """Record time-to-first-chunk and total time of one streamed response"""
+        self._count({
+            f'streaming.{function}.streams': 1,
+            f'streaming.{function}.first_chunk_seconds': first_chunk_seconds,
+            f'streaming.{function}.total_seconds': total_seconds
+        })
+
+    def record_turn(self, session_id, function, query, response):
+        """Remember a query and its response in a session's history"""
+        with span('sessions'):
+            self.sessions.record_turn(session_id, function, query, response)
+
+    def record_feedback(self, helpful, comment=None, session_id=None):
+        """Count one piece of user feedback, attaching it to the session's latest turn if given"""
+        counter = 'helpful_responses' if helpful else 'not_helpful_responses'
+        with self.tracer.request('feedback'):
+            turn = self.sessions.record_feedback(session_id, helpful, comment) if session_id is not None else None
+            self.metrics.observe_feedback(turn.function if turn is not None else None, helpful)
+            if self.events is not None:
+                function = turn.function if turn is not None else None
+                intent = self.intent_of(turn.function, turn.query) if turn is not None else None
+                self.events.record_feedback(function, intent, helpful, comment)
+            if comment:
+                self._count({counter: 1}, event='feedback', comment=comment)
+            else:
+                self._count({counter: 1})
+
+    def sync_counters(self, section, current, counted):
+        """Fold counters gathered since the last sync into self.stats[section]
+
+        current: running totals kept elsewhere (the cache, the web server);
+        counted: the totals already folded in, updated in place.
+        """
+        deltas = {}
+        with self._stats_lock:
+            for name in counted:
+                delta = current[name] - counted[name]
+                counted[name] = current[name]
+                if delta:
+                    deltas[f'{section}.{name}'] = delta
+        if deltas:
+            self._count(deltas)
+        return current
+
+    def sync_cache_stats(self):
+        """Fold cache and coalescing counters gathered since the last sync into self.stats"""
+        self.sync_counters('coalescing', self.flights.stats(), self._flights_counted)
+        return self.sync_counters('cache', self.cache.stats(), self._cache_counted)
+
+    def get_stats(self):
+        """Return a consistent copy of the statistics"""
+        self.sync_cache_stats()
+        if self.counters is not None:
+            return self.counters.stats()
+        with self._stats_lock:
+            return json.loads(json.dumps(self.stats))
 
     def get_feedback(self):
         """Get user feedback on the response"""
@@ -517,14 +574,14 @@ Build resilience systems:
         while True:
             choice = input("\nYour choice (1-3): ").strip()
             if choice == '1':
-                self.stats['helpful_responses'] += 1
+                self.record_feedback(True, session_id=self.session_id)
                 print("\n🎉 Thank you! I'm glad I could help!")
                 print("💡 Feel free to ask me anything else!")
                 break
             elif choice == '2':
-                self.stats['not_helpful_responses'] += 1
                 print("\n📝 Thank you for the feedback!")  
                 improvement = input("💭 What specific information were you looking for? ")
+                self.record_feedback(False, improvement, self.session_id)
                 print(f"📌 Noted: '{improvement}' - I'll try to improve!")
                 break
             elif choice == '3':
@@ -556,30 +613,120 @@ Build resilience systems:
             most_used = max(self.stats['function_usage'], key=self.stats['function_usage'].get)
             print(f"\n🏆 Most Used Function: {most_used.title()}")
         
+        streaming = self.stats['streaming']
+        if any(timing['streams'] for timing in streaming.values()):
+            print("\n⏱️  RESPONSE TIMES (average):")
+            for function, timing in streaming.items():
+                if timing['streams']:
+                    first = timing['first_chunk_seconds'] / timing['streams'] * 1000
+                    total = timing['total_seconds'] / timing['streams'] * 1000
+                    print(f"   {function.title()}: first chunk {first:.0f} ms, complete {total:.0f} ms")
+        
+        cache_stats = self.sync_cache_stats()
+        cache_totals = self.stats['cache']
+        lookups = cache_totals['hits'] + cache_totals['misses']
+        hit_rate = (cache_totals['hits'] / lookups * 100) if lookups > 0 else 0
+        print("\n⚡ RESPONSE CACHE:")
+        print(f"   Hits: {cache_totals['hits']}  Misses: {cache_totals['misses']}  Evictions: {cache_totals['evictions']}")
+        print(f"   Hit Rate: {hit_rate:.1f}%")
+        print(f"   Current Size: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.1f} KB")
+        
+        coalescing = self.stats['coalescing']
+        computed = coalescing['computed'] + coalescing['coalesced']
+        ratio = (coalescing['coalesced'] / computed * 100) if computed > 0 else 0
+        print("\n🔗 REQUEST COALESCING:")
+        print(f"   Computed: {coalescing['computed']}  Shared with concurrent identical requests: {coalescing['coalesced']}")
+        print(f"   Coalescing Ratio: {ratio:.1f}%")
+        
+        http = self.stats['http']
+        if http['bytes_uncompressed']:
+            saved = http['bytes_uncompressed'] - http['bytes_sent']
+            revalidated = (http['not_modified'] / http['static_requests'] * 100) if http['static_requests'] else 0
+            print("\n🗜️  WEB SERVER TRAFFIC:")
+            print(f"   Sent: {http['bytes_sent'] / 1024:.1f} KB of {http['bytes_uncompressed'] / 1024:.1f} KB "
+                  f"({saved / http['bytes_uncompressed'] * 100:.1f}% saved by gzip and 304s)")
+            print(f"   Page and prompt requests answered 304 Not Modified: {revalidated:.1f}%")
+        
+        self.show_recent_activity()
+        
+        if self.events is not None:
+            self.show_event_reports()
+        
         input("\n📱 Press Enter to continue...")
 
+    def show_recent_activity(self, windows=((5, 'LAST 5 MINUTES'), (60, 'LAST HOUR'))):
+        """Print requests, latency and satisfaction per function over recent windows of this session"""
+        for minutes, title in windows:
+            recent = self.metrics.window(minutes * 60)
+            if not recent:
+                continue
+            print(f"\n🕒 {title}:")
+            for function, row in recent.items():
+                latency = (f"p50 {row['p50_ms']:.1f} ms, p95 {row['p95_ms']:.1f} ms"
+                           if row['p50_ms'] is not None else "no timings")
+                rate = f"{row['satisfaction']:.0f}% satisfied" if row['satisfaction'] is not None else "no feedback"
+                print(f"   {function.title()}: {row['requests']} queries ({row['per_minute']:.1f}/min), {latency}, {rate}")
+
+    def show_event_reports(self):
+        """Print satisfaction per intent and per day, the slowest intents and recent comments"""
+        try:
+            report = self.events.report(top=5, days=7)
+        except Exception as e:
+            print(f"\n⚠️  Could not read the event store: {e}")
+            return
+        
+        if report['by_intent']:
+            print("\n😊 SATISFACTION BY INTENT (lowest first):")
+            for row in report['by_intent']:
+                print(f"   {row['function']}/{row['intent'] or '-'}: {row['satisfaction']:.0f}% "
+                      f"({row['helpful']} 👍 {row['not_helpful']} 👎, {row['queries']} queries)")
+        
+        if report['by_day']:
+            print("\n📅 DAILY ACTIVITY:")
+            for row in report['by_day']:
+                rate = f"{row['satisfaction']:.0f}% satisfied" if row['satisfaction'] is not None else "no feedback"
+                print(f"   {row['day']}: {row['queries']} queries, {rate}")
+        
+        if report['slowest']:
+            print("\n🐢 SLOWEST INTENTS (p95):")
+            for row in report['slowest']:
+                print(f"   {row['function']}/{row['intent']}: p95 {row['p95_ms']:.1f} ms, "
+                      f"avg {row['avg_ms']:.1f} ms over {row['queries']} queries")
+        
+        comments = self.events.comments(limit=3)
+        if comments:
+            print("\n💭 RECENT FEEDBACK:")
+            for comment in comments:
+                print(f"   [{comment['function'] or '?'}/{comment['intent'] or '?'}] {comment['comment']}")
+
     def save_stats(self):
-        """Save statistics to file"""
+        """Flush the stats journal and fold it into the stats file, and flush the event store"""
+        if self.journal is None:
+            return
         try:
-            with open('ai_assistant_stats.json', 'w') as f:
-                json.dump(self.stats, f, indent=2)
+            self.sync_cache_stats()
+            self.journal.compact()
+            if self.events is not None:
+                self.events.flush()
         except Exception as e:
             print(f"⚠️  Could not save stats: {e}")
 
     def load_stats(self):
-        """Load statistics from file"""
+        """Load statistics from the stats file plus the journal"""
         try:
-            with open('ai_assistant_stats.json', 'r') as f:
-                self.stats.update(json.load(f))
-        except FileNotFoundError:
-            pass  # First run, no stats file yet
+            loaded = self.journal.load()
+            # Merge section by section so files written before a section existed still load
+            for key, value in loaded.items():
+                if isinstance(value, dict) and isinstance(self.stats.get(key), dict):
+                    self.stats[key].update(value)
+                else:
+                    self.stats[key] = value
         except Exception as e:
             print(f"⚠️  Could not load stats: {e}")
 
     def run(self):
         """Main application loop"""
         print("🚀 Starting AI Assistant...")
-        time.sleep(1)
         
         while True:
             self.clear_screen()
@@ -597,15 +744,11 @@ Build resilience systems:
                     
                     query = self.get_user_input("What would you like to know?")
                     if query:
-                        self.simulate_processing()
-                        response = self.answer_questions(query)
-                        print("\n" + "="*60)
-                        print("🤖 AI RESPONSE:")
-                        print("="*60)
-                        print(response)
-                        
-                        self.stats['total_queries'] += 1
-                        self.stats['function_usage']['questions'] += 1
+                        start = time.perf_counter()
+                        response = self.stream_to_terminal('questions', query)
+                        seconds = time.perf_counter() - start
+                        self.record_turn(self.session_id, 'questions', query, response)
+                        self.record_query('questions', query, seconds)
                         self.get_feedback()
                         input("\n📱 Press Enter to continue...")
                 
@@ -617,15 +760,11 @@ Build resilience systems:
                     
                     text = self.get_user_input("Enter your text or summarization request:")
                     if text:
-                        self.simulate_processing()
-                        response = self.summarize_text(text)
-                        print("\n" + "="*60)
-                        print("🤖 AI RESPONSE:")
-                        print("="*60)
-                        print(response)
-                        
-                        self.stats['total_queries'] += 1
-                        self.stats['function_usage']['summarize'] += 1
+                        start = time.perf_counter()
+                        response = self.stream_to_terminal('summarize', text)
+                        seconds = time.perf_counter() - start
+                        self.record_turn(self.session_id, 'summarize', text, response)
+                        self.record_query('summarize', text, seconds)
                         self.get_feedback()
                         input("\n📱 Press Enter to continue...")
                 
@@ -637,15 +776,11 @@ Build resilience systems:
                     
                     prompt = self.get_user_input("What creative content would you like me to generate?")
                     if prompt:
-                        self.simulate_processing()
-                        response = self.generate_creative_content(prompt)
-                        print("\n" + "="*60)
-                        print("🤖 AI RESPONSE:")
-                        print("="*60)
-                        print(response)
-                        
-                        self.stats['total_queries'] += 1
-                        self.stats['function_usage']['creative'] += 1
+                        start = time.perf_counter()
+                        response = self.stream_to_terminal('creative', prompt)
+                        seconds = time.perf_counter() - start
+                        self.record_turn(self.session_id, 'creative', prompt, response)
+                        self.record_query('creative', prompt, seconds)
                         self.get_feedback()
                         input("\n📱 Press Enter to continue...")
                 
@@ -657,15 +792,11 @@ Build resilience systems:
                     
                     topic = self.get_user_input("What advice topic can I help you with?")
                     if topic:
-                        self.simulate_processing()
-                        response = self.provide_advice(topic)
-                        print("\n" + "="*60)
-                        print("🤖 AI RESPONSE:")
-                        print("="*60)
-                        print(response)
-                        
-                        self.stats['total_queries'] += 1
-                        self.stats['function_usage']['advice'] += 1
+                        start = time.perf_counter()
+                        response = self.stream_to_terminal('advice', topic)
+                        seconds = time.perf_counter() - start
+                        self.record_turn(self.session_id, 'advice', topic, response)
+                        self.record_query('advice', topic, seconds)
                         self.get_feedback()
                         input("\n📱 Press Enter to continue...")
                 
@@ -687,7 +818,7 @@ Build resilience systems:
                 
                 else:
                     print("❌ Invalid choice. Please select 1-6.")
-                    time.sleep(2)
+                    input("\n📱 Press Enter to continue...")
                     
             except KeyboardInterrupt:
                 print("\n\n👋 Goodbye! Thanks for using AI Assistant!")
@@ -695,9 +826,53 @@ Build resilience systems:
                 break
             except Exception as e:
                 print(f"\n❌ An error occurred: {e}")
-                print("🔄 Continuing...")
-                time.sleep(2)
+                input("🔄 Press Enter to continue...")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Assistant - Prompt Engineering Project")
+    parser.add_argument('--latency', default='none',
+                        help="emulated backend latency: none, fixed:S, lognormal:MEDIAN,SIGMA, "
+                             "exponential:MEAN or uniform:LOW,HIGH (default: none)")
+    parser.add_argument('--backend', default='canned',
+                        help="where responses come from: canned or an inference server URL (see backends.py)")
+    parser.add_argument('--function', choices=tuple(AIAssistant.ROUTES),
+                        help="answer one query with this function, print the response and exit")
+    parser.add_argument('--query', help="the query for --function (default: read it from stdin)")
+    add_tracing_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.query is not None and args.function is None:
+        parser.error("--query needs --function")
+    
+    try:
+        latency = parse_latency(args.latency)
+        tracer = tracer_from_args(args)
+        backend = parse_backend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    assistant = AIAssistant(latency=latency, tracer=tracer, backend=backend)
+    try:
+        if args.function is not None:
+            return answer_once(assistant, args.function, args.query)
+        assistant.run()
+    finally:
+        assistant.backend.close()
+    return 0
+
+def answer_once(assistant, function, query=None):
+    """One-shot mode: print the response to one query, with no menu, prompts or screen clearing"""
+    if query is None:
+        query = sys.stdin.read()
+    if not query.strip():
+        print("❌ No query given (use --query or pipe it on stdin)", file=sys.stderr)
+        return 2
+    try:
+        response = assistant.answer(function, query.strip())
+    except Exception as e:
+        print(f"❌ An error occurred: {e}", file=sys.stderr)
+        return 1
+    print(response)
+    return 0
 
 if __name__ == "__main__":
-    assistant = AIAssistant()
-    assistant.run()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Backends - where the assistant's responses come from
+
+A backend turns (function, text) into response text:
+
+    backend.complete('advice', 'study tips')  ->  "..."
+    backend.close()
+
+CannedBackend is the default: the assistant's own keyword routing over the
+response catalog, knowledge base and summarizer. HTTPBackend sends the work
+to a local inference server instead. It keeps a pool of keep-alive
+connections and groups concurrent requests into micro-batches: a batch is sent
+as soon as it holds `max_batch` requests or its first request has waited
+`max_wait` seconds, and at most `pool_size` batches are in flight. While all
+of them are busy, new requests queue up, so batches grow with the load.
+
+Wire format (one POST per batch, JSON both ways):
+
+    {"requests": [{"function": "advice", "text": "..."}, ...]}
+    {"responses": [{"text": "..."}, {"error": "..."}, ...]}     same order
+
+Backends are chosen with a spec string, like latency models:
+
+    canned                                          built-in responses (default)
+    http://127.0.0.1:9000/v1/batch                  inference server
+    http://127.0.0.1:9000/v1/batch?max_batch=32&max_wait=0.002&pool_size=8&timeout=30
+
+For development and benchmarks, a stand-in server speaks the same protocol
+and answers with the canned responses. It runs one batch at a time and charges
+a fixed cost per batch plus a cost per request, like a single accelerator:
+
+    python backends.py serve --port 9000 --batch-delay 0.02 --item-delay 0.001
+
+The stand-in lives in stand_in_server.py, and http.client and urllib are only
+imported once an HTTP backend is built, so the default canned set-up starts
+without loading the HTTP stack.
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class BackendError(Exception):
+    pass
+
+
+class CannedBackend:
+    """Built-in responses, computed in-process by the given per-function callables"""
+
+    spec = 'canned'
+
+    def __init__(self, responders):
+        self.responders = responders
+
+    def complete(self, function, text):
+        return self.responders[function](text)
+
+    def close(self):
+        pass
+
+
+class ConnectionPool:
+    """At most `size` keep-alive HTTP connections to one server, reused most-recent first"""
+
+    def __init__(self, host, port, size=8, timeout=30.0, https=False):
+        import http.client
+        self._http = http.client
+        # Errors that mean a reused connection was closed by the server while idle
+        self.stale = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.https = https
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Semaphore(size)
+        self.opened = 0
+
+    def _acquire(self):
+        if not self._available.acquire(timeout=self.timeout):
+            raise BackendError(f"no connection to {self.host}:{self.port} became free within {self.timeout:g}s")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        cls = self._http.HTTPSConnection if self.https else self._http.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout), False
+
+    def _release(self, conn, keep=True):
+        if keep:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._available.release()
+
+    def request(self, method, path, body, headers):
+        """Send one request; returns (status, response body)"""
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+            except self.stale:
+                self._release(conn, keep=False)
+                if reused:
+                    continue   # the server dropped an idle connection; retry on a fresh one
+                raise BackendError(f"connection to {self.host}:{self.port} was closed")
+            except (OSError, self._http.HTTPException) as e:
+                self._release(conn, keep=False)
+                raise BackendError(f"request to {self.host}:{self.port} failed: {e}")
+            self._release(conn, keep=not response.will_close)
+            return response.status, data
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Group concurrent submissions into batches for `run_batch(items) -> results`
+
+    A result that is an exception instance fails only its own submission.
+    """
+
+    def __init__(self, run_batch, max_batch=16, max_wait=0.002, concurrency=4):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        self._slots = threading.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='backend-batch')
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='backend-batcher', daemon=True)
+                    self._thread.start()
+        return future
+
+    def _collect(self):
+        """Block for one submission, then take more until the batch is full or max_wait passes"""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _loop(self):
+        while True:
+            self._slots.acquire()   # wait for a free batch slot before forming the next batch
+            batch = self._collect()
+            if batch is None:
+                self._slots.release()
+                return
+            # Callers that gave up while queued have cancelled their futures
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                self._slots.release()
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        try:
+            results = self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise BackendError(f"backend returned {len(results)} results for {len(batch)} requests")
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._slots.release()
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+
+class HTTPBackend:
+    def __init__(self, url, pool_size=8, timeout=30.0, max_batch=16, max_wait=0.002):
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"backend URL must be http(s)://host[:port]/path, got '{url}'")
+        if pool_size < 1 or max_batch < 1 or timeout <= 0 or max_wait < 0:
+            raise ValueError("pool_size and max_batch must be at least 1, timeout positive, max_wait not negative")
+        self.spec = url
+        self.path = parts.path or '/'
+        self.timeout = timeout
+        self.pool = ConnectionPool(parts.hostname, parts.port, pool_size, timeout, https=parts.scheme == 'https')
+        self.batcher = MicroBatcher(self._send, max_batch, max_wait, pool_size) if max_batch > 1 else None
+
+    def _send(self, items):
+        """POST one batch; returns one response text (or BackendError) per item"""
+        body = json.dumps({'requests': [{'function': f, 'text': t} for f, t in items]}, ensure_ascii=False)
+        status, data = self.pool.request('POST', self.path, body.encode('utf-8'),
+                                         {'Content-Type': 'application/json'})
+        if status != 200:
+            raise BackendError(f"backend answered HTTP {status}: {data[:200].decode('utf-8', 'replace')}")
+        try:
+            responses = json.loads(data)['responses']
+        except (ValueError, KeyError, TypeError):
+            raise BackendError("backend sent a malformed response")
+        return [
+            BackendError(r.get('error', 'no text in response')) if not isinstance(r.get('text'), str) else r['text']
+            for r in responses
+        ]
+
+    def complete(self, function, text):
+        if self.batcher is None:
+            result = self._send([(function, text)])[0]
+            if isinstance(result, BackendError):
+                raise result
+            return result
+        future = self.batcher.submit((function, text))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise BackendError(f"backend did not answer within {self.timeout:g}s")
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        self.pool.close()
+
+
+def parse_backend(spec):
+    """Build a backend from a spec string; None means the built-in canned responses"""
+    spec = (spec or 'canned').strip()
+    if spec == 'canned':
+        return None
+    from urllib.parse import parse_qs, urlsplit
+
+    parts = urlsplit(spec)
+    if parts.scheme not in ('http', 'https'):
+        raise ValueError(f"Unknown backend '{spec}'. Use canned or an http:// URL")
+
+    options = {'pool_size': int, 'timeout': float, 'max_batch': int, 'max_wait': float}
+    kwargs = {}
+    for name, values in parse_qs(parts.query).items():
+        if name not in options:
+            raise ValueError(f"Unknown backend option '{name}'. Choose from: {', '.join(options)}")
+        try:
+            kwargs[name] = options[name](values[-1])
+        except ValueError:
+            raise ValueError(f"Invalid value for backend option '{name}': {values[-1]}")
+    return HTTPBackend(parts._replace(query='').geturl(), **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model backends for the AI Assistant")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="run the stand-in inference server")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=9000)
+    serve.add_argument('--batch-delay', type=float, default=0.0, help="seconds charged per batch")
+    serve.add_argument('--item-delay', type=float, default=0.0, help="seconds charged per request in a batch")
+    args = parser.parse_args(argv)
+
+    from stand_in_server import StandInServer
+    server = StandInServer((args.host, args.port), args.batch_delay, args.item_delay)
+    host, port = server.server_address[:2]
+    print(f"🧪 Stand-in inference server at http://{host}:{port}/v1/batch", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n👋 Served {server.items} requests in {server.batches} batches")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
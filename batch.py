@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+AI Assistant - Batch Mode
+Runs a JSONL file of prompts through the assistant handlers without the menu.
+
+Each input line is a JSON object:
+    {"function": "questions|summarize|creative|advice", "text": "...", "id": optional}
+
+Each output line carries the input position (and id, if given) plus either the
+response or an error, in the same order as the input:
+    {"index": 0, "id": ..., "function": "advice", "response": "..."}
+    {"index": 1, "error": "..."}
+
+Lines are grouped into chunks and fanned out over a process pool. Only a fixed
+number of chunks is ever in flight, so memory stays flat however large the
+input file is. Batch runs do not touch the interactive usage statistics.
+
+Usage:
+    python batch.py prompts.jsonl -o responses.jsonl --workers 8
+    cat prompts.jsonl | python batch.py - > responses.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from ai_assistant import AIAssistant
+
+_worker_assistant = None
+
+
+def _init_worker():
+    """Build one assistant per worker process"""
+    global _worker_assistant
+    _worker_assistant = AIAssistant(load_stats=False)
+
+
+def process_record(assistant, index, line):
+    """Turn one input line into one output record"""
+    result = {'index': index}
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("record must be a JSON object")
+        if 'id' in record:
+            result['id'] = record['id']
+        text = record.get('text')
+        if not isinstance(text, str):
+            raise ValueError("record needs a string 'text' field")
+        result['function'] = record.get('function')
+        result['response'] = assistant.dispatch(result['function'], text)
+    except Exception as e:
+        result.pop('function', None)
+        result['error'] = str(e)
+    return result
+
+
+def process_chunk(start, lines):
+    """Worker entry point: handle a chunk of raw lines, return (JSONL lines, error count)"""
+    out = []
+    errors = 0
+    for offset, line in enumerate(lines):
+        result = process_record(_worker_assistant, start + offset, line)
+        errors += 'error' in result
+        out.append(json.dumps(result, ensure_ascii=False))
+    return out, errors
+
+
+def read_chunks(infile, chunk_size):
+    """Yield (first_index, [lines]) for non-blank input lines"""
+    index = 0
+    lines = (line for line in infile if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield index, chunk
+        index += len(chunk)
+
+
+def run_batch(infile, outfile, workers=None, chunk_size=256, max_in_flight=None):
+    """Stream records from infile to outfile in input order, returns a summary"""
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    summary = {'records': 0, 'errors': 0}
+
+    def write(chunk_result):
+        lines, errors = chunk_result
+        for line in lines:
+            outfile.write(line)
+            outfile.write('\n')
+        summary['records'] += len(lines)
+        summary['errors'] += errors
+
+    start_time = time.perf_counter()
+    if workers == 1:
+        _init_worker()
+        for start, lines in read_chunks(infile, chunk_size):
+            write(process_chunk(start, lines))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = deque()
+            for start, lines in read_chunks(infile, chunk_size):
+                if len(pending) >= max_in_flight:
+                    write(pending.popleft().result())
+                pending.append(pool.submit(process_chunk, start, lines))
+            while pending:
+                write(pending.popleft().result())
+    outfile.flush()
+
+    summary['elapsed'] = time.perf_counter() - start_time
+    summary['records_per_second'] = summary['records'] / summary['elapsed'] if summary['elapsed'] > 0 else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through the AI Assistant")
+    parser.add_argument('input', help="input JSONL file, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="output JSONL file (default: stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=256, help="records sent to a worker at a time")
+    parser.add_argument('--max-in-flight', type=int, default=None, help="chunks queued at once (default: 4 per worker)")
+    args = parser.parse_args(argv)
+
+    infile = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        summary = run_batch(infile, outfile, args.workers, args.chunk_size, args.max_in_flight)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    print(f"📊 Processed {summary['records']} records ({summary['errors']} errors) "
+          f"in {summary['elapsed']:.2f}s - {summary['records_per_second']:.0f} records/s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark - HTTPBackend throughput against the stand-in inference server
+
+The stand-in runs one batch at a time and charges 10 ms per batch plus 0.2 ms
+per request, like a single accelerator. 64 client threads call complete() as
+fast as they can, in three set-ups:
+
+    naive      a new connection for every request, one request per call
+    pooled     keep-alive connection pool, one request per call
+    batched    keep-alive connection pool plus micro-batching
+
+With a fixed cost per forward pass, unbatched set-ups are capped at about
+1 / batch cost requests per second however many connections they use; batching
+should raise throughput by roughly the average batch size.
+
+Usage: python benchmarks/bench_backends.py [--quick]
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from backends import HTTPBackend
+from stand_in_server import StandInServer
+
+BATCH_DELAY = 0.010
+ITEM_DELAY = 0.0002
+CLIENTS = 64
+REQUESTS = [
+    ('questions', 'what is the capital of france'),
+    ('creative', 'write a short poem about the sea'),
+    ('advice', 'how do I stay motivated on a long project'),
+    ('summarize', 'summarize in 3 lines'),
+]
+
+
+class NaiveBackend:
+    """One fresh connection and one HTTP request per completion"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def complete(self, function, text):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            body = json.dumps({'requests': [{'function': function, 'text': text}]})
+            conn.request('POST', '/v1/batch', body, {'Content-Type': 'application/json', 'Connection': 'close'})
+            return json.loads(conn.getresponse().read())['responses'][0]['text']
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+def drive(backend, duration):
+    """Call backend.complete from CLIENTS threads for `duration` seconds"""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        mine = []
+        i = offset
+        while time.perf_counter() < deadline:
+            function, text = REQUESTS[i % len(REQUESTS)]
+            start = time.perf_counter()
+            backend.complete(function, text)
+            mine.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    quick = '--quick' in sys.argv
+    duration = 1.0 if quick else 3.0
+
+    server = StandInServer(('127.0.0.1', 0), BATCH_DELAY, ITEM_DELAY)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    url = f'http://{host}:{port}/v1/batch'
+
+    setups = [
+        ('naive', lambda: NaiveBackend(host, port)),
+        ('pooled', lambda: HTTPBackend(url, pool_size=8, max_batch=1)),
+        ('batched', lambda: HTTPBackend(url, pool_size=8, max_batch=32, max_wait=0.002)),
+    ]
+    print(f"{CLIENTS} clients, {BATCH_DELAY * 1000:.0f} ms per batch + {ITEM_DELAY * 1000:.1f} ms per request, "
+          f"{duration:.0f}s per set-up\n")
+    print(f"{'set-up':<10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'batch size':>11} {'connections':>12}")
+    for name, make in setups:
+        backend = make()
+        batches, items = server.batches, server.items
+        rps, p50, p99 = drive(backend, duration)
+        batch_size = (server.items - items) / max(1, server.batches - batches)
+        pool = getattr(backend, 'pool', None)
+        connections = pool.opened if pool is not None else server.batches - batches
+        print(f"{name:<10} {rps:>9.0f} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f} {batch_size:>11.1f} {connections:>12}")
+        backend.close()
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark - bulk summaries of a directory of documents
+
+Generates a synthetic corpus of text and Markdown documents and times
+bulk_summarize.py over it with 1, 2, 4, ... worker processes (documents and
+MB per second). Then it summarizes single documents of growing size to show
+that peak memory does not grow with the file, and it cuts a finished output
+file short in the middle of a line to check that resuming summarizes exactly
+the missing documents.
+
+Each run is a separate process, so peak RSS is that run's own.
+Everything is written to a temporary directory.
+
+Usage: python benchmarks/bench_bulk_summarize.py [--quick]
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+WORDS = ("budget hiring roadmap customers revenue growth risk team launch delay quality support market cost "
+         "plan schedule vendor contract review audit migration latency outage incident training").split()
+
+RUN = """
+import json, resource, sys
+sys.path.insert(0, {root!r})
+from bulk_summarize import run_job
+summary = run_job({docs!r}, {output!r}, workers={workers}, progress_interval=1e9)
+summary['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(summary))
+"""
+
+
+def write_document(path, size, rng):
+    """Roughly `size` bytes of sentences in paragraphs, with Markdown headings in .md files"""
+    written = 0
+    with open(path, 'w') as f:
+        while written < size:
+            if path.endswith('.md'):
+                heading = f"## {rng.choice(WORDS).title()} {rng.choice(WORDS)}\n\n"
+                f.write(heading)
+                written += len(heading)
+            paragraph = ' '.join(
+                ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + '.'
+                for _ in range(rng.randint(3, 8))
+            ) + '\n\n'
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def make_corpus(directory, count, rng):
+    for i in range(count):
+        folder = os.path.join(directory, f'team{i % 10}')
+        os.makedirs(folder, exist_ok=True)
+        size = int(rng.lognormvariate(9, 1))   # median ~8 KB, a long tail of bigger reports
+        write_document(os.path.join(folder, f'report{i}.{"md" if i % 3 else "txt"}'), size, rng)
+
+
+def run(docs, output, workers):
+    result = subprocess.run([sys.executable, '-c', RUN.format(root=ROOT, docs=docs, output=output, workers=workers)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    quick = '--quick' in sys.argv
+    rng = random.Random(11)
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= min(cores, 8):
+        counts.append(counts[-1] * 2)
+
+    directory = tempfile.mkdtemp(prefix='bench-bulk-')
+    try:
+        docs = os.path.join(directory, 'docs')
+        make_corpus(docs, 300 if quick else 2000, rng)
+        total = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(docs) for f in files)
+        print(f"Corpus: {300 if quick else 2000} documents, {total / 2**20:.1f} MB, {cores} cores")
+        print(f"{'workers':>8} {'docs/s':>8} {'MB/s':>7} {'parent MB':>10}")
+        for workers in counts:
+            output = os.path.join(directory, f'out-{workers}.jsonl')
+            summary = run(docs, output, workers)
+            print(f"{workers:>8} {summary['summarized'] / summary['elapsed']:>8.0f} "
+                  f"{summary['mb_per_second']:>7.2f} {summary['peak_mb']:>10.0f}")
+
+        # Resume: drop the second half of a finished output and leave half a line behind
+        output = os.path.join(directory, 'out-1.jsonl')
+        with open(output) as f:
+            lines = f.readlines()
+        keep = len(lines) // 2
+        with open(output, 'w') as f:
+            f.writelines(lines[:keep])
+            f.write(lines[keep][:len(lines[keep]) // 2])
+        summary = run(docs, output, counts[-1])
+        with open(output) as f:
+            records = [json.loads(line) for line in f][1:]
+        paths = [record['path'] for record in records]
+        if len(paths) != len(set(paths)) or len(paths) != len(lines) - 1:
+            raise SystemExit(f"resume wrote {len(paths)} records for {len(lines) - 1} documents")
+        print(f"Resume: {summary['skipped']} skipped, {summary['summarized']} summarized, "
+              f"{len(paths)} records for {len(lines) - 1} documents")
+
+        print(f"{'document MB':>12} {'seconds':>8} {'peak MB':>8}")
+        for size_mb in ((1, 8) if quick else (1, 16, 64)):
+            single = os.path.join(directory, f'single-{size_mb}')
+            os.makedirs(single)
+            write_document(os.path.join(single, 'large.txt'), size_mb * 2**20, rng)
+            summary = run(single, os.path.join(directory, f'single-{size_mb}.jsonl'), 1)
+            print(f"{size_mb:>12} {summary['elapsed']:>8.2f} {summary['peak_mb']:>8.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark - event store recording and report speed
+
+Records events one at a time through EventStore (the path every query takes),
+then writes a large synthetic history straight into the column files and
+times EventStore.report over it. The events span 90 days, 4 functions, 20
+intents, 10% feedback, with log-normal latencies.
+
+Everything is written to a temporary directory.
+
+Usage: python benchmarks/bench_events.py [--quick]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from event_store import COLUMNS, FEEDBACK, FUNCTIONS, QUERY, EventStore
+
+INTENTS = [f'intent_{i}' for i in range(20)]
+
+
+def synthetic_columns(count, rng):
+    now = time.time()
+    kind = np.where(rng.random(count) < 0.1, FEEDBACK, QUERY).astype(np.uint8)
+    return {
+        'ts': np.sort(now - rng.random(count) * 90 * 86400),
+        'kind': kind,
+        'function': rng.integers(0, len(FUNCTIONS), count).astype(np.uint8),
+        'intent': rng.integers(0, len(INTENTS), count).astype(np.uint16),
+        'latency': np.where(kind == QUERY, rng.lognormal(np.log(0.02), 0.8, count), np.nan).astype(np.float32),
+        'helpful': np.where(kind == FEEDBACK, np.where(rng.random(count) < 0.8, 1, -1), 0).astype(np.int8),
+    }
+
+
+def main():
+    quick = '--quick' in sys.argv
+    sizes = (1_000_000,) if quick else (1_000_000, 10_000_000, 30_000_000)
+    directory = tempfile.mkdtemp(prefix='bench-events-')
+    try:
+        store = EventStore(os.path.join(directory, 'recorded'), flush_interval=60)
+        count = 20_000 if quick else 100_000
+        start = time.perf_counter()
+        for i in range(count):
+            store.record_query(FUNCTIONS[i % 4], INTENTS[i % len(INTENTS)], 0.01)
+        store.flush()
+        print(f"record_query + flush: {count / (time.perf_counter() - start):,.0f} events/s\n")
+
+        rng = np.random.default_rng(3)
+        print(f"{'events':>12} {'on disk MB':>11} {'report s':>9}")
+        for size in sizes:
+            path = os.path.join(directory, f'synthetic-{size}')
+            os.makedirs(path)
+            columns = synthetic_columns(size, rng)
+            for name, _, dtype in COLUMNS:
+                columns[name].astype(dtype).tofile(os.path.join(path, f"{name}.{dtype.lstrip('<')}"))
+            del columns
+            with open(os.path.join(path, 'intents.json'), 'w') as f:
+                f.write('[' + ', '.join(f'"{name}"' for name in INTENTS) + ']')
+
+            store = EventStore(path)
+            store.report()   # page the files in; the timed run measures the scan
+            start = time.perf_counter()
+            report = store.report()
+            elapsed = time.perf_counter() - start
+            disk = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            print(f"{report['events']:>12,} {disk / 2**20:>11.0f} {elapsed:>9.2f}")
+            shutil.rmtree(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
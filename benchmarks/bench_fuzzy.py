@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark - fuzzy intent matching latency and accuracy at scale
+
+Builds a FuzzyMatcher over synthetic intents (made-up words, one to three per
+keyword) and matches queries that contain one keyword with a single typo
+(dropped, doubled, swapped or replaced letter) among filler words, plus
+queries that contain no keyword at all. Reports per-query latency of the
+vectorized scoring step alone and of a full match, how often the typo'd intent
+was found, and how often a keyword-free query matched anything.
+
+Then it checks false positives on real English against the assistant's own
+route table: how many dictionary words the typo rules alone would take for a
+keyword (the dictionary itself rules them all out), and which sentences of
+the README, the response catalog and the knowledge base seed get an intent
+only through fuzzy matching.
+
+Usage: python benchmarks/bench_fuzzy.py [--quick]
+"""
+
+import glob
+import json
+import os
+import random
+import re
+import string
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from ai_assistant import AIAssistant
+from fuzzy_matcher import FuzzyMatcher, dictionary, similarity, words
+from intent_router import IntentRouter
+
+FILLER = 'what is the a an how do i can you please tell me about my for with and of in'.split()
+
+
+def made_up_word(rng):
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+
+
+def typo(rng, word):
+    i = rng.randrange(len(word))
+    kind = rng.choice(('drop', 'double', 'swap', 'replace'))
+    if kind == 'drop':
+        return word[:i] + word[i + 1:]
+    if kind == 'double':
+        return word[:i] + word[i] + word[i:]
+    if kind == 'swap' and i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def strings_in(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from strings_in(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from strings_in(item)
+
+
+def english_sentences():
+    """Sentences of the README, the response catalog and the knowledge base seed"""
+    with open(os.path.join(ROOT, 'README.md'), encoding='utf-8') as f:
+        # The README quotes example queries, some of them misspelled on purpose
+        texts = [re.sub(r'"[^"]*"', '', f.read())]
+    for path in glob.glob(os.path.join(ROOT, 'catalog', '*.json')):
+        with open(path, encoding='utf-8') as f:
+            texts.extend(strings_in(json.load(f)))
+    with open(os.path.join(ROOT, 'data', 'knowledge_seed.jsonl'), encoding='utf-8') as f:
+        texts.extend(text for line in f for text in strings_in(json.loads(line)))
+    return [sentence.strip() for text in texts for sentence in re.split(r'(?<=[.!?])\s+|\n+', text)
+            if len(words(sentence)) >= 3]
+
+
+def english_false_positives(quick):
+    threshold = AIAssistant.FUZZY_THRESHOLD
+    router = IntentRouter(AIAssistant.ROUTES, threshold)
+    exact = IntentRouter(AIAssistant.ROUTES)
+    keyword_words = sorted({word for keyword in router._keywords for word in words(keyword)})
+    english = sorted(dictionary())
+    if quick:
+        english = random.Random(5).sample(english, 20_000)
+    taken = [word for word in english if word not in keyword_words and any(
+        abs(len(word) - len(keyword)) <= 2 and similarity(keyword, word, threshold) >= threshold
+        and keyword not in word for keyword in keyword_words)]
+    print(f"\n{len(english)} dictionary words, {len(taken)} within the typo rules of a keyword "
+          f"(never matched: they are in the dictionary)")
+    if taken:
+        print("  e.g. " + ", ".join(taken[:12]))
+
+    sentences = english_sentences()
+    guessed = []
+    for sentence in sentences:
+        for function in AIAssistant.ROUTES:
+            intent = router.resolve(function, sentence)
+            if intent is not None and exact.resolve(function, sentence) is None:
+                guessed.append((function, intent, sentence))
+    print(f"{len(sentences)} English sentences x {len(AIAssistant.ROUTES)} functions: "
+          f"{len(guessed)} routed only by fuzzy matching")
+    for function, intent, sentence in guessed[:10]:
+        print(f"  {function}/{intent}: {sentence[:70]}")
+
+
+def main():
+    quick = '--quick' in sys.argv
+    intents = 10_000
+    queries = 500 if quick else 3_000
+    rng = random.Random(11)
+
+    phrases = [(' '.join(made_up_word(rng) for _ in range(rng.choice((1, 1, 2, 3)))), f'intent-{i}')
+               for i in range(intents)]
+    start = time.perf_counter()
+    matcher = FuzzyMatcher(phrases)
+    build = time.perf_counter() - start
+
+    typoed = []
+    for _ in range(queries):
+        phrase, label = rng.choice(phrases)
+        words = phrase.split()
+        target = rng.randrange(len(words))
+        words[target] = typo(rng, words[target])
+        text = ' '.join(rng.sample(FILLER, 3) + words + rng.sample(FILLER, 2))
+        typoed.append((text, label))
+    unrelated = [' '.join(rng.sample(FILLER, 6)) + ' ' + made_up_word(rng) for _ in range(queries)]
+
+    score_times, match_times, found, false_positives = [], [], 0, 0
+    for text, label in typoed:
+        start = time.perf_counter()
+        matcher.scores(text)
+        score_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        result = matcher.match(text)
+        match_times.append(time.perf_counter() - start)
+        found += result is not None and result[0] == label
+    for text in unrelated:
+        start = time.perf_counter()
+        result = matcher.match(text)
+        match_times.append(time.perf_counter() - start)
+        false_positives += result is not None
+
+    print(f"{intents} intents, {len(matcher._vocabulary)} bigram rows, "
+          f"matrix {matcher._matrix.nbytes / 2**20:.1f} MB, built in {build * 1000:.0f} ms\n")
+    print(f"{'step':<8} {'p50 µs':>8} {'p99 µs':>8}")
+    for name, times in (('scores', score_times), ('match', match_times)):
+        print(f"{name:<8} {percentile(times, 0.5) * 1e6:>8.0f} {percentile(times, 0.99) * 1e6:>8.0f}")
+    print(f"\ntypo'd intent found: {found / len(typoed):.1%}   "
+          f"keyword-free query matched: {false_positives / len(unrelated):.1%}")
+
+    english_false_positives(quick)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark - IntentRouter vs. the old per-branch substring checks
+
+Builds synthetic route tables with a growing number of keywords and routes
+inputs of growing size through both the compiled router and a linear chain of
+`keyword in text` checks (what the handlers used to do).
+
+The naive chain costs one full pass over the input per keyword. The router
+costs one pass in total; per character it only tries the trie branches for
+that position, which is bounded by the alphabet rather than by the number of
+keywords, so once the table holds a few hundred keywords adding more barely
+moves the routing time.
+
+Usage: python benchmarks/bench_intent_router.py [--quick]
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from intent_router import IntentRouter
+
+
+def make_keywords(count, rng):
+    """Generate distinct lowercase keywords of 4-14 characters"""
+    keywords = set()
+    while len(keywords) < count:
+        length = rng.randint(4, 14)
+        keywords.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    return sorted(keywords)
+
+
+def make_routes(keywords):
+    """Spread keywords over the four functions, two keywords per rule"""
+    routes = {'questions': [], 'summarize': [], 'creative': [], 'advice': []}
+    functions = list(routes)
+    for i in range(0, len(keywords), 2):
+        routes[functions[(i // 2) % 4]].append(({'any': keywords[i:i + 2]}, f'intent_{i}'))
+    return routes
+
+
+def make_text(size, rng):
+    """Generate prose-like text of roughly `size` characters"""
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9)))
+             for _ in range(2000)]
+    parts = []
+    total = 0
+    while total < size:
+        word = rng.choice(words)
+        parts.append(word)
+        total += len(word) + 1
+    return ' '.join(parts)[:size]
+
+
+def naive_resolve(routes, function, text):
+    """The original approach: lowercase, then test every keyword in order"""
+    text_lower = text.lower()
+    for condition, intent in routes[function]:
+        if any(keyword in text_lower for keyword in condition['any']):
+            return intent
+    return None
+
+
+def timed(func, repeat):
+    """Best wall-clock time of `repeat` runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    quick = '--quick' in sys.argv
+    rng = random.Random(42)
+    keyword_counts = [10, 100, 1000, 5000] if not quick else [10, 1000]
+    text_sizes = [1_000, 100_000, 1_000_000, 4_000_000] if not quick else [1_000, 1_000_000]
+
+    texts = {size: make_text(size, rng) for size in text_sizes}
+
+    print(f"{'keywords':>9} {'input':>10} {'build ms':>10} {'router ms':>10} {'naive ms':>10}")
+    print("-" * 53)
+    for count in keyword_counts:
+        keywords = make_keywords(count, rng)
+        routes = make_routes(keywords)
+        start = time.perf_counter()
+        router = IntentRouter(routes)
+        build_ms = (time.perf_counter() - start) * 1000
+        for size in text_sizes:
+            text = texts[size]
+            repeat = 5 if size <= 100_000 else 2
+
+            def route_all():
+                found = router.scan(text)
+                for function in routes:
+                    router.resolve(function, text, found)
+
+            def naive_all():
+                for function in routes:
+                    naive_resolve(routes, function, text)
+
+            router_ms = timed(route_all, repeat)
+            naive_ms = timed(naive_all, 1 if count * size > 10**9 else repeat)
+            print(f"{count:>9} {size:>10} {build_ms:>10.1f} {router_ms:>10.2f} {naive_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark - KnowledgeBase build, open and query latency as the corpus grows
+
+Generates passages of 30-60 words over a Zipf-distributed vocabulary (a few
+very common words and a long tail, like real text), indexes them into a
+temporary directory and runs random 2-5 word queries drawn from the same
+distribution, so common terms with long postings lists are well represented.
+The 100 most frequent ranks are left out, as stopword removal would drop them
+from real text.
+
+Opening only memory-maps the segments, so it should stay in milliseconds at
+any size. Query time grows with the postings of the query terms, not with the
+number of passages; at a million passages p50 should stay in low milliseconds.
+
+Usage: python benchmarks/bench_knowledge_base.py [--quick]
+"""
+
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+
+from knowledge_base import KnowledgeBase
+
+
+def make_vocabulary(size, rng):
+    """Distinct lowercase words of 4-10 characters"""
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def zipf_sampler(vocabulary, seed, stopwords=100):
+    """Draw words with probability proportional to 1 / rank, skipping the top ranks"""
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights[:stopwords] = 0
+    cumulative = np.cumsum(weights) / weights.sum()
+    rng = np.random.default_rng(seed)
+    words = np.array(vocabulary)
+    return lambda count: words[np.searchsorted(cumulative, rng.random(count))]
+
+
+def make_passages(count, sample, rng):
+    for i in range(count):
+        words = sample(rng.randint(30, 60))
+        yield {'id': f'p{i}', 'title': ' '.join(words[:3]), 'text': ' '.join(words)}
+
+
+def main():
+    quick = '--quick' in sys.argv
+    sizes = [10_000, 100_000, 1_000_000] if not quick else [10_000, 100_000]
+    rng = random.Random(3)
+    vocabulary = make_vocabulary(50_000, rng)
+    sample = zipf_sampler(vocabulary, 3)
+    queries = [' '.join(sample(rng.randint(2, 5))) for _ in range(500)]
+
+    print(f"{'passages':>9} {'segments':>9} {'build s':>8} {'open ms':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    print("-" * 62)
+    for size in sizes:
+        path = tempfile.mkdtemp(prefix='kb-bench-')
+        try:
+            start = time.perf_counter()
+            KnowledgeBase(path).add_documents(make_passages(size, sample, rng))
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            knowledge = KnowledgeBase(path)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            for query in queries[:20]:  # fault the mapped pages in once
+                knowledge.search(query)
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                knowledge.search(query, 5)
+                timings.append((time.perf_counter() - start) * 1000)
+            p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+            segments = knowledge.stats()['segments']
+            print(f"{size:>9} {segments:>9} {build:>8.1f} {open_ms:>8.2f} {p50:>7.2f} {p95:>7.2f} {p99:>7.2f}")
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
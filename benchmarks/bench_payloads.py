@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark - precompressed pages, 304s and gzipped answers
+
+Starts web_server.py and fetches the chat page, the sample prompts and a
+canned advice answer (whole and streamed) over one keep-alive connection, as
+a client that does not accept gzip, one that does, and (for the page and
+prompts) a repeat visitor that sends If-None-Match. Reports bytes on the wire
+per request and requests per second, and checks every body decodes to the
+same content.
+
+Usage: python benchmarks/bench_payloads.py [--quick]
+"""
+
+import gzip
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+ADVICE = json.dumps({'text': 'I need motivation for my project'})
+
+
+def measure(port, method, path, body, headers, duration):
+    """(bytes per request, requests per second, last decoded body)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    count = wire = 0
+    last = None
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        data = response.read()
+        if response.status not in (200, 304):
+            raise SystemExit(f"{path}: HTTP {response.status}")
+        wire += len(data)
+        if response.status == 200:
+            last = (response.getheader('Content-Encoding'), data)
+        count += 1
+    elapsed = time.perf_counter() - start
+    conn.close()
+    # Decoded once, outside the timing, so the client's gunzip does not count against the server
+    decoded = None
+    if last is not None:
+        decoded = gzip.decompress(last[1]) if last[0] == 'gzip' else last[1]
+    return wire / count, count / elapsed, decoded
+
+
+def etag_of(port, path, headers):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.getheader('ETag')
+
+
+def main():
+    duration = 1.0 if '--quick' in sys.argv else 3.0
+    with tempfile.TemporaryDirectory(prefix='bench-payloads-') as workdir:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'web_server.py'), '--port', '0'],
+            cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            env=dict(os.environ, PYTHONUNBUFFERED='1')
+        )
+        try:
+            for line in server.stdout:
+                match = re.search(r'running at http://[^:]+:(\d+)/', line)
+                if match:
+                    break
+            else:
+                raise RuntimeError("web server exited before it started listening")
+            threading.Thread(target=server.stdout.read, daemon=True).start()
+            port = int(match.group(1))
+
+            post = {'Content-Type': 'application/json'}
+            gz = {'Accept-Encoding': 'gzip'}
+            print(f"{'request':>22} {'client':>12} {'bytes/req':>10} {'req/s':>8}")
+            for name, method, path, body, base in [
+                ('page', 'GET', '/', None, {}),
+                ('sample prompts', 'GET', '/api/prompts', None, {}),
+                ('advice', 'POST', '/api/advice', ADVICE, post),
+                ('advice (streamed)', 'POST', '/api/advice/stream', ADVICE, post),
+            ]:
+                clients = [('identity', base), ('gzip', {**base, **gz})]
+                if method == 'GET':
+                    clients.append(('revalidate', {**gz, 'If-None-Match': etag_of(port, path, gz)}))
+                reference = None
+                for client, headers in clients:
+                    size, rps, decoded = measure(port, method, path, body, headers, duration)
+                    if decoded is not None and method == 'GET':
+                        reference = reference or decoded
+                        if decoded != reference:
+                            raise SystemExit(f"{path}: the {client} body differs")
+                    print(f"{name:>22} {client:>12} {size:>10.0f} {rps:>8.0f}")
+
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', '/api/stats')
+            stats = json.loads(conn.getresponse().read())['http']
+            conn.close()
+            print(f"Server: {stats['bytes_saved'] / 2**20:.1f} MB saved ({stats['saved_ratio']:.0%}), "
+                  f"{stats['not_modified_rate']:.0%} of page and prompt requests answered 304")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark - web server throughput with 1..N worker processes
+
+Starts web_server.py with a growing --processes and drives it with several
+client processes (so the load generator does not share one GIL either), each
+running keep-alive connections that carry a session id. A connection
+reconnects every 16 requests and keeps its session, so the kernel may hand it
+to another worker, which then forwards its requests to the session's owner
+(until the next new session, every 64 requests). Reports requests per
+second, latency, and the speed-up over one process. With --restart a
+multi-process server is sent SIGHUP halfway through each run. Any failed
+request fails the benchmark.
+
+Scaling needs free cores: on a machine with fewer cores than processes (plus
+the clients) the extra workers only add overhead.
+
+Usage: python benchmarks/bench_prefork.py [--quick] [--restart] [--processes 1,2,4]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+QUERIES = [
+    ('questions', 'What is the capital of France?'),
+    ('questions', 'Explain the eiffel tower'),
+    ('advice', 'study tips for my exam'),
+    ('advice', 'I need motivation for my project'),
+    ('creative', 'write a short story'),
+    ('summarize', 'Summarize in 3 lines: the meeting covered budgets, hiring and the roadmap.'),
+]
+
+
+def client(port, connections, duration, seed, results):
+    """One load-generating process: `connections` keep-alive connections for `duration` seconds"""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def connection(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        session = None
+        mine = []
+        i = seed * 1000 + index
+        while time.perf_counter() < deadline:
+            function, text = QUERIES[i % len(QUERIES)]
+            i += 1
+            body = {'text': text} if session is None else {'text': text, 'session': session}
+            start = time.perf_counter()
+            try:
+                for retry in (False, True):
+                    try:
+                        conn.request('POST', f'/api/{function}', json.dumps(body), {'Content-Type': 'application/json'})
+                        response = conn.getresponse()
+                        data = response.read()
+                        break
+                    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                        # The worker closed an idle keep-alive connection (restart); retry like a browser would
+                        conn.close()
+                        if retry:
+                            raise
+            except OSError as e:
+                with lock:
+                    failures.append(f"{type(e).__name__}: {e}")
+                break
+            if response.status != 200:
+                with lock:
+                    failures.append(f"HTTP {response.status}: {data[:100]!r}")
+                continue
+            mine.append(time.perf_counter() - start)
+            session = json.loads(data)['session'] if i % 64 else None
+            if not i % 16:
+                conn.close()   # the next request opens a new connection
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=connection, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, failures))
+
+
+def run(processes, clients, connections, duration, restart, workdir):
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'web_server.py'), '--port', '0', '--processes', str(processes)],
+        cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        env=dict(os.environ, PYTHONUNBUFFERED='1')
+    )
+    try:
+        for line in server.stdout:
+            match = re.search(r'running at http://[^:]+:(\d+)/', line)
+            if match:
+                break
+        else:
+            raise RuntimeError("web server exited before it started listening")
+        threading.Thread(target=server.stdout.read, daemon=True).start()
+        port = int(match.group(1))
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=client, args=(port, connections, duration, i, results))
+                   for i in range(clients)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        if restart and processes > 1:
+            time.sleep(duration / 2)
+            server.send_signal(signal.SIGHUP)
+        latencies, failures = [], []
+        for _ in workers:
+            mine, failed = results.get()
+            latencies.extend(mine)
+            failures.extend(failed)
+        elapsed = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+        if failures:
+            raise SystemExit(f"{len(failures)} failed requests with {processes} processes, e.g. {failures[0]}")
+        latencies.sort()
+        return len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Web server throughput with 1..N worker processes")
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--restart', action='store_true', help="SIGHUP the server halfway through each run")
+    parser.add_argument('--processes', default=None, help="comma-separated process counts (default: 1, 2, 4, ... cores)")
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    if args.processes:
+        counts = [int(count) for count in args.processes.split(',')]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cores:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != cores:
+            counts.append(cores)
+    duration = 2.0 if args.quick else 5.0
+    clients = max(2, min(cores, 8))
+
+    print(f"{cores} cores, {clients} client processes x 8 connections, {duration:g}s per run")
+    print(f"{'processes':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speed-up':>9}")
+    with tempfile.TemporaryDirectory(prefix='bench-prefork-') as workdir:
+        base = None
+        for processes in counts:
+            rps, p50, p95 = run(processes, clients, 8, duration, args.restart, workdir)
+            base = base or rps
+            print(f"{processes:>9} {rps:>9.0f} {p50:>8.2f} {p95:>8.2f} {rps / base:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark - session store memory, throughput and spill/restore speed
+
+Simulates many users each taking a few turns, with a memory budget that holds
+only a fraction of them, and reports:
+
+    turns/s          record_turn calls per second (turn generation included)
+    estimated MB     the store's own accounting of its sessions
+    measured MB      what tracemalloc sees allocated by the store
+    spill / restore  sessions per second through dump_session / load_session,
+                     next to the same sessions as JSON
+
+The timings include tracemalloc's overhead, so compare them with each other
+only. The spill directory of the last set-up is a temporary directory.
+
+Usage: python benchmarks/bench_sessions.py [--quick]
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sessions import FUNCTIONS, SessionStore, dump_session, load_session
+
+WORDS = ('plan study focus sleep budget save invest health habit career interview project team '
+         'deadline stress routine write poem story ocean mountain summary notes meeting').split()
+
+
+def turns(users, per_user, seed=7):
+    """(session id, function, query, response) in an interleaved order"""
+    rng = random.Random(seed)
+    order = [f'user-{u}' for u in range(users) for _ in range(per_user)]
+    rng.shuffle(order)
+    for session_id in order:
+        query = ' '.join(rng.choices(WORDS, k=rng.randint(4, 20)))
+        response = ' '.join(rng.choices(WORDS, k=rng.randint(40, 200)))
+        yield session_id, rng.choice(FUNCTIONS), query, response
+
+
+def fill(store, users, per_user):
+    """Record every turn; returns (turns per second, bytes tracemalloc attributes to the store)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for turn in turns(users, per_user):
+        store.record_turn(*turn)
+    elapsed = time.perf_counter() - start
+    measured = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return users * per_user / elapsed, measured
+
+
+def serialization(store, rounds):
+    """Sessions per second through the binary format and through JSON"""
+    sessions = list(store._sessions.values())
+    binary = [dump_session(session) for session in sessions]
+    as_json = [json.dumps({'id': s.id, 'turns': [t.to_dict() for t in s.turns]}) for s in sessions]
+
+    def rate(fn, items):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for item in items:
+                fn(item)
+        return len(items) * rounds / (time.perf_counter() - start)
+
+    return {
+        'binary': (rate(dump_session, sessions), rate(lambda d: load_session(d, store.max_turns), binary),
+                   sum(map(len, binary)) / len(binary)),
+        'json': (rate(lambda s: json.dumps({'id': s.id, 'turns': [t.to_dict() for t in s.turns]}), sessions),
+                 rate(json.loads, as_json), sum(len(j.encode('utf-8')) for j in as_json) / len(as_json)),
+    }
+
+
+def main():
+    quick = '--quick' in sys.argv
+    users = 5_000 if quick else 20_000
+    per_user = 4
+    budget = 8 * 1024 * 1024
+
+    print(f"{users} users x {per_user} turns, {budget // (1024 * 1024)} MB budget\n")
+    print(f"{'set-up':<12} {'turns/s':>9} {'sessions':>9} {'estimated MB':>13} {'measured MB':>12} "
+          f"{'evicted':>8} {'spilled':>8}")
+
+    unbounded = SessionStore(memory_budget=float('inf'))
+    rate, measured = fill(unbounded, users, per_user)
+    stats = unbounded.stats()
+    print(f"{'unbounded':<12} {rate:>9.0f} {stats['sessions']:>9} {stats['bytes'] / 2**20:>13.1f} "
+          f"{measured / 2**20:>12.1f} {stats['evicted']:>8} {stats['spilled']:>8}")
+
+    dropped = SessionStore(memory_budget=budget)
+    rate, measured = fill(dropped, users, per_user)
+    stats = dropped.stats()
+    print(f"{'budget':<12} {rate:>9.0f} {stats['sessions']:>9} {stats['bytes'] / 2**20:>13.1f} "
+          f"{measured / 2**20:>12.1f} {stats['evicted']:>8} {stats['spilled']:>8}")
+
+    spill_dir = tempfile.mkdtemp(prefix='bench-sessions-')
+    try:
+        spilled = SessionStore(memory_budget=budget, spill_dir=spill_dir)
+        rate, measured = fill(spilled, users, per_user)
+        stats = spilled.stats()
+        print(f"{'budget+disk':<12} {rate:>9.0f} {stats['sessions']:>9} {stats['bytes'] / 2**20:>13.1f} "
+              f"{measured / 2**20:>12.1f} {stats['evicted']:>8} {stats['spilled']:>8}  "
+              f"({stats['restored']} restored)")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"\n{'format':<8} {'dump/s':>9} {'load/s':>9} {'bytes/session':>14}")
+    for name, (dumps, loads, size) in serialization(dropped, 1 if quick else 3).items():
+        print(f"{name:<8} {dumps:>9.0f} {loads:>9.0f} {size:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark - ExtractiveSummarizer throughput and memory on growing documents
+
+Generates report-like prose from 10 KB to 16 MB and times the three summary
+modes. Peak memory is measured with tracemalloc in a separate pass (tracing
+slows NumPy-heavy code down, so it would distort the timings).
+
+Ranking is linear in the input: MB/s should stay roughly flat as documents
+grow, and peak memory should level off once documents span several blocks,
+since only one block plus the candidate pool is held at a time.
+
+Usage: python benchmarks/bench_summarizer.py [--quick]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from summarizer import ExtractiveSummarizer
+
+SUBJECTS = ['The council', 'The report', 'Local businesses', 'The transit agency', 'Residents',
+            'The committee', 'Regional planners', 'The school board', 'Hospital staff', 'Investors']
+VERBS = ['reported', 'noted', 'warned about', 'recommended', 'proposed', 'reviewed', 'questioned',
+         'welcomed', 'struggled with', 'should prioritise']
+OBJECTS = ['rising maintenance costs', 'delays on the northern line', 'a shortage of qualified staff',
+           'new cycling infrastructure', 'the budget shortfall', 'an expanded bus network',
+           'safety problems at busy intersections', 'investment in renewable energy',
+           'the lack of affordable housing', 'a five year improvement plan']
+TAILS = ['this quarter', 'despite strong opposition', 'after months of consultation', 'in the annual review',
+         'for the third year running', 'according to the latest survey', '', '']
+
+
+def make_document(size, rng):
+    """Generate sentences of report-like prose until the text is `size` characters"""
+    parts = []
+    total = 0
+    while total < size:
+        sentence = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(TAILS)}".rstrip()
+        sentence += '.\n\n' if rng.random() < 0.1 else '. '
+        parts.append(sentence)
+        total += len(sentence)
+    return ''.join(parts)[:size]
+
+
+def run_modes(summarizer, text):
+    summarizer.summarize(text, 3)
+    summarizer.key_points(text, 5)
+    summarizer.focus(text, 3)
+
+
+def main():
+    quick = '--quick' in sys.argv
+    rng = random.Random(7)
+    sizes = [10_000, 100_000, 1_000_000, 4_000_000, 16_000_000] if not quick else [10_000, 1_000_000]
+    summarizer = ExtractiveSummarizer()
+
+    print(f"{'input':>10} {'seconds':>9} {'MB/s':>7} {'peak MB':>9}")
+    print("-" * 38)
+    for size in sizes:
+        text = make_document(size, rng)
+
+        start = time.perf_counter()
+        run_modes(summarizer, text)
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        run_modes(summarizer, text)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Each pass reads the document three times, once per mode
+        rate = 3 * size / seconds / 1e6
+        print(f"{size:>10} {seconds:>9.2f} {rate:>7.2f} {peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
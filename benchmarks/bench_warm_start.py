@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark - cold vs. warm start of the routing tables and fuzzy matchers
+
+For the assistant's own route table and for synthetic tables of growing size
+(see bench_intent_router), times building an IntentRouter and its fuzzy
+matchers from scratch and saving the snapshot (cold), then loading a second
+router from that snapshot (warm). Both routers resolve the same sample
+queries, exact and misspelt, and must agree.
+
+Everything is written to a temporary directory.
+
+Usage: python benchmarks/bench_warm_start.py [--quick]
+"""
+
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ai_assistant import AIAssistant
+from bench_intent_router import make_keywords, make_routes
+from intent_router import IntentRouter
+from warm_start import SnapshotCache
+
+
+def start(routes, snapshots):
+    """Router plus all fuzzy matchers; returns (router, router ms, fuzzy ms)"""
+    gc.collect()   # so one run does not pay for collecting the previous run's garbage
+    begin = time.perf_counter()
+    router = IntentRouter(routes, AIAssistant.FUZZY_THRESHOLD, snapshots)
+    built = time.perf_counter()
+    for function in routes:
+        router.fuzzy_matcher(function)
+    return router, (built - begin) * 1000, (time.perf_counter() - built) * 1000
+
+
+def misspell(word, rng):
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def sample_queries(routes, rng):
+    keywords = sorted({keyword for entries in routes.values() for keyword in keywords_of(entries)})
+    picked = rng.sample(keywords, min(200, len(keywords)))
+    return [f'tell me about {k}' for k in picked] + [f'what is {misspell(k, rng)}' for k in picked if len(k) > 3]
+
+
+def keywords_of(entries):
+    for condition, target in entries:
+        yield from condition.get('any', ())
+        yield from condition.get('all', ())
+        if not isinstance(target, str):
+            yield from keywords_of(target)
+
+
+def main():
+    quick = '--quick' in sys.argv
+    rng = random.Random(7)
+    tables = [('assistant', AIAssistant.ROUTES)]
+    for count in ((1000,) if quick else (1000, 10_000, 40_000)):
+        tables.append((f'{count} keywords', make_routes(make_keywords(count, rng))))
+
+    directory = tempfile.mkdtemp(prefix='bench-warm-start-')
+    try:
+        print(f"{'routes':>16} {'cold router':>12} {'cold fuzzy':>11} {'warm router':>12} {'warm fuzzy':>11} "
+              f"{'snapshot MB':>12}")
+        for name, routes in tables:
+            path = os.path.join(directory, name.replace(' ', '-'))
+            cold, cold_router, cold_fuzzy = start(routes, SnapshotCache(path))
+            warm, warm_router, warm_fuzzy = start(routes, SnapshotCache(path))
+            for text in sample_queries(routes, rng):
+                for function in routes:
+                    if cold.resolve(function, text) != warm.resolve(function, text):
+                        raise SystemExit(f"warm router disagrees on {function}: {text!r}")
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            print(f"{name:>16} {cold_router:>10.1f}ms {cold_fuzzy:>9.1f}ms {warm_router:>10.1f}ms "
+                  f"{warm_fuzzy:>9.1f}ms {size / 2**20:>12.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Check - the assistant's routing against the original if/elif handlers
+
+Before the route table (see intent_router), each handler picked its response
+with a chain of `keyword in text.lower()` checks. Those chains are kept below
+as reference functions returning the intent they picked (None for the
+handler's default), and the assistant's router, fuzzy matching included, must
+pick the same intent for every query.
+
+The queries are random runs of 1-15 words drawn from every keyword, a few
+near misses and filler, 30% of them upper-cased, so they hit each branch,
+each nesting (the 50-character limit, 'all' keywords) and many queries that
+match nothing. None has a typo, so fuzzy matching must not change a single
+result. Each query is routed through all four functions: 20000 queries make
+the 80000 comparisons run before fuzzy routing was merged.
+
+Usage: python benchmarks/check_routing.py [--quick]
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ai_assistant import AIAssistant
+
+WORDS = ('capital of france paris explain significance eiffel tower compare education germany 3 lines '
+         'brief points list challenges recommendations story poem idea plot study exam motivation project '
+         'comparison what is the a an lorem ipsum').split()
+
+
+def original_questions(query):
+    query_lower = query.lower()
+    if len(query) < 50:
+        if "capital of france" in query_lower or "paris" in query_lower:
+            return 'capital_of_france'
+        elif "france" in query_lower:
+            return 'france'
+    elif "explain" in query_lower or "significance" in query_lower:
+        if "eiffel tower" in query_lower:
+            return 'eiffel_tower'
+    elif "compare" in query_lower and "education" in query_lower:
+        if "france" in query_lower and "germany" in query_lower:
+            return 'france_germany_education'
+    return None
+
+
+def original_summarize(text):
+    text_lower = text.lower()
+    if "3 lines" in text_lower or "brief" in text_lower:
+        return 'brief'
+    elif "points" in text_lower or "list" in text_lower:
+        return 'points'
+    elif "challenges" in text_lower or "recommendations" in text_lower:
+        return 'analytical'
+    return None
+
+
+def original_creative(prompt):
+    prompt_lower = prompt.lower()
+    if "story" in prompt_lower:
+        return 'story'
+    elif "poem" in prompt_lower:
+        return 'poem'
+    elif "idea" in prompt_lower or "plot" in prompt_lower:
+        return 'plots'
+    return None
+
+
+def original_advice(topic):
+    topic_lower = topic.lower()
+    if "study" in topic_lower or "exam" in topic_lower:
+        return 'study'
+    elif "motivation" in topic_lower or "project" in topic_lower:
+        return 'motivation'
+    else:
+        return 'wellness'
+
+
+ORIGINAL = {
+    'questions': original_questions,
+    'summarize': original_summarize,
+    'creative': original_creative,
+    'advice': original_advice,
+}
+
+
+def queries(count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        query = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 15)))
+        yield query.upper() if rng.random() < 0.3 else query
+
+
+def main():
+    count = 2_000 if '--quick' in sys.argv else 20_000
+    assistant = AIAssistant(load_stats=False)
+    checked, mismatches = 0, []
+    for query in queries(count):
+        for function, original in ORIGINAL.items():
+            expected = original(query) or 'default'
+            routed = assistant.intent_of(function, query)
+            if routed != expected:
+                mismatches.append((function, query, expected, routed))
+            checked += 1
+
+    for function, query, expected, routed in mismatches[:20]:
+        print(f"❌ {function}: {query!r} -> {routed} (was {expected})")
+    if mismatches:
+        print(f"\n❌ {len(mismatches)} of {checked} queries routed differently")
+        return 1
+    print(f"✅ {checked} queries ({count} x {len(ORIGINAL)} functions) routed as the original handlers did")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
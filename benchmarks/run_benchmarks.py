@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite - handlers, routing, persistence and the full request path
+
+Runs offline against synthetic query corpora, generated per function in four
+shapes:
+
+    short           a few words, sometimes with a routing keyword
+    long            a few hundred words of prose around a keyword
+    keyword_dense   nothing but routing keywords, in random order
+    no_match        near-miss words that share prefixes with keywords but
+                    contain none (worst case for routing: every word is
+                    misspelled, and some are typos the fuzzy matcher
+                    accepts; retrieval fallback for questions)
+
+and measures:
+
+    handler.<function>.<shape>.p50/p95/p99   handler latency, cache bypassed (µs)
+    routing.<shape>                          IntentRouter.resolve calls per second
+    dispatch.cached / dispatch.uncached      AIAssistant.dispatch calls per second
+    stats.load.<events> / stats.save.<events>  load_stats / save_stats with a journal of N events,
+                                             median of 5 rounds (ms)
+    http.rps / http.p50 / http.p95           POST /api/<function> against web_server.py
+    startup.import / startup.oneshot         cold `import ai_assistant` (-X importtime) and a whole
+                                             `ai_assistant.py --function advice --query ...` run (ms)
+
+Emulated latency is always off, so only the code itself is measured. Each
+run writes nothing outside a temporary directory.
+
+Results are compared against benchmarks/baseline.json, or
+benchmarks/baseline_quick.json with --quick (its smaller corpora and journals
+give different numbers); a metric that is worse than its baseline by more
+than --tolerance (default 30%) is a regression and the run exits with status
+1. Baselines are machine specific: regenerate them with --update-baseline
+(and --quick --update-baseline) on the machine that runs the comparison.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--output results.json]
+    python benchmarks/run_benchmarks.py [--quick] --update-baseline
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from ai_assistant import AIAssistant
+from response_cache import ResponseCache
+from stats_journal import StatsJournal
+from warm_start import SnapshotCache
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+QUICK_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_quick.json')
+FUNCTIONS = ('questions', 'summarize', 'creative', 'advice')
+SHAPES = ('short', 'long', 'keyword_dense', 'no_match')
+
+FILLER = """the a report team city people system plan market change history river
+morning project data result language energy travel music garden science
+weather family network health budget future design community""".split()
+
+
+def route_keywords(routes):
+    """Every keyword of a route table, per function"""
+    keywords = {}
+
+    def walk(function, rules):
+        for condition, target in rules:
+            for key in ('any', 'all'):
+                keywords[function].update(condition.get(key, ()))
+            if isinstance(target, list):
+                walk(function, target)
+
+    for function, rules in routes.items():
+        keywords[function] = set()
+        walk(function, rules)
+    return {function: sorted(words) for function, words in keywords.items()}
+
+
+def near_misses(keywords, rng, count):
+    """Words that share a prefix with a keyword but contain none of them"""
+    all_keywords = [k for words in keywords.values() for k in words]
+    misses = []
+    while len(misses) < count:
+        keyword = rng.choice(all_keywords).replace(' ', '')
+        word = keyword[:max(2, len(keyword) - 1)] + rng.choice('qxzj')
+        if not any(k in word for k in all_keywords):
+            misses.append(word)
+    return misses
+
+
+def make_corpus(function, shape, count, keywords, rng):
+    """`count` synthetic queries of one shape for one function"""
+    own = keywords[function]
+    misses = near_misses(keywords, rng, 200)
+    queries = []
+    for _ in range(count):
+        if shape == 'short':
+            words = rng.sample(FILLER, rng.randint(2, 5))
+            if rng.random() < 0.7:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(own))
+        elif shape == 'long':
+            words = [rng.choice(FILLER) for _ in range(rng.randint(200, 400))]
+            words.insert(rng.randrange(len(words)), rng.choice(own))
+        elif shape == 'keyword_dense':
+            words = [rng.choice(own) for _ in range(rng.randint(10, 40))]
+        else:
+            words = [rng.choice(misses) for _ in range(rng.randint(3, 30))]
+        text = ' '.join(words)
+        if shape == 'long' and function == 'summarize':
+            # A long summarize request carries its own document
+            sentences = re.findall(r'(?:\S+\s+){8,14}', text + ' ')
+            text = f"Summarize in 3 lines: {'. '.join(s.strip().capitalize() for s in sentences)}."
+        queries.append(text)
+    return queries
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    ordered = sorted(samples)
+    return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+
+class Suite:
+    def __init__(self, workdir, quick):
+        self.workdir = workdir
+        self.quick = quick
+        self.results = {}
+        self.rng = random.Random(1234)
+        self.keywords = route_keywords(AIAssistant.ROUTES)
+        self.corpora = {
+            (function, shape): make_corpus(function, shape, 60 if quick else 300, self.keywords, self.rng)
+            for function in FUNCTIONS for shape in SHAPES
+        }
+
+    def record(self, name, value, unit, better):
+        self.results[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+
+    def assistant(self, cache=None, journal=None):
+        from knowledge_base import KnowledgeBase, SEED_PATH
+        knowledge = KnowledgeBase(os.path.join(self.workdir, 'knowledge_index'))
+        knowledge.ensure_source(SEED_PATH)
+        snapshots = SnapshotCache(os.path.join(self.workdir, 'warm_start'))
+        assistant = AIAssistant(load_stats=False, cache=cache, knowledge=knowledge, snapshots=snapshots)
+        assistant.journal = journal  # load_stats=False leaves it unset; persistence benchmarks opt in
+        return assistant
+
+    def handlers(self):
+        assistant = self.assistant()
+        for function in FUNCTIONS:
+            handler = assistant.handlers[function]
+            for shape in SHAPES:
+                corpus = self.corpora[(function, shape)]
+                for text in corpus[:10]:  # warm lazy imports and catalog parsing
+                    handler(text)
+                # Best of a few rounds per query, to keep scheduler noise out of the tail
+                samples = [float('inf')] * len(corpus)
+                for _ in range(3):
+                    for i, text in enumerate(corpus):
+                        start = time.perf_counter()
+                        handler(text)
+                        samples[i] = min(samples[i], (time.perf_counter() - start) * 1e6)
+                for p, value in percentiles(samples).items():
+                    self.record(f'handler.{function}.{shape}.p{p}', value, 'us', 'lower')
+
+    def routing(self):
+        assistant = self.assistant()
+        repeat = 3 if self.quick else 10
+        for shape in SHAPES:
+            pairs = [(function, text) for function in FUNCTIONS for text in self.corpora[(function, shape)]]
+            for function, text in pairs:  # load the dictionary and fuzzy matchers outside the timing
+                assistant.router.resolve(function, text)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for function, text in pairs:
+                    assistant.router.resolve(function, text)
+            self.record(f'routing.{shape}', repeat * len(pairs) / (time.perf_counter() - start), 'ops/s', 'higher')
+
+    def dispatch(self):
+        mixed = [(function, text) for (function, shape), corpus in self.corpora.items()
+                 if shape != 'long' for text in corpus]
+        self.rng.shuffle(mixed)
+        # The cached run gets room for the whole mix, so the timed pass is all hits
+        for name, cache in (('cached', ResponseCache(max_entries=len(mixed))), ('uncached', ResponseCache(max_entries=0))):
+            assistant = self.assistant(cache=cache)
+            for function, text in mixed:  # first pass fills the cache
+                assistant.dispatch(function, text)
+            start = time.perf_counter()
+            for function, text in mixed:
+                assistant.dispatch(function, text)
+            self.record(f'dispatch.{name}', len(mixed) / (time.perf_counter() - start), 'ops/s', 'higher')
+
+    def persistence(self):
+        sizes = (1_000, 10_000) if self.quick else (1_000, 10_000, 100_000)
+        for events in sizes:
+            path = os.path.join(self.workdir, f'stats-{events}')
+            os.makedirs(path)
+            snapshot = os.path.join(path, 'ai_assistant_stats.json')
+            # A journal that never compacts on its own, so it really has `events` lines
+            writer = self.assistant(journal=StatsJournal(snapshot, sync_every=4096, compact_bytes=1 << 40))
+            for i in range(events):
+                writer.record_query(FUNCTIONS[i % len(FUNCTIONS)])
+            writer.journal.close()
+
+            # save_stats folds the journal into the snapshot, so every round works on a fresh copy
+            loads, saves = [], []
+            for attempt in range(5):
+                copy = shutil.copytree(path, f'{path}-{attempt}')
+                reader = self.assistant(journal=StatsJournal(os.path.join(copy, 'ai_assistant_stats.json'),
+                                                             compact_bytes=1 << 40))
+                start = time.perf_counter()
+                reader.load_stats()
+                loads.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                reader.save_stats()
+                saves.append((time.perf_counter() - start) * 1000)
+                reader.journal.close()
+            self.record(f'stats.load.{events}', statistics.median(loads), 'ms', 'lower')
+            self.record(f'stats.save.{events}', statistics.median(saves), 'ms', 'lower')
+
+    def http(self):
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, 'web_server.py'), '--port', '0'],
+            cwd=self.workdir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            env=dict(os.environ, PYTHONUNBUFFERED='1')
+        )
+        try:
+            for line in server.stdout:
+                match = re.search(r'running at http://[^:]+:(\d+)/', line)
+                if match:
+                    break
+            else:
+                raise RuntimeError("web server exited before it started listening")
+            port = int(match.group(1))
+            requests = [(function, text) for (function, shape), corpus in self.corpora.items()
+                        if shape in ('short', 'keyword_dense') for text in corpus]
+            duration = 1.0 if self.quick else 3.0
+            clients = 8
+            latencies = []
+            lock = threading.Lock()
+            deadline = time.perf_counter() + duration
+
+            def client(seed):
+                rng = random.Random(seed)
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                mine = []
+                while time.perf_counter() < deadline:
+                    function, text = rng.choice(requests)
+                    body = json.dumps({'text': text})
+                    start = time.perf_counter()
+                    conn.request('POST', f'/api/{function}', body, {'Content-Type': 'application/json'})
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status} for /api/{function}")
+                    mine.append((time.perf_counter() - start) * 1000)
+                conn.close()
+                with lock:
+                    latencies.extend(mine)
+
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            self.record('http.rps', len(latencies) / elapsed, 'req/s', 'higher')
+            for p, value in percentiles(latencies, (50, 95)).items():
+                self.record(f'http.p{p}', value, 'ms', 'lower')
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    def startup(self):
+        # Byte code goes to the temporary directory, and is written even under PYTHONDONTWRITEBYTECODE,
+        # so runs after the first never compile from source
+        env = dict(os.environ, PYTHONPATH=ROOT, PYTHONPYCACHEPREFIX=os.path.join(self.workdir, 'pycache'))
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        oneshot = [sys.executable, os.path.join(ROOT, 'ai_assistant.py'), '--function', 'advice', '--query', 'study tips']
+        imports, runs = [], []
+        for _ in range(6 if self.quick else 11):
+            output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ai_assistant'], cwd=self.workdir,
+                                    env=env, capture_output=True, text=True, check=True).stderr
+            imports.append(int(re.search(r'\|\s*(\d+) \| ai_assistant$', output, re.M).group(1)) / 1000)
+            start = time.perf_counter()
+            subprocess.run(oneshot, cwd=self.workdir, env=env, stdout=subprocess.DEVNULL, check=True)
+            runs.append((time.perf_counter() - start) * 1000)
+        # The first run may compile byte code; the best of the rest is start-up cost with the least noise
+        self.record('startup.import', min(imports[1:]), 'ms', 'lower')
+        self.record('startup.oneshot', min(runs[1:]), 'ms', 'lower')
+
+    def run(self, groups):
+        for group in groups:
+            print(f"⏱️  {group}...", file=sys.stderr)
+            getattr(self, group)()
+        return self.results
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline; returns the names of regressed metrics"""
+    regressions = []
+    print(f"{'metric':<40} {'value':>12} {'baseline':>12} {'change':>8}")
+    print("-" * 76)
+    for name, result in results.items():
+        value = result['value']
+        base = baseline.get(name, {}).get('value')
+        if base is None or base == 0:
+            print(f"{name:<40} {value:>12.3f} {'-':>12} {'':>8}")
+            continue
+        change = (value - base) / base
+        worse = change > tolerance if result['better'] == 'lower' else change < -tolerance
+        flag = '  ❌' if worse else ''
+        print(f"{name:<40} {value:>12.3f} {base:>12.3f} {change:>+7.0%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    groups = ('handlers', 'routing', 'dispatch', 'persistence', 'http', 'startup')
+    parser = argparse.ArgumentParser(description="AI Assistant benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="smaller corpora and shorter runs")
+    parser.add_argument('--only', choices=groups, action='append', help="run only these groups")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="baseline JSON to compare against (default: baseline.json, "
+                                           "or baseline_quick.json with --quick)")
+    parser.add_argument('--tolerance', type=float, default=0.3, help="allowed slowdown before failing (default 0.3)")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the baseline")
+    args = parser.parse_args(argv)
+    if args.baseline is None:
+        args.baseline = QUICK_BASELINE_PATH if args.quick else BASELINE_PATH
+
+    with tempfile.TemporaryDirectory(prefix='assistant-bench-') as workdir:
+        results = Suite(workdir, args.quick).run(args.only or groups)
+
+    report = {
+        'python': sys.version.split()[0],
+        'quick': args.quick,
+        'metrics': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        compare(results, {}, args.tolerance)
+        print(f"\n✅ Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = None
+    if stored is not None and stored.get('quick') != args.quick:
+        # Quick runs use smaller corpora and journals, so their numbers are not comparable
+        print(f"ℹ️  Baseline was recorded {'with' if stored.get('quick') else 'without'} --quick; not comparing")
+        stored = None
+    regressions = compare(results, stored['metrics'] if stored else {}, args.tolerance)
+    if stored is None:
+        print(f"\nℹ️  No comparable baseline at {args.baseline}; run with --update-baseline to create one")
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
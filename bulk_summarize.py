@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+AI Assistant - Bulk Summaries
+Summarizes every text and Markdown file under a directory, resumably.
+
+Each document is summarized with one of the summarize modes (brief, points
+or analytical, as in `Summarize in 3 lines: ...`) and written as one JSON line
+as soon as it is done:
+
+    {"job": {"root": "/data/reports", "mode": "brief", "count": 3, "version": 1}}
+    {"path": "2023/q1.md", "size": 48213, "mtime_ns": 1700000000000000000, "summary": "...", "seconds": 0.08}
+    {"path": "2023/empty.txt", "size": 0, "mtime_ns": ..., "error": "nothing to summarize"}
+
+Files are memory-mapped and decoded a chunk at a time, and the summarizer
+ranks sentences in blocks, so a large file is never held in memory as one
+string. Documents are spread over a process pool with a fixed number in
+flight, and results are written in the order they finish.
+
+The output file is also the checkpoint: lines are flushed as they are written
+and fsynced every second. Running the same command again skips every file
+that already has a line with its current size and modification time, and
+summarizes the rest; a file that changed gets a new line, which replaces the
+older one. Documents that failed (a read error, a file replaced while it
+was read) are tried again; only "nothing to summarize" is final. A line cut
+short by a crash is dropped. Use --restart to start over.
+
+Usage:
+    python bulk_summarize.py reports/ -o summaries.jsonl --mode points --count 5 --workers 8
+"""
+
+import argparse
+import codecs
+import json
+import mmap
+import os
+import re
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ai_assistant import AIAssistant
+
+FORMAT_VERSION = 1
+EXTENSIONS = ('.txt', '.md', '.markdown')
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+MODES = ('brief', 'points', 'analytical')
+CHUNK_BYTES = 1 << 20
+MAX_LINE_CHARS = 1 << 16
+# The one error that is a result rather than a failure, so resuming does not retry it
+NOTHING_TO_SUMMARIZE = "nothing to summarize"
+
+MARKDOWN_FENCE = re.compile(r'\s*(```|~~~)')
+MARKDOWN_PREFIX = re.compile(r'\s*(?:#{1,6}\s+|>\s?)+')
+MARKDOWN_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+MARKDOWN_EMPHASIS = re.compile(r'(\*\*|__|`)')
+
+_worker_assistant = None
+
+
+def _init_worker():
+    """Build one assistant per worker process; Ctrl-C is handled by the parent"""
+    global _worker_assistant
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_assistant = AIAssistant(load_stats=False)
+
+
+def read_text(path, chunk_bytes=CHUNK_BYTES):
+    """Yield a file's text a chunk at a time, decoded from a memory map"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+            for start in range(0, size, chunk_bytes):
+                text = decoder.decode(data[start:start + chunk_bytes])
+                if hasattr(mmap, 'MADV_DONTNEED'):
+                    # Read pages would otherwise stay mapped and count towards RSS until the file is closed
+                    data.madvise(mmap.MADV_DONTNEED, start, min(chunk_bytes, size - start))
+                yield text
+            yield decoder.decode(b'', final=True)
+
+
+def _inline_text(line):
+    return MARKDOWN_EMPHASIS.sub('', MARKDOWN_LINK.sub(r'\1', line))
+
+
+def markdown_to_text(chunks, max_line=MAX_LINE_CHARS):
+    """Strip Markdown markup (headings, quotes, links, emphasis, code blocks) from text chunks
+
+    A line longer than max_line is passed on in pieces, so a file without
+    line breaks is never held whole.
+    """
+    carry = ''
+    in_fence = False
+    continued = False    # carry is the rest of a line whose start was already passed on
+    fence_line = False   # ... and that line opened or closed a code block
+
+    def convert(line, line_start):
+        nonlocal in_fence, fence_line
+        if not line_start:
+            return None if in_fence or fence_line else _inline_text(line)
+        fence_line = bool(MARKDOWN_FENCE.match(line))
+        if fence_line:
+            in_fence = not in_fence
+            return None
+        return None if in_fence else _inline_text(MARKDOWN_PREFIX.sub('', line, count=1))
+
+    for chunk in chunks:
+        lines = (carry + chunk).split('\n')
+        carry = lines.pop()
+        out = []
+        for line in lines:
+            text = convert(line, not continued)
+            continued = False
+            if text is not None:
+                out.append(text + '\n')
+        if len(carry) > max_line:
+            text = convert(carry, not continued)
+            continued = True
+            carry = ''
+            if text is not None:
+                out.append(text)
+        if out:
+            yield ''.join(out)
+    if carry:
+        text = convert(carry, not continued)
+        if text is not None:
+            yield text
+
+
+def summarize_file(root, path, mode, count, assistant=None):
+    """Summarize one document; returns its output record"""
+    assistant = assistant or _worker_assistant
+    full_path = os.path.join(root, path)
+    record = {'path': path}
+    start = time.perf_counter()
+    try:
+        status = os.stat(full_path)
+        record['size'] = status.st_size
+        record['mtime_ns'] = status.st_mtime_ns
+        text = read_text(full_path)
+        if path.lower().endswith(MARKDOWN_EXTENSIONS):
+            text = markdown_to_text(text)
+        summary = assistant.summarize_document(mode, '', text, count=count)
+        if summary:
+            record['summary'] = summary
+        else:
+            record['error'] = NOTHING_TO_SUMMARIZE
+    except Exception as e:
+        record['error'] = str(e)
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def find_documents(root, extensions=EXTENSIONS):
+    """Yield (path relative to root, size) of every document under root, in a stable order"""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if name.lower().endswith(extensions) and not name.startswith('.'):
+                full_path = os.path.join(directory, name)
+                try:
+                    size = os.path.getsize(full_path)
+                except OSError:
+                    continue
+                yield os.path.relpath(full_path, root).replace(os.sep, '/'), size
+
+
+def load_checkpoint(output, job):
+    """Read the records of an earlier run; returns {path: (size, mtime_ns)} of the finished ones
+
+    Documents whose last record is a failure are left out, so they are tried
+    again. A torn last line is cut off. Raises ValueError if the file was written
+    by a job with other settings.
+    """
+    done = {}
+    good_bytes = 0
+    with open(output, 'rb') as f:
+        for number, line in enumerate(f):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if number == 0:
+                if record.get('job') != job:
+                    raise ValueError(f"{output} was written by another job ({record.get('job')}); "
+                                     "use --restart or another output file")
+            elif 'path' in record:
+                if record.get('error', NOTHING_TO_SUMMARIZE) == NOTHING_TO_SUMMARIZE:
+                    done[record['path']] = (record.get('size'), record.get('mtime_ns'))
+                else:
+                    done.pop(record['path'], None)
+            good_bytes += len(line)
+    if good_bytes != os.path.getsize(output):
+        with open(output, 'r+b') as f:
+            f.truncate(good_bytes)
+    return done
+
+
+class Checkpoint:
+    """Appends records to the output file, fsyncing at most every `sync_interval` seconds"""
+
+    def __init__(self, output, job, restart, sync_interval=1.0):
+        self.sync_interval = sync_interval
+        self.done = {}
+        self._synced = time.monotonic()
+        if not restart and os.path.exists(output) and os.path.getsize(output):
+            self.done = load_checkpoint(output, job)
+            self.file = open(output, 'a', encoding='utf-8')
+        else:
+            self.file = open(output, 'w', encoding='utf-8')
+            self.write({'job': job})
+            self.sync()
+
+    def is_done(self, path, full_path):
+        if path not in self.done:
+            return False
+        try:
+            status = os.stat(full_path)
+        except OSError:
+            return False
+        return self.done[path] == (status.st_size, status.st_mtime_ns)
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        if time.monotonic() - self._synced >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._synced = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+def run_job(root, output, mode='brief', count=3, workers=None, restart=False, extensions=EXTENSIONS,
+            max_in_flight=None, progress_interval=5.0):
+    """Summarize every document under root into output, skipping ones done by an earlier run; returns a summary"""
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise ValueError(f"{root} is not a directory")
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    job = {'root': root, 'mode': mode, 'count': count, 'version': FORMAT_VERSION}
+    checkpoint = Checkpoint(output, job, restart)
+
+    documents = list(find_documents(root, extensions))
+    todo = [(path, size) for path, size in documents if not checkpoint.is_done(path, os.path.join(root, path))]
+    summary = {'documents': len(documents), 'skipped': len(documents) - len(todo), 'summarized': 0,
+               'errors': 0, 'bytes': 0, 'interrupted': False}
+    if summary['skipped']:
+        print(f"↩️  Resuming: {summary['skipped']} of {len(documents)} documents already done", file=sys.stderr)
+    total_bytes = sum(size for _, size in todo)
+    start_time = last_report = time.perf_counter()
+
+    def write(record):
+        nonlocal last_report
+        checkpoint.write(record)
+        summary['summarized'] += 1
+        summary['errors'] += 'error' in record
+        summary['bytes'] += record.get('size') or 0
+        now = time.perf_counter()
+        if now - last_report >= progress_interval:
+            last_report = now
+            rate = summary['bytes'] / (now - start_time)
+            eta = (total_bytes - summary['bytes']) / rate if rate else 0
+            print(f"📄 {summary['summarized']}/{len(todo)} documents, {rate / 2**20:.1f} MB/s, "
+                  f"about {eta / 60:.0f} min left", file=sys.stderr)
+
+    try:
+        if workers == 1:
+            assistant = AIAssistant(load_stats=False)
+            for path, _ in todo:
+                write(summarize_file(root, path, mode, count, assistant))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                try:
+                    pending = set()
+                    for path, _ in todo:
+                        if len(pending) >= max_in_flight:
+                            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                write(future.result())
+                        pending.add(pool.submit(summarize_file, root, path, mode, count))
+                    while pending:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            write(future.result())
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+    except KeyboardInterrupt:
+        summary['interrupted'] = True
+    finally:
+        checkpoint.close()
+
+    summary['elapsed'] = time.perf_counter() - start_time
+    summary['mb_per_second'] = summary['bytes'] / 2**20 / summary['elapsed'] if summary['elapsed'] > 0 else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize every text and Markdown file under a directory")
+    parser.add_argument('root', help="directory to summarize (searched recursively)")
+    parser.add_argument('-o', '--output', default='summaries.jsonl',
+                        help="JSONL output, also the checkpoint to resume from (default: summaries.jsonl)")
+    parser.add_argument('--mode', choices=MODES, default='brief', help="summary style (default: brief)")
+    parser.add_argument('--count', type=int, default=3, help="lines or points per summary, 1-10 (default: 3)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--ext', default=','.join(EXTENSIONS),
+                        help=f"file extensions to include (default: {','.join(EXTENSIONS)})")
+    parser.add_argument('--restart', action='store_true', help="ignore an earlier run and start over")
+    args = parser.parse_args(argv)
+    if not 1 <= args.count <= 10:
+        parser.error("--count must be between 1 and 10")
+    extensions = tuple('.' + ext.strip().lstrip('.').lower() for ext in args.ext.split(',') if ext.strip())
+
+    try:
+        summary = run_job(args.root, args.output, args.mode, args.count, args.workers, args.restart, extensions)
+    except ValueError as e:
+        parser.error(str(e))
+
+    done = summary['skipped'] + summary['summarized']
+    print(f"📊 Summarized {summary['summarized']} documents ({summary['errors']} errors, {summary['skipped']} "
+          f"from an earlier run) in {summary['elapsed']:.2f}s - {summary['mb_per_second']:.1f} MB/s",
+          file=sys.stderr)
+    if summary['interrupted']:
+        print(f"⏸️  Interrupted with {done} of {summary['documents']} documents done; "
+              "run the same command again to resume", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Event Store - every query and piece of feedback, in columnar files
+
+Each event is one row across a set of fixed-width column files, so reports
+are vectorized scans over memory-mapped arrays instead of parsing logs:
+
+    ai_assistant_events/
+        ts.f8          event time (Unix seconds, float64)
+        kind.u1        0 query, 1 feedback
+        function.u1    index into FUNCTIONS (255 unknown)
+        intent.u2      index into intents.json
+        latency.f4     seconds to answer a query (NaN for feedback)
+        helpful.i1     1 helpful, -1 not helpful, 0 for queries
+        intents.json   intent names, append-only
+        comments.jsonl free-text feedback ({"ts", "function", "intent", "comment"})
+
+A row takes 17 bytes, so ten million events are 170 MB and a report over them
+takes about a second.
+
+Events are buffered and appended in batches (every `flush_every` events or
+`flush_interval` seconds) under the same kind of file lock as the stats
+journal, so several processes can share a store. A crash mid-append can leave
+the columns at different lengths; the next append trims them back to the last
+complete row. Recording needs only the standard library; reports need NumPy.
+
+    python event_store.py report [--dir ai_assistant_events] [--top 10] [--days 14]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+
+from stats_journal import FileLock
+
+FUNCTIONS = ('questions', 'summarize', 'creative', 'advice')
+FUNCTION_CODES = {name: code for code, name in enumerate(FUNCTIONS)}
+UNKNOWN_FUNCTION = 255
+
+QUERY, FEEDBACK = 0, 1
+
+# name, array typecode, NumPy dtype (also the file suffix)
+COLUMNS = (
+    ('ts', 'd', '<f8'),
+    ('kind', 'B', 'u1'),
+    ('function', 'B', 'u1'),
+    ('intent', 'H', '<u2'),
+    ('latency', 'f', '<f4'),
+    ('helpful', 'b', 'i1'),
+)
+
+# Latency histogram used for percentiles: 5% wide buckets from 10 µs up
+LATENCY_FLOOR = 1e-5
+LATENCY_STEP = 1.05
+LATENCY_BUCKETS = 400
+
+# comments() reads comments.jsonl backwards in blocks of this size
+TAIL_BLOCK = 1 << 16
+
+
+class EventStore:
+    def __init__(self, directory='ai_assistant_events', flush_every=256, flush_interval=1.0):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.lock_path = os.path.join(directory, 'events.lock')
+        self._pending = []
+        self._pending_since = None
+        self._intent_ids = {}
+        self._intents = []
+        self._intents_size = -1
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._closed = threading.Event()
+        atexit.register(self.close)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _column_path(self, name, dtype):
+        return self._path(f"{name}.{dtype.lstrip('<')}")
+
+    # -- writing -------------------------------------------------------------
+
+    def record_query(self, function, intent, latency=None):
+        """Queue one answered query"""
+        self._record((time.time(), QUERY, function, intent, float('nan') if latency is None else latency, 0, None))
+
+    def record_feedback(self, function, intent, helpful, comment=None):
+        """Queue one piece of feedback on a response (function and intent may be unknown)"""
+        self._record((time.time(), FEEDBACK, function, intent, float('nan'), 1 if helpful else -1, comment or None))
+
+    def _record(self, event):
+        with self._lock:
+            self._pending.append(event)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            due = len(self._pending) >= self.flush_every
+        if due:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        """Start the background thread that flushes batches older than flush_interval"""
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._flush_loop, name='event-store', daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                due = self._pending_since is not None and time.monotonic() - self._pending_since >= self.flush_interval
+            if due:
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"⚠️  Could not write events: {e}")
+
+    def _load_intents(self):
+        """Re-read intents.json if another process added names; caller holds the file lock"""
+        path = self._path('intents.json')
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        if size != self._intents_size:
+            if size:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._intents = json.load(f)
+            else:
+                self._intents = []
+            self._intent_ids = {name: i for i, name in enumerate(self._intents)}
+            self._intents_size = size
+
+    def _intent_id(self, name):
+        """Id of an intent name, adding it if new; caller holds the file lock"""
+        name = name or ''
+        intent_id = self._intent_ids.get(name)
+        if intent_id is None:
+            intent_id = self._intent_ids[name] = len(self._intents)
+            self._intents.append(name)
+        return intent_id
+
+    def _save_intents(self):
+        path = self._path('intents.json')
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._intents, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._intents_size = os.path.getsize(path)
+
+    def _complete_rows(self):
+        """Rows present in every column file"""
+        rows = None
+        for name, typecode, dtype in COLUMNS:
+            try:
+                size = os.path.getsize(self._column_path(name, dtype))
+            except FileNotFoundError:
+                size = 0
+            count = size // array(typecode).itemsize
+            rows = count if rows is None else min(rows, count)
+        return rows
+
+    def flush(self):
+        """Append buffered events to the column files"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = self._pending
+            self._pending = []
+            self._pending_since = None
+
+            os.makedirs(self.directory, exist_ok=True)
+            with FileLock(self.lock_path, exclusive=True):
+                self._load_intents()
+                known = len(self._intents)
+                columns = {name: array(typecode) for name, typecode, _ in COLUMNS}
+                comments = []
+                for ts, kind, function, intent, latency, helpful, comment in batch:
+                    intent_id = self._intent_id(intent)
+                    function_code = FUNCTION_CODES.get(function, UNKNOWN_FUNCTION)
+                    columns['ts'].append(ts)
+                    columns['kind'].append(kind)
+                    columns['function'].append(function_code)
+                    columns['intent'].append(intent_id)
+                    columns['latency'].append(latency)
+                    columns['helpful'].append(helpful)
+                    if comment:
+                        comments.append({'ts': round(ts, 3), 'function': function, 'intent': intent,
+                                         'comment': comment})
+                if len(self._intents) != known:
+                    self._save_intents()
+
+                rows = self._complete_rows()
+                for name, _, dtype in COLUMNS:
+                    column = columns[name]
+                    if sys.byteorder == 'big':
+                        column.byteswap()
+                    with open(self._column_path(name, dtype), 'ab') as f:
+                        # Drop a torn row left by a crash in an earlier append
+                        if f.tell() != rows * column.itemsize:
+                            f.truncate(rows * column.itemsize)
+                        f.write(column.tobytes())
+                if comments:
+                    with open(self._path('comments.jsonl'), 'a', encoding='utf-8') as f:
+                        f.writelines(json.dumps(c, ensure_ascii=False) + '\n' for c in comments)
+
+    def close(self):
+        """Flush anything buffered and stop the background flusher"""
+        self._closed.set()
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"⚠️  Could not write events: {e}")
+
+    # -- reading -------------------------------------------------------------
+
+    def columns(self):
+        """Memory-mapped NumPy arrays of every complete row, plus the intent names"""
+        import numpy as np
+
+        self.flush()
+        rows, intents = 0, []
+        if os.path.isdir(self.directory):
+            with FileLock(self.lock_path, exclusive=False):
+                rows = self._complete_rows()
+                self._load_intents()
+                intents = list(self._intents)
+        data = {}
+        for name, _, dtype in COLUMNS:
+            if rows:
+                data[name] = np.memmap(self._column_path(name, dtype), dtype=dtype, mode='r', shape=(rows,))
+            else:
+                data[name] = np.zeros(0, dtype=dtype)
+        return data, intents
+
+    def report(self, top=10, days=14):
+        """Aggregate the events: satisfaction per intent and per day, and the slowest intents"""
+        import numpy as np
+
+        data, intents = self.columns()
+        kind = data['kind']
+        rows = len(kind)
+        # Outcome of each event: 0 query, 1 helpful, 2 not helpful
+        outcome = kind + (data['helpful'] < 0).view(np.uint8)
+
+        # One group per (function, intent)
+        n_intents = max(1, len(intents))
+        group = data['function'].astype(np.int32) * n_intents + data['intent']
+        n_groups = (UNKNOWN_FUNCTION + 1) * n_intents
+
+        def group_name(index):
+            function, intent = divmod(int(index), n_intents)
+            return (FUNCTIONS[function] if function < len(FUNCTIONS) else 'unknown',
+                    intents[intent] if intent < len(intents) else '')
+
+        counts = np.bincount(group * 3 + outcome, minlength=n_groups * 3).reshape(n_groups, 3)
+        asked, liked, disliked = counts[:, 0], counts[:, 1], counts[:, 2]
+        rated = np.flatnonzero(liked + disliked)
+        satisfaction = liked[rated] / (liked[rated] + disliked[rated])
+        order = np.lexsort((-(liked[rated] + disliked[rated]), satisfaction))[:top]
+        by_intent = [
+            dict(zip(('function', 'intent'), group_name(rated[i])), queries=int(asked[rated[i]]),
+                 helpful=int(liked[rated[i]]), not_helpful=int(disliked[rated[i]]),
+                 satisfaction=round(float(satisfaction[i]) * 100, 1))
+            for i in order
+        ]
+
+        # Local calendar days, counted from the first event
+        by_day = []
+        if rows:
+            offset = time.localtime().tm_gmtoff
+            day = ((data['ts'] + offset) * (1 / 86400)).astype(np.int32)
+            first = int(day.min())
+            day -= first
+            day_counts = np.bincount(day * 3 + outcome, minlength=(int(day.max()) + 1) * 3).reshape(-1, 3)
+            for d in np.flatnonzero(day_counts.sum(axis=1))[-days:]:
+                queries, helpful, not_helpful = (int(n) for n in day_counts[d])
+                by_day.append({
+                    'day': time.strftime('%Y-%m-%d', time.gmtime((first + int(d)) * 86400)),
+                    'queries': queries,
+                    'helpful': helpful,
+                    'not_helpful': not_helpful,
+                    'satisfaction': round(helpful / (helpful + not_helpful) * 100, 1) if helpful + not_helpful else None
+                })
+
+        # Latency per group: mean from sums, p95 from a log-bucketed histogram
+        latency = data['latency']
+        timed = (kind == QUERY) & ~np.isnan(latency)
+        timed_group = group[timed]
+        timed_latency = latency[timed]
+        slowest = []
+        if len(timed_latency):
+            count = np.bincount(timed_group, minlength=n_groups)
+            total = np.bincount(timed_group, weights=timed_latency, minlength=n_groups)
+            bucket = (np.log(np.maximum(timed_latency, np.float32(LATENCY_FLOOR))) - np.float32(np.log(LATENCY_FLOOR))) \
+                * np.float32(1 / np.log(LATENCY_STEP))
+            bucket = np.minimum(bucket.astype(np.int32), LATENCY_BUCKETS - 1)
+            present = np.flatnonzero(count)
+            local = np.zeros(n_groups, dtype=np.int32)
+            local[present] = np.arange(len(present))
+            histogram = np.bincount(local[timed_group] * LATENCY_BUCKETS + bucket,
+                                    minlength=len(present) * LATENCY_BUCKETS).reshape(len(present), LATENCY_BUCKETS)
+            cumulative = np.cumsum(histogram, axis=1)
+            p95_bucket = (cumulative < 0.95 * count[present][:, None]).sum(axis=1)
+            p95 = LATENCY_FLOOR * LATENCY_STEP ** (p95_bucket + 1)
+            for i in np.argsort(-p95, kind='stable')[:top]:
+                g = present[i]
+                slowest.append(dict(zip(('function', 'intent'), group_name(g)), queries=int(count[g]),
+                                    avg_ms=round(float(total[g] / count[g]) * 1000, 2),
+                                    p95_ms=round(float(p95[i]) * 1000, 2)))
+
+        return {'events': int(rows), 'by_intent': by_intent, 'by_day': by_day, 'slowest': slowest}
+
+    def comments(self, limit=10):
+        """The most recent free-text feedback, newest last (reads only the end of the file)"""
+        self.flush()
+        if limit <= 0:
+            return []
+        try:
+            with open(self._path('comments.jsonl'), 'rb') as f:
+                position = f.seek(0, os.SEEK_END)
+                tail = b''
+                # One newline more than `limit`, so the first line kept is whole
+                while position and tail.count(b'\n') <= limit:
+                    step = min(TAIL_BLOCK, position)
+                    position -= step
+                    f.seek(position)
+                    tail = f.read(step) + tail
+        except FileNotFoundError:
+            return []
+        lines = tail.split(b'\n')
+        if position:
+            del lines[0]
+        comments = []
+        for line in lines[-limit - 1:]:
+            if not line:
+                continue
+            try:
+                comments.append(json.loads(line))
+            except ValueError:
+                continue  # a line torn by a crash
+        return comments[-limit:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reports over the AI Assistant's event store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    report = commands.add_parser('report', help="print satisfaction and latency aggregates as JSON")
+    report.add_argument('--dir', default='ai_assistant_events')
+    report.add_argument('--top', type=int, default=10, help="rows per ranking (default: 10)")
+    report.add_argument('--days', type=int, default=14, help="most recent days to show (default: 14)")
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.dir)
+    start = time.perf_counter()
+    result = store.report(args.top, args.days)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Fuzzy Matcher - typo-tolerant phrase matching over character n-gram vectors
+
+Every known phrase (a routing keyword such as 'capital of france', or several
+keywords that must all be present, labelled with an intent) is turned into a
+vector of the character bigrams of its words, padded with spaces so word
+starts and ends count:
+
+    'study'  ->  ' s', 'st', 'tu', 'ud', 'dy', 'y '
+
+The vectors are stacked once into a NumPy matrix with one row per bigram and
+one column per phrase. A query is matched in two steps:
+
+1. Candidates: the rows of the query's bigrams are summed, which scores the
+   query against every phrase at once (cosine similarity of the bigram sets);
+   the best `candidates` phrases go on to step 2.
+2. Verification: every keyword of a candidate phrase must be found in the
+   query, its words in order and next to each other. A word matches a query
+   word that contains it (like exact routing) with similarity 1, or a typo of
+   it with similarity 1 - distance / length. A phrase's confidence is that of
+   its worst word; phrases below `threshold` are rejected.
+
+A typo of a word of SWAP_ONLY_LENGTH letters or fewer may only swap two
+neighbouring letters ('frnace', 'peom'); one changed letter in a short word
+is too often another word ('fiance', 'prance'). Longer words allow one edit
+(insertion, deletion, substitution or swap) per LETTERS_PER_EDIT letters. A
+query word found in the matcher's `dictionary` is spelled correctly, so it
+only matches words it contains: 'stormy' is not a typo of 'story'.
+dictionary() loads the English word list in data/words.txt.gz (lowercase
+words of the US, UK, Canadian, Australian and New Zealand spelling
+dictionaries shipped with Vim).
+
+Step 1 costs one gather and sum over a few dozen rows, so it stays well under
+a millisecond for ten thousand phrases; step 2 only looks at a handful.
+
+    matcher = FuzzyMatcher([('capital of france', 'capital_of_france'), ('study', 'study')])
+    matcher.match('captial of frnace')   ->  ('capital_of_france', 0.83)
+"""
+
+import functools
+import os
+import re
+
+WORD = re.compile(r'\w+')
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'words.txt.gz')
+
+SWAP_ONLY_LENGTH = 6   # words this short only match a typo that swaps two neighbouring letters
+LETTERS_PER_EDIT = 7   # longer words allow one edit per this many letters
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+@functools.lru_cache(maxsize=65536)
+def bigrams(word):
+    padded = f' {word} '
+    return frozenset(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+@functools.lru_cache(maxsize=None)
+def dictionary(path=DICTIONARY_PATH):
+    """Correctly spelled words, one per line in a gzipped text file"""
+    import gzip
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return frozenset(f.read().split())
+
+
+def is_swap(a, b):
+    """Whether b is a with two neighbouring letters swapped"""
+    if len(a) != len(b):
+        return False
+    diff = [i for i in range(len(a)) if a[i] != b[i]]
+    return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+# Query words repeat a lot, so word-pair similarities are remembered across queries
+@functools.lru_cache(maxsize=65536)
+def similarity(word, query_word, threshold):
+    """Similarity of a phrase word to a query word: 1 if contained, 1 - edit distance / length for a typo, else 0"""
+    if word in query_word:
+        return 1.0
+    longest = max(len(word), len(query_word))
+    if len(word) <= SWAP_ONLY_LENGTH:
+        return 1 - 1 / longest if is_swap(word, query_word) else 0.0
+    limit = min(int(longest * (1 - threshold)), len(word) // LETTERS_PER_EDIT)
+    if not limit:
+        return 0.0
+    # Each edit breaks at most three of word's bigrams, so most words are ruled out without the DP
+    grams = bigrams(word)
+    if len(grams & bigrams(query_word)) < len(grams) - 3 * limit:
+        return 0.0
+    distance = edit_distance(word, query_word, limit)
+    return 1 - distance / longest if distance <= limit else 0.0
+
+
+class FuzzyMatcher:
+    def __init__(self, phrases, threshold=0.75, candidates=8, dictionary=frozenset()):
+        """phrases: (phrase, label) pairs; a phrase is a keyword or a tuple of keywords
+
+        A label may have several phrases. Query words in `dictionary` are never
+        taken for typos.
+        """
+        import numpy as np
+
+        self.threshold = threshold
+        self.candidates = candidates
+        self.dictionary = dictionary
+        self.phrases = []
+        self.labels = []
+        self._keywords = []
+        self._vocabulary = {}
+        columns = []
+        for phrase, label in phrases:
+            keywords = tuple(filter(None, (tuple(words(keyword)) for keyword in
+                                           ((phrase,) if isinstance(phrase, str) else phrase))))
+            if not keywords:
+                raise ValueError(f"phrase {phrase!r} has no words")
+            grams = set().union(*(bigrams(word) for keyword in keywords for word in keyword))
+            columns.append([self._vocabulary.setdefault(gram, len(self._vocabulary)) for gram in grams])
+            self.phrases.append(phrase)
+            self.labels.append(label)
+            self._keywords.append(keywords)
+
+        # One row per bigram, so a query only touches the rows of its own bigrams
+        self._matrix = np.zeros((len(self._vocabulary), len(columns)), dtype=np.uint8)
+        for column, rows in enumerate(columns):
+            self._matrix[rows, column] = 1
+        sizes = np.array([len(rows) for rows in columns], dtype=np.float32)
+        self._norms = np.sqrt(sizes)
+        # A phrase shares at most its own bigrams with a query, so counts of small phrases fit in a byte
+        self._count_dtype = np.uint8 if sizes.max(initial=0) < 256 else np.uint16
+        self._np = np
+
+    def snapshot(self):
+        """(state, arrays) from which restore() rebuilds this matcher (see warm_start)"""
+        state = {
+            'threshold': self.threshold,
+            'candidates': self.candidates,
+            'phrases': self.phrases,
+            'labels': self.labels,
+            'keywords': self._keywords,
+            'vocabulary': list(self._vocabulary),
+            'count_dtype': self._np.dtype(self._count_dtype).name,
+        }
+        return state, {'matrix': self._matrix, 'norms': self._norms}
+
+    @classmethod
+    def restore(cls, state, arrays, dictionary=frozenset()):
+        """A matcher from snapshot(); the arrays may be memory-mapped"""
+        import numpy as np
+
+        self = cls.__new__(cls)
+        self.threshold = state['threshold']
+        self.candidates = state['candidates']
+        self.dictionary = dictionary
+        self.phrases = [phrase if isinstance(phrase, str) else tuple(phrase) for phrase in state['phrases']]
+        self.labels = state['labels']
+        self._keywords = [tuple(tuple(keyword) for keyword in keywords) for keywords in state['keywords']]
+        self._vocabulary = {gram: row for row, gram in enumerate(state['vocabulary'])}
+        self._matrix = arrays['matrix']
+        self._norms = arrays['norms']
+        if self._matrix.shape != (len(self._vocabulary), len(self.phrases)):
+            raise ValueError("fuzzy matcher snapshot does not match its vocabulary")
+        self._count_dtype = np.dtype(state['count_dtype']).type
+        self._np = np
+        return self
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def scores(self, text):
+        """Cosine similarity of the query's bigrams to every phrase's, in one vectorized step"""
+        np = self._np
+        grams = set().union(*(bigrams(word) for word in set(words(text))))
+        rows = [self._vocabulary[gram] for gram in grams if gram in self._vocabulary]
+        if not rows or not self.phrases:
+            return np.zeros(len(self.phrases), dtype=np.float32)
+        shared = self._matrix[rows].sum(axis=0, dtype=self._count_dtype)
+        return shared / (self._norms * np.float32(len(grams) ** 0.5))
+
+    def word_similarity(self, word, query_word):
+        """Similarity of a phrase word to a query word (see similarity); dictionary words are never typos"""
+        if query_word in self.dictionary and word not in query_word:
+            return 0.0
+        return similarity(word, query_word, self.threshold)
+
+    def keyword_similarity(self, keyword, query_words, unique_words):
+        """Best similarity of a keyword to a run of query words"""
+        similarity = self.word_similarity
+        first = keyword[0]
+        if len(keyword) == 1:
+            return max((similarity(first, word) for word in unique_words), default=0.0)
+        # Only runs that start with a match for the first word are worth checking
+        starts = {word for word in unique_words if similarity(first, word) >= self.threshold}
+        best = 0.0
+        if starts:
+            for start in range(len(query_words) - len(keyword) + 1):
+                if query_words[start] in starts:
+                    run = zip(keyword, query_words[start:start + len(keyword)])
+                    best = max(best, min(similarity(word, query_word) for word, query_word in run))
+        return best
+
+    def match(self, text, mask=None):
+        """Return (label, confidence) of the best phrase found in text, or None
+
+        `mask` is an optional boolean array over the phrases; False rules a
+        phrase out. When it leaves no more than `candidates` phrases, they
+        are verified in order without scoring.
+        """
+        np = self._np
+        if mask is not None and np.count_nonzero(mask) <= self.candidates:
+            top = np.flatnonzero(mask)
+            scores = None
+        else:
+            scores = self.scores(text)
+            if mask is not None:
+                scores = np.where(mask, scores, 0)
+            count = min(self.candidates, len(scores))
+            if not count:
+                return None
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+        query_words = words(text)
+        unique_words = set(query_words)
+        best = None
+        for index in top:
+            if scores is not None and scores[index] <= 0:
+                break
+            confidence = 1.0
+            for keyword in self._keywords[index]:
+                confidence = min(confidence, self.keyword_similarity(keyword, query_words, unique_words))
+                if confidence < self.threshold:
+                    break
+            # Longer phrases win ties: 'capital of france' over 'france'
+            size = sum(map(len, self._keywords[index]))
+            if confidence >= self.threshold and (best is None or (confidence, size) > best[1:]):
+                best = (self.labels[index], confidence, size)
+        return best[:2] if best is not None else None
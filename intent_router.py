@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Intent Router - single-pass keyword routing for the AI Assistant handlers
+
+Every keyword used by every handler is compiled once into a trie, and the trie
+is turned into one regular expression. Scanning a query is then a single pass
+of the C regex engine over the text (the same job an Aho-Corasick automaton
+does), no matter how many keywords or handlers there are.
+
+Route tables are plain data. Each function maps to an ordered list of
+(condition, target) entries:
+
+    condition  dict with optional keys
+                 'any'        - at least one of these keywords is present
+                 'all'        - every one of these keywords is present
+                 'max_length' - the original query is shorter than this
+               an empty dict always matches
+    target     an intent name, or a nested list of entries
+
+The first entry whose condition matches wins. When the target is a nested
+list, the answer is resolved inside that list only; if nothing there matches
+the result is None (the handler's default), exactly like an if/elif block
+with nested ifs.
+
+With a `fuzzy_threshold`, routing also tolerates typos ("captial of frnace",
+"write a peom"). When a query's keywords lead to no intent and one of its
+words is misspelled (in neither the English dictionary nor the keywords),
+the keywords of every intent that could stand for one of the misspelled
+words are matched fuzzily (see fuzzy_matcher) and a confident match is
+returned instead. A rule list that ends in a catch-all
+entry always has an intent, so its default is never replaced by a guess. A
+fuzzy keyword stands for its whole intent: 'all' keywords on the way to the
+intent are required as well, 'max_length' limits still apply, and 'any'
+keywords on the way are not (so "the eiffle tower" finds eiffel_tower
+without "explain"). The matchers need NumPy and are built on first use; the
+dictionary is loaded on the first query that has no intent.
+
+With a `snapshots` cache (see warm_start), the compiled tables, including the
+regex engine's program, and each fuzzy matcher are saved after the first
+build and loaded by later routers with the same route table.
+"""
+
+import functools
+import re
+import threading
+
+from warm_start import compile_regex
+
+WORD = re.compile(r'\w+')   # as fuzzy_matcher splits words
+
+
+class IntentRouter:
+    def __init__(self, routes, fuzzy_threshold=None, snapshots=None):
+        self.routes = routes
+        self.fuzzy_threshold = fuzzy_threshold
+        self.snapshots = snapshots
+        self._fuzzy = {}
+        self._fuzzy_lock = threading.Lock()
+        self._spelled = None
+        self._phrase_words = {}
+        # Misspellings repeat, so what each one could stand for is remembered
+        self._typo_of = functools.lru_cache(maxsize=65536)(self._typo_of)
+
+        key = snapshots.key('router', routes, (__file__,)) if snapshots is not None else None
+        snapshot = snapshots.load('router', key) if snapshots is not None else None
+        if snapshot is not None:
+            try:
+                self._restore(*snapshot)
+                return
+            except (KeyError, TypeError, ValueError, IndexError):
+                pass   # unreadable snapshot: rebuild (and overwrite) it
+
+        self._keyword_ids = {}
+        self._keywords = []
+        self._compiled = {
+            function: self._compile_block(entries)
+            for function, entries in routes.items()
+        }
+        self._function_ids = {function: self._block_ids(rules) for function, rules in self._compiled.items()}
+        self._build_matcher()
+        if snapshots is not None:
+            snapshots.save('router', key, *self._snapshot())
+
+    def _snapshot(self):
+        """(state, arrays) from which _restore rebuilds this router"""
+        def rules_state(rules):
+            return [[max_length, sorted(any_ids), sorted(all_ids),
+                     target if isinstance(target, str) else rules_state(target)]
+                    for max_length, any_ids, all_ids, target in rules]
+
+        state = {
+            'keywords': self._keywords,
+            'compiled': {function: rules_state(rules) for function, rules in self._compiled.items()},
+            'function_ids': {function: sorted(ids) for function, ids in self._function_ids.items()},
+            'contains': [sorted(ids) for ids in self._contains],
+            'pattern': self._pattern.pattern if self._pattern is not None else None,
+        }
+        arrays = {}
+        if self._pattern_program is not None:
+            program, state['pattern_info'] = self._pattern_program
+            arrays['pattern_program'] = program
+        return state, arrays
+
+    def _restore(self, state, arrays):
+        def rules_from_state(rules):
+            return [(max_length, frozenset(any_ids), frozenset(all_ids),
+                     target if isinstance(target, str) else rules_from_state(target))
+                    for max_length, any_ids, all_ids, target in rules]
+
+        self._keywords = state['keywords']
+        self._keyword_ids = {keyword: i for i, keyword in enumerate(self._keywords)}
+        self._compiled = {function: rules_from_state(rules) for function, rules in state['compiled'].items()}
+        self._function_ids = {function: frozenset(ids) for function, ids in state['function_ids'].items()}
+        self._contains = [frozenset(ids) for ids in state['contains']]
+        self._pattern, self._pattern_program = None, None
+        if state['pattern'] is not None:
+            compiled = (arrays['pattern_program'], state['pattern_info']) if 'pattern_program' in arrays else None
+            self._pattern, self._pattern_program = compile_regex(state['pattern'], compiled)
+
+    def _keyword_id(self, keyword):
+        """Intern a keyword and return its id"""
+        keyword = keyword.lower()
+        if keyword not in self._keyword_ids:
+            self._keyword_ids[keyword] = len(self._keywords)
+            self._keywords.append(keyword)
+        return self._keyword_ids[keyword]
+
+    def _compile_block(self, entries):
+        """Turn a list of (condition, target) entries into id-based rules"""
+        compiled = []
+        for condition, target in entries:
+            any_ids = frozenset(self._keyword_id(k) for k in condition.get('any', ()))
+            all_ids = frozenset(self._keyword_id(k) for k in condition.get('all', ()))
+            max_length = condition.get('max_length')
+            if not isinstance(target, str):
+                target = self._compile_block(target)
+            compiled.append((max_length, any_ids, all_ids, target))
+        return compiled
+
+    def _block_ids(self, rules):
+        """Ids of every keyword used anywhere in a compiled rule list"""
+        ids = set()
+        for _, any_ids, all_ids, target in rules:
+            ids |= any_ids | all_ids
+            if not isinstance(target, str):
+                ids |= self._block_ids(target)
+        return frozenset(ids)
+
+    def _intent_phrases(self, entries, required=(), max_length=None):
+        """Yield (keywords, intent, max_length) for every keyword that leads to an intent"""
+        for condition, target in entries:
+            limit = condition.get('max_length')
+            if max_length is not None:
+                limit = max_length if limit is None else min(limit, max_length)
+            needed = tuple(required) + tuple(condition.get('all', ()))
+            if isinstance(target, str):
+                if condition.get('any'):
+                    for keyword in condition['any']:
+                        yield needed + (keyword,), target, limit
+                elif needed:
+                    yield needed, target, limit
+            else:
+                yield from self._intent_phrases(target, needed, limit)
+
+    def _build_matcher(self):
+        """Compile the keyword trie into a single regex plus containment sets"""
+        trie = {}
+        for keyword_id, keyword in enumerate(self._keywords):
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = keyword_id
+
+        # A zero-width lookahead reports the longest keyword starting at every
+        # position, so overlapping keywords are never skipped.
+        self._pattern, self._pattern_program = (
+            compile_regex('(?=(' + self._trie_to_regex(trie) + '))') if trie else (None, None)
+        )
+        self._trie = trie
+
+        # The longest match at a position hides shorter keywords that are
+        # contained in it, so each keyword carries every keyword inside it.
+        self._contains = [None] * len(self._keywords)
+        for keyword_id in sorted(range(len(self._keywords)), key=lambda i: len(self._keywords[i])):
+            self._contains[keyword_id] = self._contained_in(keyword_id)
+
+    def _trie_to_regex(self, node):
+        """Render a trie node as a regex that prefers the longest keyword"""
+        terminal = '' in node
+        branches = [re.escape(ch) + self._trie_to_regex(child)
+                    for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        if len(branches) == 1:
+            body = branches[0]
+            if terminal:
+                return '(?:' + body + ')?'
+            return body
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if terminal else body
+
+    def _contained_in(self, keyword_id):
+        """Ids of all keywords that occur inside the given keyword"""
+        keyword = self._keywords[keyword_id]
+        found = {keyword_id}
+
+        node = self._trie
+        for ch in keyword[:-1]:
+            node = node[ch]
+            if '' in node:
+                found.add(node[''])
+
+        for match in self._pattern.finditer(keyword, 1):
+            inner = self._keyword_ids[match.group(1)]
+            found |= self._contains[inner]
+        return frozenset(found)
+
+    def scan(self, text):
+        """Return the ids of every known keyword found in text, in one pass"""
+        found = set()
+        if self._pattern is None:
+            return found
+        seen = set()
+        keyword_ids = self._keyword_ids
+        contains = self._contains
+        for match in self._pattern.finditer(text.lower()):
+            keyword = match.group(1)
+            if keyword not in seen:
+                seen.add(keyword)
+                found |= contains[keyword_ids[keyword]]
+        return found
+
+    def keywords_in(self, text):
+        """Return the keywords found in text, for debugging route tables"""
+        return {self._keywords[i] for i in self.scan(text)}
+
+    def resolve(self, function, text, found=None):
+        """Return the intent for text under a function's rules, or None"""
+        if found is None:
+            found = self.scan(text)
+        intent = self._resolve_block(self._compiled[function], len(text), found)
+        if intent is None and self.fuzzy_threshold is not None:
+            typos = self.misspelled(text)
+            if typos:
+                candidates = self.fuzzy_candidates(function, text, typos)
+                if any(candidates):
+                    return self.resolve_fuzzy(function, text, candidates)
+        return intent
+
+    def misspelled(self, text):
+        """The words of text that are not numbers and in neither the dictionary nor the keywords"""
+        spelled = self._spelled or self.spelled_words()
+        # Splitting on whitespace is much cheaper than the regex, which only has to look at leftover punctuation
+        unknown = set(text.lower().split()).difference(spelled)
+        typos = {token for token in unknown if token.isalpha()}
+        for token in unknown.difference(typos):
+            typos.update(word for word in WORD.findall(token) if word not in spelled and not word.isdigit())
+        return typos
+
+    def spelled_words(self):
+        """Words never taken for typos: the dictionary (see fuzzy_matcher) and the keywords' words"""
+        if self._spelled is None:
+            from fuzzy_matcher import dictionary, words
+            self._spelled = dictionary() | {word for keyword in self._keywords for word in words(keyword)}
+        return self._spelled
+
+    def fuzzy_candidates(self, function, text, typos):
+        """For each fuzzy phrase of a function, whether its words are in text or misspelled among `typos`
+
+        At least one word must be misspelled: a phrase spelled out in full is
+        left to exact routing. This is a cheap superset of what the fuzzy
+        matcher accepts, so most queries never reach it.
+        """
+        phrases = self._phrase_words.get(function)
+        if phrases is None:
+            phrases = self._phrase_words[function] = self._function_phrase_words(function)
+        phrase_words, all_words = phrases
+        text = text.lower()
+        contained = {word for word in all_words if word in text}
+        covered = contained.union(*(self._typo_of(function, typo) for typo in typos))
+        return [covered.issuperset(words) and not contained.issuperset(words) for words in phrase_words]
+
+    def _function_phrase_words(self, function):
+        """(each fuzzy phrase's set of words, all of them)"""
+        from fuzzy_matcher import words
+        phrase_words = [frozenset(word for keyword in keywords for word in words(keyword))
+                        for keywords, _, _ in self._intent_phrases(self.routes[function])]
+        return phrase_words, frozenset().union(*phrase_words)
+
+    def _typo_of(self, function, typo):
+        """The function's keyword words that a misspelled query word could stand for"""
+        from fuzzy_matcher import similarity
+        threshold = self.fuzzy_threshold
+        return frozenset(word for word in self._phrase_words[function][1]
+                         if similarity(word, typo, threshold) >= threshold)
+
+    def fuzzy_matcher(self, function):
+        """The function's fuzzy matcher and per-phrase length limits, built on first use"""
+        matcher = self._fuzzy.get(function)
+        if matcher is None:
+            with self._fuzzy_lock:
+                matcher = self._fuzzy.get(function)
+                if matcher is None:
+                    matcher = self._fuzzy[function] = self._load_fuzzy(function) or self._build_fuzzy(function)
+        return matcher
+
+    def _fuzzy_key(self, function):
+        import fuzzy_matcher
+        return self.snapshots.key(f'fuzzy-{function}', [self.routes[function], self.fuzzy_threshold],
+                                  (__file__, fuzzy_matcher.__file__))
+
+    def _load_fuzzy(self, function):
+        if self.snapshots is None:
+            return None
+        from fuzzy_matcher import FuzzyMatcher
+        snapshot = self.snapshots.load(f'fuzzy-{function}', self._fuzzy_key(function))
+        if snapshot is None:
+            return None
+        state, arrays = snapshot
+        try:
+            return FuzzyMatcher.restore(state, arrays, self.spelled_words()), arrays['limits']
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _build_fuzzy(self, function):
+        from fuzzy_matcher import FuzzyMatcher
+        import numpy as np
+        phrases = list(self._intent_phrases(self.routes[function]))
+        fuzzy = FuzzyMatcher([(keywords, intent) for keywords, intent, _ in phrases], self.fuzzy_threshold,
+                             dictionary=self.spelled_words())
+        limits = np.array([limit or np.inf for _, _, limit in phrases], dtype=np.float64)
+        if self.snapshots is not None:
+            state, arrays = fuzzy.snapshot()
+            self.snapshots.save(f'fuzzy-{function}', self._fuzzy_key(function), state, dict(arrays, limits=limits))
+        return fuzzy, limits
+
+    def resolve_fuzzy(self, function, text, candidates=None):
+        """Return the intent whose keywords text matches with typos allowed, or None
+
+        `candidates` optionally rules phrases out, as from fuzzy_candidates().
+        """
+        matcher, limits = self.fuzzy_matcher(function)
+        mask = limits > len(text)
+        if candidates is not None:
+            mask &= candidates
+        match = matcher.match(text, mask)
+        return match[0] if match is not None else None
+
+    def _resolve_block(self, rules, length, found):
+        """Walk a compiled rule list with if/elif semantics"""
+        for max_length, any_ids, all_ids, target in rules:
+            if max_length is not None and length >= max_length:
+                continue
+            if any_ids and any_ids.isdisjoint(found):
+                continue
+            if not all_ids <= found:
+                continue
+            if isinstance(target, str):
+                return target
+            return self._resolve_block(target, length, found)
+        return None
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Knowledge Base - BM25 retrieval over a local passage corpus for answer_questions
+
+Passages are JSON objects with an "id", a "title" and a "text" (plus an
+optional "heading" used when the passage is shown as an answer). They are
+indexed into immutable segments, each a directory of .npy arrays that are
+memory-mapped on open, so start-up never re-tokenizes or re-parses the corpus:
+
+    terms.npy          sorted 64-bit term hashes
+    offsets.npy        postings range of each term (len(terms) + 1)
+    postings_doc.npy   local document number of each posting, grouped by term
+    postings_impact.npy  BM25 term-frequency factor of each posting
+    max_impact.npy     largest impact in each term's postings
+    doc_lengths.npy    indexed tokens per document
+    id_hashes.npy      sorted 64-bit hashes of the document ids
+    id_order.npy       local document number for each id hash
+    docs.jsonl         the passages themselves
+    doc_offsets.npy    byte offset of each passage in docs.jsonl
+
+A query term is found with one binary search per segment and its postings are
+a contiguous slice. The document-length part of BM25 is computed when the
+segment is written (against the segment's average length), so scoring a
+posting is one multiply by the query term's idf.
+
+Queries are evaluated term at a time with MaxScore pruning: terms are taken
+from the highest possible contribution (idf * max_impact) down, and once the
+terms left could not lift an unseen document past the current k-th best score
+they only update documents already matched. Common words with long postings
+but little weight are then never scanned in full, so latency follows the rare
+terms of a query rather than the corpus size.
+
+Adding documents writes a new segment and atomically replaces manifest.json.
+A document whose id appears in a newer segment is superseded, so re-adding a
+passage updates it. Small segments are merged once there are too many of them,
+which keeps the number of segments a query visits low. Readers pick up new
+manifests on their next query; writers serialize on a file lock.
+
+Usage:
+    python knowledge_base.py build passages.jsonl [more.jsonl ...]
+    python knowledge_base.py add passages.jsonl
+    python knowledge_base.py search "who designed the eiffel tower"
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import uuid
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from stats_journal import FileLock
+from summarizer import STOPWORDS
+
+INDEX_PATH = 'knowledge_index'
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'knowledge_seed.jsonl')
+MANIFEST = 'manifest.json'
+
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercased index terms: stopwords dropped, plural 's' stripped"""
+    terms = []
+    for token in WORD.findall(text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def term_hash(term):
+    """Stable 64-bit hash of a term or document id"""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def read_jsonl(path):
+    """Yield the JSON objects of a JSONL file, skipping blank lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {e}")
+
+
+def source_signature(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+@dataclass
+class Hit:
+    score: float
+    coverage: float     # share of the query terms found in the document
+    document: dict
+
+
+class _Segment:
+    """One immutable, memory-mapped segment"""
+
+    ARRAYS = ('terms', 'offsets', 'max_impact', 'postings_doc', 'postings_impact', 'doc_lengths',
+              'id_hashes', 'id_order', 'doc_offsets')
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r'))
+        self.size = len(self.doc_lengths)
+        with open(os.path.join(path, 'docs.jsonl'), 'rb') as f:
+            self._store = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def document(self, local):
+        start, end = int(self.doc_offsets[local]), int(self.doc_offsets[local + 1])
+        return json.loads(self._store[start:end])
+
+    def find_ids(self, id_hashes):
+        """Local numbers of the documents whose id hash is in id_hashes"""
+        pos = np.minimum(np.searchsorted(self.id_hashes, id_hashes), self.size - 1)
+        return self.id_order[pos[self.id_hashes[pos] == id_hashes]]
+
+    def lookup(self, hashes):
+        """Term number of each query term hash, -1 where the segment lacks it"""
+        if not len(self.terms):
+            return np.full(len(hashes), -1)
+        i = np.minimum(np.searchsorted(self.terms, hashes), len(self.terms) - 1)
+        return np.where(self.terms[i] == hashes, i, -1)
+
+
+def write_segment(path, documents, k1=1.2, b=0.75):
+    """Index a list of documents into a new segment directory at path"""
+    vocab = {}
+    term_ids = array('I')
+    doc_ids = array('I')
+    doc_lengths = np.zeros(len(documents), dtype=np.uint32)
+    doc_offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+
+    os.makedirs(path)
+    with open(os.path.join(path, 'docs.jsonl'), 'wb') as store:
+        for i, doc in enumerate(documents):
+            line = (json.dumps(doc, ensure_ascii=False) + '\n').encode('utf-8')
+            store.write(line)
+            doc_offsets[i + 1] = doc_offsets[i] + len(line)
+            terms = tokenize(doc.get('title', '') + '\n' + doc['text'])
+            doc_lengths[i] = len(terms)
+            term_ids.extend(vocab.setdefault(term, len(vocab)) for term in terms)
+            doc_ids.extend([i] * len(terms))
+
+    n = len(documents)
+    hashes = np.fromiter((term_hash(term) for term in vocab), dtype=np.uint64, count=len(vocab))
+    order = np.argsort(hashes, kind='stable')
+    rank = np.empty(len(vocab), dtype=np.int64)
+    rank[order] = np.arange(len(vocab))
+
+    # One key per (term rank, document) pair: sorting groups postings by term
+    key = rank[np.frombuffer(term_ids, dtype=np.uint32)] * n + np.frombuffer(doc_ids, dtype=np.uint32)
+    key, tf = np.unique(key, return_counts=True)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key // n, minlength=len(vocab)), out=offsets[1:])
+
+    post_doc = key % n
+    average_length = max(doc_lengths.mean(), 1.0)
+    norm = 1 - b + b * doc_lengths[post_doc] / average_length
+    impact = (tf * (k1 + 1) / (tf + k1 * norm)).astype(np.float32)
+
+    id_hashes = np.fromiter((term_hash(doc['id']) for doc in documents), dtype=np.uint64, count=n)
+    id_order = np.argsort(id_hashes, kind='stable').astype(np.uint32)
+
+    arrays = {
+        'terms': hashes[order],
+        'offsets': offsets,
+        'max_impact': np.maximum.reduceat(impact, offsets[:-1]) if len(vocab) else impact,
+        'postings_doc': post_doc.astype(np.uint32),
+        'postings_impact': impact,
+        'doc_lengths': doc_lengths,
+        'id_hashes': id_hashes[id_order],
+        'id_order': id_order,
+        'doc_offsets': doc_offsets
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), values)
+    return arrays['id_hashes']
+
+
+class _Accumulator:
+    """Scores of the documents matched so far in one segment
+
+    Kept as sorted sparse arrays while few documents match and switched to
+    dense per-document arrays once a long postings list arrives.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.dense = False
+        self.docs = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0)
+        self.matched = np.zeros(0, dtype=np.int32)
+
+    def add(self, docs, weights):
+        """Score every posting of one term (documents are unique within a term)"""
+        if not self.dense and (len(self.docs) + len(docs)) * 16 > self.size:
+            scores = np.zeros(self.size)
+            matched = np.zeros(self.size, dtype=np.int32)
+            scores[self.docs] = self.scores
+            matched[self.docs] = self.matched
+            self.scores, self.matched, self.dense = scores, matched, True
+        if self.dense:
+            self.scores[docs] += weights
+            self.matched[docs] += 1
+            return
+        merged, inverse = np.unique(np.concatenate([self.docs, docs]), return_inverse=True)
+        self.scores = np.bincount(inverse, np.concatenate([self.scores, weights]), len(merged))
+        counts = np.concatenate([self.matched, np.ones(len(docs), dtype=np.int32)])
+        self.matched = np.bincount(inverse, counts, len(merged)).astype(np.int32)
+        self.docs = merged
+
+    def add_existing(self, docs, weights):
+        """Score one term for the documents matched so far only"""
+        if self.dense:
+            hit = self.matched[docs] > 0
+            self.scores[docs[hit]] += weights[hit]
+            self.matched[docs[hit]] += 1
+        elif len(self.docs) and len(docs):
+            pos = np.minimum(np.searchsorted(docs, self.docs), len(docs) - 1)
+            hit = docs[pos] == self.docs
+            self.scores[hit] += weights[pos[hit]]
+            self.matched[hit] += 1
+
+    def prune(self, bound, threshold):
+        """Drop documents that cannot pass threshold even if they gain bound more"""
+        docs, scores, matched = self.result()
+        keep = scores + bound > threshold
+        self.docs, self.scores, self.matched = docs[keep], scores[keep], matched[keep]
+        self.dense = False
+
+    def kth(self, k):
+        """The k-th best score so far (0 while fewer than k documents matched)"""
+        if len(self.scores) < k:
+            return 0.0
+        return float(np.partition(self.scores, len(self.scores) - k)[len(self.scores) - k])
+
+    def result(self):
+        """(documents, scores, matched term counts) of every matched document"""
+        if self.dense:
+            docs = np.flatnonzero(self.matched)
+            return docs, self.scores[docs], self.matched[docs]
+        return self.docs, self.scores, self.matched
+
+
+class _State:
+    """Segments of one manifest and their live documents
+
+    live[i] masks the documents of segments[i] superseded by a newer segment
+    (None when all of them are current). Writers list the segments that reuse
+    existing ids in the manifest, so only those are checked here, and each
+    check is a binary search of the newer (usually small) segment's ids.
+    """
+
+    def __init__(self, segments, replacing, signature):
+        self.segments = segments
+        self.signature = signature
+        self.live = [None] * len(segments)
+
+        for j, newer in enumerate(segments):
+            if newer.name not in replacing:
+                continue
+            for i in range(j):
+                dead = segments[i].find_ids(newer.id_hashes)
+                if len(dead):
+                    if self.live[i] is None:
+                        self.live[i] = np.ones(segments[i].size, dtype=bool)
+                    self.live[i][dead] = False
+
+        self.documents = sum(segment.size if live is None else int(live.sum())
+                             for segment, live in zip(segments, self.live))
+
+
+class KnowledgeBase:
+    def __init__(self, path=INDEX_PATH, k1=1.2, b=0.75, segment_docs=200_000, merge_below=10_000, merge_factor=8):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.segment_docs = segment_docs
+        self.merge_below = merge_below
+        self.merge_factor = merge_factor
+        self._open_segments = {}
+        self._state = _State([], (), None)
+        self.refresh()
+
+    def __len__(self):
+        return self._state.documents
+
+    # -- reading -------------------------------------------------------------
+
+    def _manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'segments': [], 'next_segment': 1, 'sources': {}}
+
+    def refresh(self):
+        """Switch to the latest manifest if a writer has replaced it"""
+        try:
+            st = os.stat(os.path.join(self.path, MANIFEST))
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._state.signature:
+            return self._state
+
+        for attempt in range(3):
+            manifest = self._manifest()
+            try:
+                segments = [self._open_segments.get(name) or _Segment(os.path.join(self.path, name))
+                            for name in manifest['segments']]
+                break
+            except FileNotFoundError:
+                if attempt == 2:  # a merge removed segments under us; reread the manifest
+                    raise
+        self._open_segments = {segment.name: segment for segment in segments}
+        self._state = _State(segments, set(manifest.get('replacing', ())), signature)
+        return self._state
+
+    def get(self, doc_id):
+        """The live document with this id, or None"""
+        state = self.refresh()
+        id_hash = np.array([term_hash(doc_id)], dtype=np.uint64)
+        for segment, live in zip(reversed(state.segments), reversed(state.live)):
+            for local in segment.find_ids(id_hash):
+                if live is None or live[local]:
+                    return segment.document(local)
+        return None
+
+    def search(self, query, k=5):
+        """The k best BM25 matches for a free-text query, best first"""
+        state = self.refresh()
+        hashes = np.unique(np.fromiter((term_hash(t) for t in tokenize(query)), dtype=np.uint64))
+        if not len(hashes) or not state.documents or k <= 0:
+            return []
+
+        found = [segment.lookup(hashes) for segment in state.segments]
+        df = np.zeros(len(hashes), dtype=np.int64)
+        for segment, terms in zip(state.segments, found):
+            present = terms >= 0
+            df[present] += segment.offsets[terms[present] + 1] - segment.offsets[terms[present]]
+        idf = np.log(1 + (state.documents - df + 0.5) / (df + 0.5))
+
+        results = []
+        threshold = 0.0
+        for segment, live, terms in zip(state.segments, state.live, found):
+            present = np.flatnonzero(terms >= 0)
+            if not len(present):
+                continue
+            results.extend(self._search_segment(segment, live, terms[present], idf[present], k, threshold))
+            results.sort(key=lambda r: r[0], reverse=True)
+            del results[k:]
+            if len(results) == k:
+                threshold = results[-1][0]
+
+        return [Hit(score, matched / len(hashes), segment.document(local))
+                for score, matched, segment, local in results]
+
+    def _search_segment(self, segment, live, terms, idf, k, threshold):
+        """Top k (score, matched terms, segment, document) of one segment"""
+        bounds = idf * segment.max_impact[terms]
+        order = np.argsort(-bounds)
+        # remaining[j]: the most the terms from j on can add to any document
+        remaining = np.cumsum(bounds[order][::-1])[::-1]
+
+        scores = _Accumulator(segment.size)
+        for j, t in enumerate(order):
+            start, end = segment.offsets[terms[t]], segment.offsets[terms[t] + 1]
+            docs = segment.postings_doc[start:end]
+            weights = idf[t] * segment.postings_impact[start:end]
+            if remaining[j] <= threshold:
+                # Only documents already matched can still reach the top k
+                scores.prune(remaining[j], threshold)
+                scores.add_existing(docs, weights)
+                continue
+            if live is not None:
+                keep = live[docs]
+                docs, weights = docs[keep], weights[keep]
+            scores.add(docs, weights)
+            threshold = max(threshold, scores.kth(k))
+
+        docs, totals, matched = scores.result()
+        if len(docs) > k:
+            top = np.argpartition(-totals, k - 1)[:k]
+            docs, totals, matched = docs[top], totals[top], matched[top]
+        return [(float(s), int(m), segment, int(d)) for s, m, d in zip(totals, matched, docs)]
+
+    # -- writing -------------------------------------------------------------
+
+    def _write_manifest(self, manifest):
+        tmp_path = os.path.join(self.path, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+    def _new_segment(self, manifest, documents, existing):
+        """Write documents as the next segment of manifest and save the manifest"""
+        name = f"seg-{manifest['next_segment']:06d}"
+        tmp_path = os.path.join(self.path, f".{name}.{uuid.uuid4().hex}.tmp")
+        id_hashes = write_segment(tmp_path, documents, self.k1, self.b)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        manifest['next_segment'] += 1
+        manifest['segments'].append(name)
+        if any(len(segment.find_ids(id_hashes)) for segment in existing):
+            manifest.setdefault('replacing', []).append(name)
+        self._write_manifest(manifest)
+        return name
+
+    def add_documents(self, documents, sources=None):
+        """Index documents (any iterable) in new segments; returns how many were added"""
+        os.makedirs(self.path, exist_ok=True)
+        added = 0
+        with FileLock(os.path.join(self.path, '.lock'), exclusive=True):
+            manifest = self._manifest()
+            batch = {}
+            for doc in documents:
+                if 'text' not in doc:
+                    raise ValueError(f"document without 'text': {str(doc)[:80]}")
+                doc_id = str(doc.get('id') or hashlib.sha1(doc['text'].encode('utf-8')).hexdigest()[:16])
+                batch[doc_id] = dict(doc, id=doc_id)  # the last copy of an id wins
+                if len(batch) >= self.segment_docs:
+                    self._new_segment(manifest, list(batch.values()), self.refresh().segments)
+                    added += len(batch)
+                    batch = {}
+            if batch:
+                self._new_segment(manifest, list(batch.values()), self.refresh().segments)
+                added += len(batch)
+            manifest.setdefault('sources', {}).update(sources or {})
+            self._write_manifest(manifest)
+            self._merge_small_locked(manifest)
+        self.refresh()
+        return added
+
+    def _merge_small_locked(self, manifest):
+        """Fold small segments into one once there are more than merge_factor of them"""
+        state = self.refresh()
+        small = [(s, live) for s, live in zip(state.segments, state.live) if s.size < self.merge_below]
+        if len(small) <= self.merge_factor:
+            return
+        documents = [segment.document(local)
+                     for segment, live in small
+                     for local in range(segment.size)
+                     if live is None or live[local]]
+        # Only live documents are carried over, so the merged segment can go last
+        merged = {segment.name for segment, _ in small}
+        manifest['segments'] = [name for name in manifest['segments'] if name not in merged]
+        manifest['replacing'] = [name for name in manifest.get('replacing', ()) if name not in merged]
+        if documents:
+            self._new_segment(manifest, documents, [s for s in state.segments if s.name not in merged])
+        else:
+            self._write_manifest(manifest)
+        for segment, _ in small:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    def ensure_source(self, path):
+        """Index a JSONL file unless this exact version of it is already indexed"""
+        key = os.path.abspath(path)
+        signature = source_signature(path)
+        if self._manifest().get('sources', {}).get(key) == signature:
+            return 0
+        return self.add_documents(read_jsonl(path), sources={key: signature})
+
+    def stats(self):
+        state = self.refresh()
+        return {
+            'documents': state.documents,
+            'segments': len(state.segments)
+        }
+
+
+_default = None
+
+
+def default_knowledge_base():
+    """Shared knowledge base at INDEX_PATH, seeded with the built-in answers"""
+    global _default
+    if _default is None:
+        knowledge = KnowledgeBase()
+        if os.path.exists(SEED_PATH):
+            knowledge.ensure_source(SEED_PATH)
+        _default = knowledge
+    return _default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AI Assistant - knowledge base index")
+    parser.add_argument('--index', default=INDEX_PATH, help=f"index directory (default: {INDEX_PATH})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="index JSONL files into a fresh index")
+    build.add_argument('files', nargs='+')
+    add = commands.add_parser('add', help="add JSONL files to the index")
+    add.add_argument('files', nargs='+')
+    search = commands.add_parser('search', help="run a query")
+    search.add_argument('query')
+    search.add_argument('-k', type=int, default=5)
+    commands.add_parser('stats', help="show index size")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build' and os.path.exists(args.index):
+        shutil.rmtree(args.index)
+    knowledge = KnowledgeBase(args.index)
+
+    if args.command in ('build', 'add'):
+        for path in args.files:
+            try:
+                added = knowledge.add_documents(read_jsonl(path), sources={os.path.abspath(path): source_signature(path)})
+            except (OSError, ValueError) as e:
+                print(f"❌ {e}", file=sys.stderr)
+                return 1
+            print(f"✅ Indexed {added} documents from {path}")
+        print(json.dumps(knowledge.stats()))
+    elif args.command == 'search':
+        for hit in knowledge.search(args.query, args.k):
+            print(f"{hit.score:7.3f}  {hit.coverage:4.0%}  {hit.document['id']}  {hit.document.get('title', '')}")
+    else:
+        print(json.dumps(knowledge.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Latency Models - emulate the response time of a real model backend
+
+The canned handlers answer in microseconds. To rehearse how the assistant
+feels (or behaves under load) with a real model behind it, a latency model
+adds a delay to every computed response. Cache hits are never delayed.
+
+Models are chosen with a short spec string:
+
+    none                      no delay (default; use for benchmarks and batch jobs)
+    fixed:SECONDS             the same delay every time, e.g. fixed:0.5
+    lognormal:MEDIAN,SIGMA    long-tailed, like real inference, e.g. lognormal:0.8,0.5
+    exponential:MEAN          e.g. exponential:0.3
+    uniform:LOW,HIGH          e.g. uniform:0.1,0.4
+"""
+
+import math
+import random
+import threading
+import time
+
+
+FIRST_CHUNK_SHARE = 0.3
+
+
+class NoLatency:
+    spec = 'none'
+
+    def sample(self):
+        return 0.0
+
+    def wait(self):
+        """Block for one sampled delay and return it"""
+        return 0.0
+
+    def stream_delays(self, chunks):
+        """Spread one sampled delay over a streamed response
+
+        Like a real model, the first chunk carries the largest share (time to
+        first token) and the rest arrive at an even pace.
+        """
+        total = self.sample()
+        if chunks <= 1 or total == 0:
+            return [total] + [0.0] * (chunks - 1)
+        first = total * FIRST_CHUNK_SHARE
+        rest = (total - first) / (chunks - 1)
+        return [first] + [rest] * (chunks - 1)
+
+
+class FixedLatency(NoLatency):
+    def __init__(self, seconds):
+        if seconds < 0:
+            raise ValueError("latency cannot be negative")
+        self.seconds = seconds
+        self.spec = f'fixed:{seconds:g}'
+
+    def sample(self):
+        return self.seconds
+
+    def wait(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class SampledLatency(FixedLatency):
+    DISTRIBUTIONS = {
+        'lognormal': 2,
+        'exponential': 1,
+        'uniform': 2
+    }
+
+    def __init__(self, distribution, params, seed=None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        if len(params) != self.DISTRIBUTIONS[distribution]:
+            raise ValueError(f"'{distribution}' takes {self.DISTRIBUTIONS[distribution]} parameter(s)")
+        if any(p < 0 for p in params):
+            raise ValueError("latency parameters cannot be negative")
+        self.distribution = distribution
+        self.params = tuple(params)
+        self.spec = f"{distribution}:{','.join(f'{p:g}' for p in params)}"
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.distribution == 'lognormal':
+                median, sigma = self.params
+                return self._rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+            if self.distribution == 'exponential':
+                mean, = self.params
+                return self._rng.expovariate(1 / mean) if mean > 0 else 0.0
+            low, high = self.params
+            return self._rng.uniform(low, high)
+
+
+def parse_latency(spec, seed=None):
+    """Build a latency model from a spec string such as 'fixed:0.5'"""
+    if spec is None or spec == '' or spec == 'none':
+        return NoLatency()
+    name, _, args = spec.partition(':')
+    try:
+        params = [float(p) for p in args.split(',')] if args else []
+    except ValueError:
+        raise ValueError(f"Invalid latency spec '{spec}'")
+    if name == 'fixed':
+        if len(params) != 1:
+            raise ValueError("'fixed' takes 1 parameter")
+        return FixedLatency(params[0])
+    return SampledLatency(name, params, seed)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Metrics - rolling per-function request, latency and feedback counters
+
+Every answered query and every feedback vote is added to three places:
+
+    per second   a ring of the last `seconds` one-second buckets
+    per minute   a ring of the last `minutes` one-minute buckets
+    totals       lifetime counters (Prometheus counters must never go down)
+
+A bucket holds, for each function, the number of requests, helpful and not
+helpful votes, the latency sum and count, and a latency histogram over
+LATENCY_BOUNDS. Each ring is one flat array('d') of slots x functions x
+fields; a slot is zeroed and reused when its second (or minute) comes round
+again, so memory is fixed however long the process runs (about 1.3 MB with
+the defaults: five minutes of seconds and a day of minutes).
+
+    metrics.observe_request('advice', 0.012)
+    metrics.observe_feedback('advice', True)
+    metrics.window(300)    ->  {'advice': {'requests': 1, 'p95_ms': 24.1, ...}}, last five minutes
+    metrics.prometheus()   ->  text exposition format, for GET /metrics
+
+Metrics.shared(n) keeps n sets of counters in one anonymous shared memory
+mapping, one per prefork worker (see prefork). Each worker writes only its
+own and reports the sum of all of them.
+"""
+
+import bisect
+import contextlib
+import math
+import threading
+import time
+from array import array
+
+FUNCTIONS = ('questions', 'summarize', 'creative', 'advice', 'unknown')
+
+# Upper bounds (seconds) of the latency histogram buckets; one more bucket catches the rest
+LATENCY_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS, HELPFUL, NOT_HELPFUL, LATENCY_SUM, LATENCY_COUNT, BUCKETS = range(6)
+FIELDS = BUCKETS + len(LATENCY_BOUNDS) + 1
+WIDTH = len(FUNCTIONS) * FIELDS
+
+
+class Ring:
+    """`slots` buckets of `span` seconds each, reused round-robin
+
+    With `memory` (a zeroed writable buffer of Ring.size(slots) bytes) the
+    ring lives there instead of in private arrays; period 0 never comes round
+    again, so zeroed memory reads as empty.
+    """
+
+    def __init__(self, slots, span, memory=None):
+        self.slots = slots
+        self.span = span
+        if memory is None:
+            self.periods = array('q', [-1]) * slots
+            self.data = array('d', bytes(8 * slots * WIDTH))
+        else:
+            self.periods = memory[:8 * slots].cast('q')
+            self.data = memory[8 * slots:self.size(slots)].cast('d')
+        self._zeros = array('d', bytes(8 * WIDTH))
+
+    @staticmethod
+    def size(slots):
+        return 8 * slots * (WIDTH + 1)
+
+    def row(self, now):
+        """Offset of the bucket for time `now`, cleared first if it still holds an older period"""
+        period = int(now // self.span)
+        slot = period % self.slots
+        offset = slot * WIDTH
+        if self.periods[slot] != period:
+            self.data[offset:offset + WIDTH] = self._zeros
+            self.periods[slot] = period
+        return offset
+
+    def total(self, now, count):
+        """Sum of the buckets of the last `count` periods up to `now`"""
+        current = int(now // self.span)
+        total = array('d', self._zeros)
+        for period in range(current - min(count, self.slots) + 1, current + 1):
+            slot = period % self.slots
+            if self.periods[slot] == period:
+                offset = slot * WIDTH
+                for i, value in enumerate(self.data[offset:offset + WIDTH]):
+                    if value:
+                        total[i] += value
+        return total
+
+
+def quantile(buckets, count, q):
+    """Estimate a quantile from histogram bucket counts, interpolating inside the bucket"""
+    rank = q * count
+    seen = 0.0
+    for i, n in enumerate(buckets):
+        if n and seen + n >= rank:
+            if i == len(LATENCY_BOUNDS):
+                return LATENCY_BOUNDS[-1]
+            lower = LATENCY_BOUNDS[i - 1] if i else 0.0
+            return lower + (LATENCY_BOUNDS[i] - lower) * (rank - seen) / n
+        seen += n
+    return 0.0
+
+
+def format_metric(name, kind, help, samples):
+    """One metric family in Prometheus text format; samples are (suffix, labels dict, value)"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for suffix, labels, value in samples:
+        label_text = ','.join(f'{key}="{escape_label(val)}"' for key, val in labels.items())
+        value = format_value(value)
+        lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def format_value(value):
+    """A sample value at full precision; whole numbers are written without a fraction"""
+    if isinstance(value, int):
+        return str(int(value))   # bool too
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(value)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    def __init__(self, seconds=300, minutes=1440, clock=time.time, memory=None):
+        if memory is None:
+            self.seconds = Ring(seconds, 1)
+            self.minutes = Ring(minutes, 60)
+            self.totals = array('d', bytes(8 * WIDTH))
+        else:
+            memory = memoryview(memory)
+            split = Ring.size(seconds)
+            self.seconds = Ring(seconds, 1, memory[:split])
+            self.minutes = Ring(minutes, 60, memory[split:split + Ring.size(minutes)])
+            self.totals = memory[split + Ring.size(minutes):self.size(seconds, minutes)].cast('d')
+        self.clock = clock
+        self.started = clock()
+        self._lock = threading.Lock()
+        # Metrics of other processes, added in by window() and prometheus()
+        self.peers = []
+
+    @staticmethod
+    def size(seconds=300, minutes=1440):
+        """Bytes of memory a Metrics needs"""
+        return Ring.size(seconds) + Ring.size(minutes) + 8 * WIDTH
+
+    @classmethod
+    def shared(cls, count, seconds=300, minutes=1440, clock=time.time):
+        """`count` Metrics in one shared memory mapping, each reporting the sum of all of them"""
+        import mmap
+
+        size = cls.size(seconds, minutes)
+        memory = memoryview(mmap.mmap(-1, size * count))
+        group = [cls(seconds, minutes, clock, memory[i * size:(i + 1) * size]) for i in range(count)]
+        for metrics in group:
+            metrics.peers = [peer for peer in group if peer is not metrics]
+        return group
+
+    @staticmethod
+    def _base(function):
+        try:
+            return FUNCTIONS.index(function) * FIELDS
+        except ValueError:
+            return FUNCTIONS.index('unknown') * FIELDS
+
+    def observe_request(self, function, seconds=None):
+        """Count one answered query, with its latency if known"""
+        base = self._base(function)
+        if seconds is not None:
+            bucket = base + BUCKETS + bisect.bisect_left(LATENCY_BOUNDS, seconds)
+        now = self.clock()
+        with self._lock:
+            for data, offset in ((self.seconds.data, self.seconds.row(now)), (self.minutes.data, self.minutes.row(now)),
+                                 (self.totals, 0)):
+                data[offset + base + REQUESTS] += 1
+                if seconds is not None:
+                    data[offset + base + LATENCY_SUM] += seconds
+                    data[offset + base + LATENCY_COUNT] += 1
+                    data[offset + bucket] += 1
+
+    def observe_feedback(self, function, helpful):
+        """Count one feedback vote; function may be None when the query is not known"""
+        field = self._base(function) + (HELPFUL if helpful else NOT_HELPFUL)
+        now = self.clock()
+        with self._lock:
+            self.seconds.data[self.seconds.row(now) + field] += 1
+            self.minutes.data[self.minutes.row(now) + field] += 1
+            self.totals[field] += 1
+
+    def window(self, seconds):
+        """Per-function summary of the last `seconds` seconds (whole minutes past the per-second ring)
+
+        Only functions with activity in the window are listed.
+        """
+        now = self.clock()
+        total = array('d', bytes(8 * WIDTH))
+        # Peers are read without a lock (theirs lives in another process); a race skews a sample at most
+        for metrics in [self] + self.peers:
+            with metrics._lock if metrics is self else contextlib.nullcontext():
+                if seconds <= metrics.seconds.slots:
+                    part = metrics.seconds.total(now, int(seconds))
+                else:
+                    part = metrics.minutes.total(now, -(-int(seconds) // 60))
+            for i, value in enumerate(part):
+                if value:
+                    total[i] += value
+        summary = {}
+        for function in FUNCTIONS:
+            base = self._base(function)
+            requests, helpful, not_helpful, latency_sum, latency_count = total[base:base + BUCKETS]
+            if not (requests or helpful or not_helpful):
+                continue
+            buckets = total[base + BUCKETS:base + FIELDS]
+            rated = helpful + not_helpful
+            summary[function] = {
+                'requests': int(requests),
+                'per_minute': requests / min(seconds, max(now - self.started, 60)) * 60,
+                'helpful': int(helpful),
+                'not_helpful': int(not_helpful),
+                'satisfaction': helpful / rated * 100 if rated else None,
+                'avg_ms': latency_sum / latency_count * 1000 if latency_count else None,
+                'p50_ms': quantile(buckets, latency_count, 0.5) * 1000 if latency_count else None,
+                'p95_ms': quantile(buckets, latency_count, 0.95) * 1000 if latency_count else None,
+            }
+        return summary
+
+    def prometheus(self):
+        """Lifetime counters and latency histograms in Prometheus text format"""
+        totals = array('d', bytes(8 * WIDTH))
+        for metrics in [self] + self.peers:
+            with metrics._lock if metrics is self else contextlib.nullcontext():
+                for i, value in enumerate(metrics.totals):
+                    totals[i] += value
+        requests, feedback, latency = [], [], []
+        for function in FUNCTIONS:
+            base = self._base(function)
+            labels = {'function': function}
+            requests.append(('', labels, totals[base + REQUESTS]))
+            feedback.append(('', {'function': function, 'helpful': 'true'}, totals[base + HELPFUL]))
+            feedback.append(('', {'function': function, 'helpful': 'false'}, totals[base + NOT_HELPFUL]))
+            cumulative = 0.0
+            for bound, n in zip(LATENCY_BOUNDS + (None,), totals[base + BUCKETS:base + FIELDS]):
+                cumulative += n
+                latency.append(('_bucket', {'function': function, 'le': f'{bound:g}' if bound else '+Inf'}, cumulative))
+            latency.append(('_sum', labels, totals[base + LATENCY_SUM]))
+            latency.append(('_count', labels, totals[base + LATENCY_COUNT]))
+        return (
+            format_metric('assistant_requests_total', 'counter', 'Queries answered, by function.', requests)
+            + format_metric('assistant_request_duration_seconds', 'histogram', 'Time to answer a query.', latency)
+            + format_metric('assistant_feedback_total', 'counter', 'Feedback votes, by function and verdict.', feedback)
+            + format_metric('assistant_uptime_seconds', 'gauge', 'Seconds since the metrics started.',
+                            [('', {}, self.clock() - self.started)])
+        )
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Payloads - precompressed response bodies, ETags and conditional requests
+
+The chat page and the sample prompts are the same bytes on every request, so
+web_server.py wraps them in a Payload once: the body is gzipped at load time
+(level 9, since it happens once) and gets a strong ETag. A request whose
+If-None-Match names the ETag is answered 304 Not Modified with no body, and
+a browser that accepts gzip gets the precompressed copy, so a repeat visit
+costs a header exchange and no compression at all.
+
+The two encodings are different representations, so each gets its own ETag
+(the gzip one ends in "-gz") and responses carry Vary: Accept-Encoding.
+
+API answers carry per-request fields (session, statistics) around the
+response text, so they cannot be precompressed. Bodies of GZIP_MIN_BYTES or
+more are gzipped per request instead, and Server-Sent Event streams through
+one compressor per response, flushed after every event so chunks still
+arrive as they are produced.
+
+PayloadStats counts what the server sent. web_server.py folds the counts into
+the assistant's statistics (section "http"), so they are journaled with the
+other counters, survive restarts and add up across prefork workers.
+"""
+
+import hashlib
+import zlib
+
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6            # per-request compression: most of level 9's savings for a fraction of the CPU
+GZIP_WBITS = 31           # zlib with a gzip header and trailer
+
+# Counters of PayloadStats, as kept in the assistant's "http" statistics
+HTTP_COUNTERS = ('responses', 'gzipped', 'gzipped_streams', 'static_requests', 'conditional_requests',
+                 'not_modified', 'bytes_uncompressed', 'bytes_sent')
+
+
+def gzip_bytes(data, level=GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip (q-values respected)"""
+    wildcard = False
+    for item in accept_encoding.lower().split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip()
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding in ('gzip', 'x-gzip'):
+            return q > 0
+        if coding == '*':
+            wildcard = q > 0
+    return wildcard
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header matches etag (weak comparison, as RFC 9110 asks for)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class Payload:
+    """A response body that never changes, with its gzip copy and ETags computed once"""
+
+    __slots__ = ('content_type', 'body', 'etag', 'gzipped', 'gzip_etag')
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        gzipped = gzip_bytes(body, 9)
+        # Tiny bodies can come out larger; then everyone gets the original
+        self.gzipped = gzipped if len(gzipped) < len(body) else None
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+
+    def variant(self, gzip_ok):
+        """(body, etag, content encoding or None) for a client that does or does not accept gzip"""
+        if gzip_ok and self.gzipped is not None:
+            return self.gzipped, self.gzip_etag, 'gzip'
+        return self.body, self.etag, None
+
+
+class PayloadStats:
+    """What the server sent: 304s, gzipped responses and bytes before and after (one event loop, no lock)"""
+
+    def __init__(self):
+        self.responses = 0           # bodies sent whole (static and API)
+        self.conditional = 0         # requests for a Payload that carried If-None-Match
+        self.static = 0              # requests for a Payload
+        self.not_modified = 0
+        self.gzipped = 0
+        self.streams = 0             # event streams sent gzipped
+        self.bytes_uncompressed = 0  # what the bodies would have cost without 304s or gzip
+        self.bytes_sent = 0
+
+    def record(self, uncompressed, sent, gzipped=False):
+        self.responses += 1
+        self.gzipped += gzipped
+        self.bytes_uncompressed += uncompressed
+        self.bytes_sent += sent
+
+    def record_stream(self, uncompressed, sent):
+        self.streams += 1
+        self.bytes_uncompressed += uncompressed
+        self.bytes_sent += sent
+
+    def counts(self):
+        """Running totals, named as in HTTP_COUNTERS"""
+        return {
+            'responses': self.responses,
+            'gzipped': self.gzipped,
+            'gzipped_streams': self.streams,
+            'static_requests': self.static,
+            'conditional_requests': self.conditional,
+            'not_modified': self.not_modified,
+            'bytes_uncompressed': self.bytes_uncompressed,
+            'bytes_sent': self.bytes_sent,
+        }
+
+
+def http_summary(counts):
+    """HTTP counters plus bytes saved, the share saved and the 304 rate of page and prompt requests"""
+    summary = dict(counts)
+    saved = counts['bytes_uncompressed'] - counts['bytes_sent']
+    summary['bytes_saved'] = saved
+    summary['saved_ratio'] = saved / counts['bytes_uncompressed'] if counts['bytes_uncompressed'] else 0.0
+    summary['not_modified_rate'] = counts['not_modified'] / counts['static_requests'] if counts['static_requests'] else 0.0
+    return summary
+
+
+async def gzip_stream(chunks, stats=None):
+    """Gzip an async iterable of byte chunks, flushing after each one so none is held back"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    uncompressed = sent = 0
+    try:
+        async for chunk in chunks:
+            out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            uncompressed += len(chunk)
+            sent += len(out)
+            yield out
+        out = compressor.flush()
+        sent += len(out)
+        yield out
+    finally:
+        if stats is not None:
+            stats.record_stream(uncompressed, sent)
+        if hasattr(chunks, 'aclose'):
+            await chunks.aclose()
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Prefork - several web server processes behind one listening socket
+
+One Python process answers on one core, so `web_server.py --processes N`
+runs N worker processes instead. The supervisor (the process you started)
+builds the server once, opens the listening socket and forks the workers;
+every worker accepts from the shared socket, so the kernel spreads
+connections across them.
+
+Session affinity: a session's history lives in one worker's memory. A
+HashRing maps every session id onto a worker (consistent hashing, so a
+different --processes moves only a share of the sessions, which matters with
+--session-dir). A worker that receives a request for another worker's session
+forwards it over that worker's Unix socket and relays the answer, streams
+chunk by chunk. New session ids are drawn so that the worker creating them
+owns them, so a browser that keeps its connection open never needs the hop.
+
+Shared counters: the usage statistics (SharedCounters), the rolling metrics
+(Metrics.shared) and the server's own numbers - scheduler queues, sessions,
+cache size (SharedReport) - of all workers live in anonymous shared memory
+mapped before the fork. Each worker writes only its own row, so there are no
+locks across processes, and /api/stats and /metrics add up every row, so it
+does not matter which worker answers. A worker publishes its SharedReport row
+every second and whenever it answers a stats request, so other workers'
+queue and session numbers can be up to a second old. A replacement worker
+takes over the row of the worker it replaces. Only the --rate limit is per
+worker: each keeps its own token buckets.
+
+Restarts: SIGHUP replaces the workers one at a time. The replacement starts
+and reports ready before the old worker gets SIGTERM; the old one stops
+accepting, finishes the requests it has in flight and exits. A worker that
+dies is replaced the same way. SIGINT / SIGTERM stop all workers gracefully.
+
+Needs os.fork (Linux, macOS).
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from stats_journal import apply_delta
+
+READY_TIMEOUT = 60
+STOP_TIMEOUT = 15
+
+
+def hash64(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes 0..nodes-1, with `replicas` points per node"""
+
+    def __init__(self, nodes, replicas=64):
+        points = sorted((hash64(f'{node}:{i}'), node) for node in range(nodes) for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        i = bisect.bisect(self._hashes, hash64(key))
+        return self._nodes[i % len(self._nodes)]
+
+
+def flatten(stats, prefix=''):
+    """(dotted path, value) of every number in a stats dict"""
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{name}.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f'{prefix}{name}', value
+
+
+def counter_paths(stats, prefix=''):
+    """Dotted paths of every numeric counter in a stats dict"""
+    for path, _ in flatten(stats, prefix):
+        yield path
+
+
+def set_path(stats, path, value):
+    *parents, name = path.split('.')
+    for part in parents:
+        stats = stats[part]
+    stats[name] = value
+
+
+class SharedCounters:
+    """Counter deltas of every worker in shared memory, on top of the stats loaded at start-up
+
+    Each worker adds to its own row (`worker`); stats() is the start-up stats
+    plus the sum of all rows. Paths that are not in the start-up stats are
+    left to the worker's own copy.
+    """
+
+    def __init__(self, base, workers):
+        self.base = json.loads(json.dumps(base))
+        self.paths = list(counter_paths(self.base))
+        self._index = {path: i for i, path in enumerate(self.paths)}
+        self._integers = {path for path in self.paths if isinstance(self._lookup(path), int)}
+        self.worker = 0
+        self._values = memoryview(mmap.mmap(-1, 8 * max(1, len(self.paths) * workers))).cast('d')
+        self._lock = threading.Lock()
+
+    def _lookup(self, path):
+        node = self.base
+        for part in path.split('.'):
+            node = node[part]
+        return node
+
+    def add(self, deltas):
+        row = self.worker * len(self.paths)
+        with self._lock:
+            for path, delta in deltas.items():
+                i = self._index.get(path)
+                if i is not None:
+                    self._values[row + i] += delta
+
+    def stats(self):
+        stats = json.loads(json.dumps(self.base))
+        width = len(self.paths)
+        for i, path in enumerate(self.paths):
+            total = sum(self._values[i::width])
+            if total:
+                apply_delta(stats, path, int(total) if path in self._integers else total)
+        return stats
+
+
+class SharedReport:
+    """The latest report (a nested dict of numbers) of every worker, in shared memory
+
+    Leaves named in `gauges` are levels, such as queue depth: a worker sets
+    them in its own row, so a replacement overwrites the worker it replaces.
+    Other leaves are running counts: a worker adds what it counted since it
+    last published, so totals carry on across restarts. Leaves named in
+    `local` (settings, ratios) are not shared. The paths are fixed by the
+    template, which is built before the fork.
+    """
+
+    def __init__(self, template, workers, gauges=(), local=()):
+        numbers = [(path, value) for path, value in flatten(template) if path.rsplit('.', 1)[-1] not in local]
+        self.paths = [path for path, _ in numbers]
+        self._index = {path: i for i, path in enumerate(self.paths)}
+        self._gauges = {path for path in self.paths if path.rsplit('.', 1)[-1] in gauges}
+        self._integers = {path for path, value in numbers if isinstance(value, int)}
+        self._published = {}
+        self.worker = 0
+        self._values = memoryview(mmap.mmap(-1, 8 * max(1, len(self.paths) * workers))).cast('d')
+        self._lock = threading.Lock()
+
+    def publish(self, report):
+        """Write this worker's report into its row"""
+        row = self.worker * len(self.paths)
+        with self._lock:
+            for path, value in flatten(report):
+                i = self._index.get(path)
+                if i is None:
+                    continue
+                if path in self._gauges:
+                    self._values[row + i] = value
+                else:
+                    self._values[row + i] += value - self._published.get(path, 0)
+                    self._published[path] = value
+
+    def combined(self, report):
+        """This worker's report with every shared number summed over all workers (publishes it first)"""
+        self.publish(report)
+        combined = json.loads(json.dumps(report))
+        width = len(self.paths)
+        for i, path in enumerate(self.paths):
+            total = sum(self._values[i::width])
+            set_path(combined, path, round(total) if path in self._integers else total)
+        return combined
+
+
+class Affinity:
+    """Which worker owns a session, and where to reach the others"""
+
+    def __init__(self, ring, worker, paths):
+        self.ring = ring
+        self.worker = worker
+        self.paths = paths
+
+    def owner(self, key):
+        """The worker that owns key, or None if this one does (or there is no key)"""
+        if key is None:
+            return None
+        owner = self.ring.node(key)
+        return owner if owner != self.worker else None
+
+    def new_key(self):
+        """A new session id owned by this worker"""
+        while True:
+            key = uuid.uuid4().hex
+            if self.ring.node(key) == self.worker:
+                return key
+
+    def listen(self):
+        """A Unix socket for requests forwarded by other workers, bound at this worker's path
+
+        The socket is bound under a temporary name and renamed into place, so
+        a replacement takes the path over while the old worker finishes.
+        """
+        path = self.paths[self.worker]
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        tmp_path = f'{path}.{os.getpid()}'
+        sock.bind(tmp_path)
+        os.replace(tmp_path, path)
+        return sock
+
+
+class Supervisor:
+    def __init__(self, server, processes):
+        """server: an AssistantServer built but not started; each worker serves a forked copy"""
+        from metrics import Metrics
+
+        self.server = server
+        self.processes = processes
+        self.ring = HashRing(processes)
+        self.metrics = Metrics.shared(processes)
+        self.counters = SharedCounters(server.assistant.stats, processes)
+        self.report = SharedReport(server.runtime_report(), processes, server.RUNTIME_GAUGES, server.RUNTIME_LOCAL)
+        self.pids = [None] * processes
+        self._signals = []
+        self._directory = None
+        self._sock = None
+
+    # -- workers ---------------------------------------------------------------
+
+    def spawn(self, worker):
+        """Fork a worker for a slot and wait until it is listening; returns its pid, or None if it failed"""
+        ready_read, ready_write = os.pipe()
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            status = 1
+            try:
+                self._worker(worker, ready_write)
+                status = 0
+            except BaseException as e:
+                print(f"⚠️  Worker {worker} failed: {e}")
+            finally:
+                sys.stdout.flush()
+                os._exit(status)
+        os.close(ready_write)
+        try:
+            ready = select.select([ready_read], [], [], READY_TIMEOUT)[0] and os.read(ready_read, 1)
+        finally:
+            os.close(ready_read)
+        if not ready:
+            print(f"⚠️  Worker {worker} did not start")
+            self._wait(pid, 0)
+            time.sleep(1)   # back off before the next attempt
+            return None
+        return pid
+
+    def _worker(self, worker, ready_write):
+        """Body of a worker process"""
+        import asyncio
+
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)   # restarts are the supervisor's business
+        signal.set_wakeup_fd(-1)
+
+        def ready():
+            os.write(ready_write, b'1')
+            os.close(ready_write)
+
+        server = self.server
+        server.sock = self._sock
+        server.affinity = Affinity(self.ring, worker, self._paths)
+        server.assistant.metrics = self.metrics[worker]
+        server.assistant.counters = self.counters
+        server.shared_report = self.report
+        self.counters.worker = worker
+        self.report.worker = worker
+        try:
+            asyncio.run(server.serve_forever(ready))
+        finally:
+            server.close()
+
+    def _wait(self, pid, timeout):
+        """Reap a worker, killing it if it has not exited within timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if done:
+                return
+            if time.monotonic() >= deadline:
+                os.kill(pid, signal.SIGKILL)
+                timeout = deadline = float('inf')
+            time.sleep(0.05)
+
+    def restart(self):
+        """Replace every worker, one at a time, without dropping requests"""
+        print(f"🔄 Restarting {self.processes} workers...")
+        for worker, old in enumerate(self.pids):
+            new = self.spawn(worker)
+            if new is None:
+                continue   # keep the old worker rather than leave the slot empty
+            self.pids[worker] = new
+            if old is not None:
+                os.kill(old, signal.SIGTERM)
+                self._wait(old, STOP_TIMEOUT)
+
+    def reap(self):
+        """Replace workers that exited on their own (or failed to start)"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if pid in self.pids:
+                worker = self.pids.index(pid)
+                print(f"⚠️  Worker {worker} exited ({status}); starting a new one")
+                self.pids[worker] = None
+        for worker, pid in enumerate(self.pids):
+            if pid is None:
+                self.pids[worker] = self.spawn(worker)
+
+    def stop(self):
+        for pid in self.pids:
+            if pid is not None:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        for pid in self.pids:
+            if pid is not None:
+                self._wait(pid, STOP_TIMEOUT)
+        self.pids = [None] * self.processes
+
+    # -- supervisor loop -------------------------------------------------------
+
+    def run(self):
+        """Start the workers and supervise them until SIGINT/SIGTERM"""
+        server = self.server
+        self._sock = socket.create_server((server.host, server.port), backlog=1024)
+        server.port = self._sock.getsockname()[1]
+        self._directory = tempfile.mkdtemp(prefix='ai-assistant-')
+        self._paths = [os.path.join(self._directory, f'worker-{i}.sock') for i in range(self.processes)]
+
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        signal.set_wakeup_fd(wakeup_write)
+        for sig in (signal.SIGCHLD, signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: self._signals.append(signum))
+        try:
+            for worker in range(self.processes):
+                self.pids[worker] = self.spawn(worker)
+            print(f"🌐 AI Assistant running at http://{server.host}:{server.port}/ "
+                  f"({self.processes} worker processes, pid {os.getpid()}; SIGHUP restarts them)")
+            while True:
+                select.select([wakeup_read], [], [], 1.0)
+                try:
+                    os.read(wakeup_read, 512)
+                except BlockingIOError:
+                    pass
+                signals, self._signals = self._signals, []
+                if signal.SIGINT in signals or signal.SIGTERM in signals:
+                    break
+                self.reap()
+                if signal.SIGHUP in signals:
+                    self.restart()
+        finally:
+            self.stop()
+            signal.set_wakeup_fd(-1)
+            os.close(wakeup_read)
+            os.close(wakeup_write)
+            self._sock.close()
+            shutil.rmtree(self._directory, ignore_errors=True)
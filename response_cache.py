@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Response Cache - bounded LRU cache for handler responses
+
+Entries are keyed on (function, normalized query). The cache is bounded both by
+entry count and by the total UTF-8 size of keys plus values; the least recently
+used entries are evicted first. An optional TTL expires entries lazily on
+lookup. All operations take one lock, so one cache can be shared by every
+thread of the web server.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+_HORIZONTAL_SPACE = re.compile(r'[ \t\f\v]+')
+
+
+def normalize_query(text):
+    """Collapse runs of spaces/tabs, unify line endings and trim the ends"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return _HORIZONTAL_SPACE.sub(' ', text).strip()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()   # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def entry_size(key, value):
+        """Bytes charged against max_bytes for one entry"""
+        function, query = key
+        return len(function) + len(query.encode('utf-8')) + len(value.encode('utf-8'))
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, size, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay in bounds"""
+        size = self.entry_size(key, value)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters and current size, read under the lock"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Response Catalog - the assistant's wording, kept out of the code
+
+Every canned response, template and sample prompt lives under catalog/:
+
+    catalog/manifest.json     {"version": N, "functions": {"advice": "advice.json", ...}}
+    catalog/<function>.json   {"sample_prompts": [...], "responses": {...}, "templates": {...}}
+
+Long texts may be written as a list of lines; they are joined with newlines.
+Bump "version" in the manifest when publishing a change so logs and clients
+can tell catalog revisions apart.
+
+A function's file is parsed the first time that function is used, once per
+revision (the files themselves are only a few KB and are read up front). Files are checked for changes at most every `check_interval`
+seconds; a change builds a new CatalogSnapshot (parsing the changed files)
+and swaps it in with a single assignment, so a reader holding a snapshot keeps
+seeing one consistent revision while new requests get the new one. A changed
+file that does not parse is reported and the previous revision stays in use.
+Replace files atomically (write a temporary file, then rename) when editing a
+live deployment.
+"""
+
+import json
+import os
+import threading
+import time
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog')
+MANIFEST = 'manifest.json'
+
+
+def _signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _text(value):
+    """A catalog string, written either as one string or as a list of lines"""
+    return '\n'.join(value) if isinstance(value, list) else value
+
+
+class FunctionCatalog:
+    """Parsed wording of one function"""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.sample_prompts = tuple(data.get('sample_prompts', ()))
+        self.responses = {key: _text(value) for key, value in data.get('responses', {}).items()}
+        self.templates = {key: _text(value) for key, value in data.get('templates', {}).items()}
+
+    def response(self, key):
+        """Canned response for an intent, or the function's default response"""
+        return self.responses[key] if key in self.responses else self.responses['default']
+
+    def render(self, template, **fields):
+        return self.templates[template].format(**fields)
+
+
+class CatalogSnapshot:
+    """One consistent revision of the catalog
+
+    The raw file contents are captured when the snapshot is built; each
+    function is parsed from them on first use, so a file edited later can never
+    leak into this revision.
+    """
+
+    def __init__(self, root, manifest, signatures, loaded=None):
+        self.root = root
+        self.version = manifest.get('version')
+        self.files = dict(manifest['functions'])
+        self.signatures = signatures
+        self._loaded = dict(loaded or {})
+        self._raw = {}
+        for name, filename in self.files.items():
+            if name not in self._loaded:
+                with open(os.path.join(root, filename), 'rb') as f:
+                    self._raw[name] = f.read()
+        self._lock = threading.Lock()
+
+    def function(self, name):
+        catalog = self._loaded.get(name)
+        if catalog is None:
+            with self._lock:
+                catalog = self._loaded.get(name)
+                if catalog is None:
+                    catalog = self._parse(name)
+                    self._loaded[name] = catalog
+        return catalog
+
+    def _parse(self, name):
+        if name not in self._raw:
+            raise KeyError(f"Function '{name}' is not in the response catalog")
+        try:
+            catalog = FunctionCatalog(name, json.loads(self._raw[name].decode('utf-8')))
+        except ValueError as e:
+            raise ValueError(f"{self.files[name]}: {e}")
+        del self._raw[name]
+        return catalog
+
+    def loaded(self):
+        """Functions parsed so far, by name"""
+        return dict(self._loaded)
+
+
+class ResponseCatalog:
+    def __init__(self, path=CATALOG_PATH, check_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failed = None
+        self._snapshot = self._build(self._read_manifest(), None)
+        self._checked = clock()
+
+    def _read_manifest(self):
+        with open(os.path.join(self.path, MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if not isinstance(manifest.get('functions'), dict):
+            raise ValueError("catalog manifest needs a 'functions' mapping")
+        return manifest
+
+    def _signatures(self, files):
+        paths = [MANIFEST] + sorted(set(files.values()))
+        return {name: _signature(os.path.join(self.path, name)) for name in paths}
+
+    def _build(self, manifest, previous):
+        """New snapshot, reusing functions of previous whose files did not change
+
+        Changed files are parsed right away, so a broken edit is rejected here
+        and the previous revision stays in use.
+        """
+        signatures = self._signatures(manifest['functions'])
+        if previous is None:
+            return CatalogSnapshot(self.path, manifest, signatures)
+
+        loaded = previous.loaded()
+        unchanged = {}
+        changed = []
+        for name, filename in manifest['functions'].items():
+            if filename == previous.files.get(name) and signatures[filename] == previous.signatures.get(filename):
+                if name in loaded:
+                    unchanged[name] = loaded[name]
+            else:
+                changed.append(name)
+        snapshot = CatalogSnapshot(self.path, manifest, signatures, unchanged)
+        for name in changed:
+            snapshot.function(name)
+        return snapshot
+
+    def snapshot(self):
+        """The current revision, checking the files if check_interval has passed"""
+        now = self._clock()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._reload_if_changed()
+        return self._snapshot
+
+    def reload(self):
+        """Check the files right away; returns True if a new revision was loaded"""
+        with self._lock:
+            self._checked = self._clock()
+            return self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        current = self._snapshot
+        try:
+            observed = self._signatures(current.files)
+        except OSError as e:
+            observed = str(e)   # a missing file: report it once, like a bad one
+        if observed == current.signatures or observed == self._failed:
+            return False
+        try:
+            self._snapshot = self._build(self._read_manifest(), current)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️  Could not reload response catalog, keeping version {current.version}: {e}")
+            self._failed = observed
+            return False
+        self._failed = None
+        return True
+
+
+_default = None
+
+
+def default_catalog():
+    """Shared catalog at CATALOG_PATH"""
+    global _default
+    if _default is None:
+        _default = ResponseCatalog()
+    return _default
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Scheduler - admission control and weighted scheduling of handler calls
+
+Work is queued per function and run by a fixed set of worker threads:
+
+    future = scheduler.submit('summarize', job, deadline=clock() + 30)
+    value = scheduler.run('questions', job, client='10.0.0.7', timeout=5)
+    value = await scheduler.run_async('advice', job, client='10.0.0.7', timeout=5)
+
+Scheduling is weighted fair queuing by time: each function's queue is charged
+its average service time divided by its weight for every job it runs, and the
+queue with the smallest charge goes next. A burst of slow summaries therefore
+gets its share of the workers (weight for weight, by time) while cheap
+questions keep flowing. A queue that was idle re-enters at the current charge
+level, so idling banks no credit.
+
+Admission control rejects work up front instead of letting latency grow:
+
+    rate, burst     token bucket per client (requests per second, bucket size);
+                    an empty bucket raises Overloaded('rate_limited')
+    max_queue       queued jobs per function; a full queue raises
+                    Overloaded('queue_full')
+
+A job whose deadline has passed, or whose caller has given up (cancelled its
+future, as run() and run_async() do on timeout), is dropped when it reaches the
+front of its queue instead of being run.
+
+stats() reports, per function, how long jobs waited in the queue separately
+from how long they took to run.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+DEFAULT_WEIGHTS = {'questions': 4, 'summarize': 1, 'creative': 2, 'advice': 2}
+
+# Smoothing of the per-function service time estimate
+SERVICE_EWMA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = clock()
+        self._clock = clock
+
+    def take(self):
+        """Take one token if there is one"""
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def full(self):
+        return self.tokens + (self._clock() - self.updated) * self.rate >= self.burst
+
+
+class _Job:
+    __slots__ = ('fn', 'future', 'deadline', 'enqueued')
+
+    def __init__(self, fn, deadline, enqueued):
+        self.fn = fn
+        self.future = Future()
+        self.deadline = deadline
+        self.enqueued = enqueued
+
+
+class _FunctionQueue:
+    def __init__(self, weight):
+        self.weight = weight
+        self.jobs = deque()
+        self.charge = 0.0
+        self.service_estimate = 0.0
+        self.stats = {'completed': 0, 'failed': 0, 'rejected': 0, 'expired': 0, 'cancelled': 0,
+                      'wait_seconds': 0.0, 'service_seconds': 0.0}
+
+
+class Scheduler:
+    def __init__(self, workers=4, weights=None, max_queue=64, rate=None, burst=None,
+                 clock=time.monotonic, max_clients=10_000):
+        weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("weights must be positive")
+        if workers < 1 or max_queue < 1:
+            raise ValueError("workers and max_queue must be at least 1")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rate = rate
+        self.burst = burst if burst is not None else (max(1.0, 2 * rate) if rate else None)
+        self.clock = clock
+        self.max_clients = max_clients
+        self.rate_limited = 0
+        self._queues = {function: _FunctionQueue(weight) for function, weight in weights.items()}
+        self._queued = 0
+        self._charge = 0.0      # charge of the queue picked last; idle queues re-enter here
+        self._buckets = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = []
+
+    # -- admission -----------------------------------------------------------
+
+    def admit(self, client):
+        """Charge one request to a client's token bucket; raises Overloaded when it is empty"""
+        if self.rate is None or client is None:
+            return
+        with self._cond:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    # Forget clients whose buckets have refilled; they lose nothing
+                    self._buckets = {c: b for c, b in self._buckets.items() if not b.full()}
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, self.clock)
+            if bucket.take():
+                return
+            self.rate_limited += 1
+        raise Overloaded('rate_limited', f"Too many requests from {client}; limit is {self.rate:g}/s")
+
+    def submit(self, function, fn, client=None, deadline=None):
+        """Queue fn() to run on a worker; returns a Future
+
+        `deadline` is on the scheduler's clock; a job still queued at its
+        deadline fails with DeadlineExceeded without running.
+        """
+        queue = self._queues.get(function)
+        if queue is None:
+            raise ValueError(f"Unknown function '{function}'. Choose from: {', '.join(self._queues)}")
+        self.admit(client)
+        job = _Job(fn, deadline, self.clock())
+        with self._cond:
+            if self._closed:
+                raise Overloaded('closed', "Scheduler is shutting down")
+            if len(queue.jobs) >= self.max_queue:
+                queue.stats['rejected'] += 1
+                raise Overloaded('queue_full', f"Too many queued '{function}' requests; try again shortly")
+            if not queue.jobs:
+                queue.charge = max(queue.charge, self._charge)
+            queue.jobs.append(job)
+            self._queued += 1
+            self._ensure_workers()
+            self._cond.notify()
+        return job.future
+
+    def run(self, function, fn, client=None, timeout=None):
+        """Submit and wait; a caller that times out raises DeadlineExceeded and its job is dropped"""
+        deadline = self.clock() + timeout if timeout is not None else None
+        future = self.submit(function, fn, client, deadline)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"'{function}' request did not finish within {timeout:g}s")
+
+    async def run_async(self, function, fn, client=None, timeout=None):
+        """Submit and await; like run(), for coroutines"""
+        deadline = self.clock() + timeout if timeout is not None else None
+        future = self.submit(function, fn, client, deadline)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"'{function}' request did not finish within {timeout:g}s")
+
+    # -- workers -------------------------------------------------------------
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use; caller holds the condition"""
+        if not self._threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'scheduler-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next(self):
+        """Pop the next job from the queue with the smallest charge; caller holds the condition"""
+        function, queue = min(
+            ((function, queue) for function, queue in self._queues.items() if queue.jobs),
+            key=lambda item: item[1].charge
+        )
+        self._charge = queue.charge
+        queue.charge += max(queue.service_estimate, 1e-4) / queue.weight
+        self._queued -= 1
+        return function, queue, queue.jobs.popleft()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queued and not self._closed:
+                    self._cond.wait()
+                if not self._queued:
+                    return
+                function, queue, job = self._next()
+
+            if not job.future.set_running_or_notify_cancel():
+                with self._cond:
+                    queue.stats['cancelled'] += 1
+                continue
+            start = self.clock()
+            if job.deadline is not None and start >= job.deadline:
+                with self._cond:
+                    queue.stats['expired'] += 1
+                job.future.set_exception(DeadlineExceeded(f"'{function}' request expired after "
+                                                          f"{start - job.enqueued:.2f}s in the queue"))
+                continue
+
+            try:
+                result = job.fn()
+            except BaseException as e:
+                failed = e
+            else:
+                failed = None
+            end = self.clock()
+
+            with self._cond:
+                service = end - start
+                if queue.stats['completed'] + queue.stats['failed']:
+                    queue.service_estimate += SERVICE_EWMA * (service - queue.service_estimate)
+                else:
+                    queue.service_estimate = service
+                queue.stats['failed' if failed else 'completed'] += 1
+                queue.stats['wait_seconds'] += start - job.enqueued
+                queue.stats['service_seconds'] += service
+            if failed is not None:
+                job.future.set_exception(failed)
+            else:
+                job.future.set_result(result)
+
+    def close(self, wait=True):
+        """Stop accepting work; queued jobs still run before the workers exit"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    # -- reporting -----------------------------------------------------------
+
+    def stats(self):
+        """Per-function queue depth, outcomes and average wait / service time (ms)"""
+        with self._cond:
+            report = {'rate_limited': self.rate_limited, 'functions': {}}
+            for function, queue in self._queues.items():
+                stats = dict(queue.stats)
+                stats['queued'] = len(queue.jobs)
+                stats['weight'] = queue.weight
+                report['functions'][function] = add_averages(stats)
+            return report
+
+
+def add_averages(stats):
+    """Set avg_wait_ms and avg_service_ms of one function's queue stats from its totals"""
+    ran = stats['completed'] + stats['failed']
+    stats['avg_wait_ms'] = stats['wait_seconds'] / ran * 1000 if ran else 0.0
+    stats['avg_service_ms'] = stats['service_seconds'] / ran * 1000 if ran else 0.0
+    return stats
+
+
+def parse_weights(spec):
+    """Parse 'questions=4,summarize=1,...' into a weights dict (unnamed functions keep their defaults)"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        function, sep, value = item.partition('=')
+        if not sep or function not in weights:
+            raise ValueError(f"Invalid weight '{item}'. Use function=weight with one of: {', '.join(weights)}")
+        try:
+            weights[function] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid weight '{item}'")
+        if weights[function] <= 0:
+            raise ValueError(f"Weight of '{function}' must be positive")
+    return weights
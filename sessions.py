@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Sessions - multi-turn conversation history with a fixed memory budget
+
+Each session keeps its most recent `max_turns` turns in a ring buffer (a
+bounded deque); older turns fall off the end. A turn is a slotted record of
+function, query, response, time and feedback, and long texts are clipped to
+`max_chars` so one pasted document cannot blow the budget.
+
+The store tracks an estimate of the memory its sessions use (object overhead
+plus the size of every string). When the total passes `memory_budget`, the
+least recently used sessions are evicted until it fits again. With a
+`spill_dir` they are written to disk first and transparently restored the next
+time they are used; without one they are dropped.
+
+Sessions are serialized in a compact binary form (struct-packed headers plus
+UTF-8 text), which is several times smaller and faster than JSON:
+
+    b'AIS1' | id length, turn count | id | per turn: header, query, response, comment
+"""
+
+import hashlib
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+FUNCTIONS = ('questions', 'summarize', 'creative', 'advice')
+FUNCTION_CODES = {name: code for code, name in enumerate(FUNCTIONS)}
+
+SESSION_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+MAGIC = b'AIS1'
+SESSION_HEADER = struct.Struct('<HI')       # id length, turn count
+TURN_HEADER = struct.Struct('<BbdIII')      # function, feedback, created, query/response/comment lengths
+
+# Rough fixed costs of the objects behind a session and a turn, in bytes
+SESSION_OVERHEAD = 800
+TURN_OVERHEAD = 120
+
+
+class Turn:
+    __slots__ = ('function', 'query', 'response', 'created', 'feedback', 'comment')
+
+    def __init__(self, function, query, response, created, feedback=0, comment=''):
+        self.function = function
+        self.query = query
+        self.response = response
+        self.created = created
+        self.feedback = feedback       # 1 helpful, -1 not helpful, 0 none yet
+        self.comment = comment
+
+    def size(self):
+        return TURN_OVERHEAD + sys.getsizeof(self.query) + sys.getsizeof(self.response) + sys.getsizeof(self.comment)
+
+    def to_dict(self):
+        return {
+            'function': self.function,
+            'query': self.query,
+            'response': self.response,
+            'created': self.created,
+            'feedback': {1: 'helpful', -1: 'not_helpful'}.get(self.feedback),
+            'comment': self.comment or None
+        }
+
+
+class Session:
+    __slots__ = ('id', 'turns', 'bytes')
+
+    def __init__(self, session_id, max_turns):
+        self.id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.bytes = SESSION_OVERHEAD + sys.getsizeof(session_id)
+
+    def append(self, turn):
+        if len(self.turns) == self.turns.maxlen:
+            self.bytes -= self.turns[0].size()
+        self.turns.append(turn)
+        self.bytes += turn.size()
+
+
+def dump_session(session):
+    """Serialize a session to bytes"""
+    session_id = session.id.encode('utf-8')
+    parts = [MAGIC, SESSION_HEADER.pack(len(session_id), len(session.turns)), session_id]
+    for turn in session.turns:
+        query = turn.query.encode('utf-8')
+        response = turn.response.encode('utf-8')
+        comment = turn.comment.encode('utf-8')
+        parts.append(TURN_HEADER.pack(FUNCTION_CODES[turn.function], turn.feedback, turn.created,
+                                      len(query), len(response), len(comment)))
+        parts += (query, response, comment)
+    return b''.join(parts)
+
+
+def load_session(data, max_turns):
+    """Rebuild a session serialized by dump_session (keeping at most max_turns turns)"""
+    if data[:4] != MAGIC:
+        raise ValueError("not a session file")
+    id_length, count = SESSION_HEADER.unpack_from(data, 4)
+    offset = 4 + SESSION_HEADER.size
+    session = Session(data[offset:offset + id_length].decode('utf-8'), max_turns)
+    offset += id_length
+    for _ in range(count):
+        code, feedback, created, q, r, c = TURN_HEADER.unpack_from(data, offset)
+        offset += TURN_HEADER.size
+        raw = data[offset:offset + q + r + c]
+        offset += q + r + c
+        session.append(Turn(FUNCTIONS[code], raw[:q].decode('utf-8'), raw[q:q + r].decode('utf-8'),
+                            created, feedback, raw[q + r:].decode('utf-8')))
+    return session
+
+
+def clip(text, max_chars):
+    """Keep at most max_chars characters of text"""
+    return text if len(text) <= max_chars else text[:max_chars - 1] + '…'
+
+
+class SessionStore:
+    def __init__(self, max_turns=8, memory_budget=64 * 1024 * 1024, spill_dir=None, max_chars=4000,
+                 clock=time.time):
+        self.max_turns = max_turns
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.max_chars = max_chars
+        self.bytes = 0
+        self.counters = {'created': 0, 'evicted': 0, 'spilled': 0, 'restored': 0}
+        self._sessions = OrderedDict()   # least recently used first
+        self._lock = threading.RLock()
+        self._clock = clock
+
+    @staticmethod
+    def valid_id(session_id):
+        return isinstance(session_id, str) and SESSION_ID.fullmatch(session_id) is not None
+
+    def _spill_path(self, session_id):
+        digest = hashlib.blake2b(session_id.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, digest[:2], digest + '.session')
+
+    def _get(self, session_id, create):
+        """The session, from memory or disk, marked most recently used; caller holds the lock"""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+        session = self._restore(session_id)
+        if session is None:
+            if not create:
+                return None
+            if not self.valid_id(session_id):
+                raise ValueError("session id must be 1-64 letters, digits, '-' or '_'")
+            session = Session(session_id, self.max_turns)
+            self.counters['created'] += 1
+        self._sessions[session_id] = session
+        self.bytes += session.bytes
+        return session
+
+    def _restore(self, session_id):
+        if self.spill_dir is None or not self.valid_id(session_id):
+            return None
+        path = self._spill_path(session_id)
+        try:
+            with open(path, 'rb') as f:
+                session = load_session(f.read(), self.max_turns)
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"⚠️  Could not restore session {session_id}: {e}")
+            return None
+        self.counters['restored'] += 1
+        return session
+
+    def _spill(self, session):
+        path = self._spill_path(session.id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(dump_session(session))
+        os.replace(tmp_path, path)
+        self.counters['spilled'] += 1
+
+    def _evict(self, keep):
+        """Evict least recently used sessions until the budget fits; caller holds the lock"""
+        while self.bytes > self.memory_budget and len(self._sessions) > 1:
+            session_id, session = next(iter(self._sessions.items()))
+            if session_id == keep:
+                break
+            if self.spill_dir is not None and session.turns:
+                try:
+                    self._spill(session)
+                except OSError as e:
+                    print(f"⚠️  Could not spill session {session_id}: {e}")
+            del self._sessions[session_id]
+            self.bytes -= session.bytes
+            self.counters['evicted'] += 1
+
+    def record_turn(self, session_id, function, query, response):
+        """Append a turn to a session (created if needed); returns the turn"""
+        turn = Turn(function, clip(query, self.max_chars), clip(response, self.max_chars), self._clock())
+        with self._lock:
+            session = self._get(session_id, create=True)
+            before = session.bytes
+            session.append(turn)
+            self.bytes += session.bytes - before
+            self._evict(keep=session_id)
+        return turn
+
+    def record_feedback(self, session_id, helpful, comment=None):
+        """Attach feedback to the latest turn of a session; returns that turn, or None if there is none"""
+        with self._lock:
+            session = self._get(session_id, create=False)
+            if session is None or not session.turns:
+                return None
+            turn = session.turns[-1]
+            before = turn.size()
+            turn.feedback = 1 if helpful else -1
+            turn.comment = clip(comment or '', self.max_chars)
+            delta = turn.size() - before
+            session.bytes += delta
+            self.bytes += delta
+            self._evict(keep=session_id)
+            return turn
+
+    def history(self, session_id):
+        """The session's recent turns as dicts, oldest first ([] for an unknown session)"""
+        with self._lock:
+            session = self._get(session_id, create=False)
+            return [turn.to_dict() for turn in session.turns] if session is not None else []
+
+    def spill_all(self):
+        """Write every session in memory to spill_dir (at shutdown, so they survive a restart)"""
+        if self.spill_dir is None:
+            return
+        with self._lock:
+            for session in self._sessions.values():
+                if session.turns:
+                    self._spill(session)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update(sessions=len(self._sessions), bytes=self.bytes, budget=self.memory_budget)
+            return stats
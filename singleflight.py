@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Single Flight - collapse identical concurrent calls into one computation
+
+When several callers ask for the same key while it is being computed, only
+the first (the leader) runs the computation; the others wait for it and
+receive the same value, or the same exception. Once the computation finishes
+the key is free again, so this only merges calls that overlap in time (the
+response cache covers repeats that don't).
+
+Threads and asyncio tasks share the same flights, so a coroutine may wait for
+a computation a thread started and vice versa:
+
+    value, shared = flights.do(key, compute)                 # threads
+    value, shared = await flights.do_async(key, acompute)    # coroutines
+
+`shared` is True for callers that received another caller's result.
+
+Cancellation behaves as it would without coalescing, as far as each caller can
+tell: a waiter that times out (do) or is cancelled (do_async) just stops
+waiting. An asyncio computation is itself cancelled only once every caller
+waiting for it has been cancelled; its remaining waiters then see
+CancelledError, as they would have had they made the call themselves.
+
+A computation that re-enters the same key (directly, or on a thread started
+with a copy of the leader's context, such as loop.run_in_executor with
+contextvars.copy_context().run) runs inline instead of waiting on itself.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import Future
+
+_leading = contextvars.ContextVar('singleflight_leading', default=())
+
+
+class _Flight:
+    __slots__ = ('future', 'waiters', 'task')
+
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 1
+        self.task = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Return (flight, is leader) for key"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.computed += 1
+                return flight, True
+            flight.waiters += 1
+            self.coalesced += 1
+            return flight, False
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _leave(self, flight):
+        """A caller stopped waiting; True if nobody is waiting any more"""
+        with self._lock:
+            flight.waiters -= 1
+            return flight.waiters == 0
+
+    def do(self, key, fn, timeout=None):
+        """Call fn() once for every concurrent caller with this key; returns (value, shared)
+
+        A waiter that gets no result within `timeout` seconds raises TimeoutError.
+        """
+        if key in _leading.get():
+            return fn(), False
+
+        flight, leader = self._join(key)
+        if not leader:
+            try:
+                return flight.future.result(timeout), True
+            finally:
+                self._leave(flight)
+
+        token = _leading.set(_leading.get() + (key,))
+        try:
+            value = fn()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.future.set_exception(e)
+            raise
+        finally:
+            _leading.reset(token)
+            self._leave(flight)
+        self._land(key, flight)
+        flight.future.set_result(value)
+        return value, False
+
+    async def do_async(self, key, fn):
+        """Await fn() once for every concurrent caller with this key; returns (value, shared)
+
+        fn is called without arguments and must return an awaitable.
+        """
+        import asyncio   # only async callers pay for it; threaded ones never import it
+
+        if key in _leading.get():
+            return await fn(), False
+
+        flight, leader = self._join(key)
+        if leader:
+            token = _leading.set(_leading.get() + (key,))
+            try:
+                # The computation gets its own task, so cancelling the leader does not cancel it
+                flight.task = asyncio.ensure_future(fn())
+                flight.task.add_done_callback(lambda task: self._settle(key, flight, task))
+            except BaseException as e:
+                self._land(key, flight)
+                flight.future.set_exception(e)
+                raise
+            finally:
+                _leading.reset(token)
+
+        try:
+            value = await asyncio.shield(asyncio.wrap_future(flight.future))
+        except asyncio.CancelledError:
+            if self._leave(flight) and flight.task is not None:
+                flight.task.cancel()
+            raise
+        except BaseException:
+            self._leave(flight)
+            raise
+        self._leave(flight)
+        return value, not leader
+
+    def _settle(self, key, flight, task):
+        """Hand the outcome of an asyncio computation to its waiters"""
+        self._land(key, flight)
+        if task.cancelled():
+            flight.future.cancel()
+        elif task.exception() is not None:
+            flight.future.set_exception(task.exception())
+        else:
+            flight.future.set_result(task.result())
+
+    def stats(self):
+        with self._lock:
+            return {'computed': self.computed, 'coalesced': self.coalesced, 'in_flight': len(self._flights)}
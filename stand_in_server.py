@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Stand-in Server - a local inference server for development and benchmarks
+
+Speaks the batch protocol of HTTPBackend (see backends.py) and answers with
+the assistant's canned responses. It runs one batch at a time and charges a
+fixed cost per batch plus a cost per request, like a single accelerator:
+
+    python backends.py serve --port 9000 --batch-delay 0.02 --item-delay 0.001
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Answers the batch protocol with canned responses, one batch at a time"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, batch_delay=0.0, item_delay=0.0):
+        super().__init__(address, StandInHandler)
+        from ai_assistant import AIAssistant
+        self.responders = AIAssistant(load_stats=False).canned
+        self.batch_delay = batch_delay
+        self.item_delay = item_delay
+        self.model = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def run_batch(self, requests):
+        with self.model:
+            time.sleep(self.batch_delay + self.item_delay * len(requests))
+            self.batches += 1
+            self.items += len(requests)
+        responses = []
+        for request in requests:
+            responder = self.responders.get(request.get('function'))
+            if responder is None:
+                responses.append({'error': f"Unknown function '{request.get('function')}'"})
+            else:
+                responses.append({'text': responder(str(request.get('text', '')))})
+        return responses
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            requests = json.loads(self.rfile.read(length))['requests']
+            status, data = 200, {'responses': self.server.run_batch(requests)}
+        except (ValueError, KeyError, TypeError) as e:
+            status, data = 400, {'error': f"bad batch request: {e}"}
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # the client timed out and hung up
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Stats Journal - crash-safe, multi-process persistence for AIAssistant.stats
+
+Instead of rewriting the whole stats file at exit, every change is appended
+to a journal as a small JSON line of counter deltas:
+
+    {"ts": 1700000000.0, "add": {"total_queries": 1, "function_usage.advice": 1}}
+
+Events are buffered and written with one fsync per batch (every `sync_every`
+events or `sync_interval` seconds, whichever comes first), so a crash loses at
+most one batch. Every write happens under an exclusive file lock, so several
+processes can share the same journal.
+
+When the journal grows past `compact_bytes` it is folded into the snapshot
+(ai_assistant_stats.json, the same format the stats file always had) and
+truncated. Loading reads the snapshot plus the journal tail, so start-up time
+is bounded by `compact_bytes` however long the deployment has been running.
+
+The snapshot records which journal epoch and byte offset it already contains
+(under the "_journal" key), so a crash between writing the snapshot and
+truncating the journal never double-counts events.
+
+File locking uses fcntl and is skipped on platforms without it.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+JOURNAL_KEY = '_journal'
+
+
+def apply_delta(stats, path, delta):
+    """Add delta to the counter at a dotted path such as 'function_usage.advice'"""
+    *parents, name = path.split('.')
+    node = stats
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[name] = node.get(name, 0) + delta
+
+
+class StatsJournal:
+    def __init__(self, snapshot_path='ai_assistant_stats.json', journal_path=None,
+                 sync_every=32, sync_interval=1.0, compact_bytes=1024 * 1024):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.lock_path = self.journal_path + '.lock'
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+
+        self._pending = []
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._fd = None
+        self._flusher = None
+        self._closed = threading.Event()
+        atexit.register(self.close)
+
+    # -- locking -------------------------------------------------------------
+
+    def _file_lock(self, exclusive):
+        return FileLock(self.lock_path, exclusive)
+
+    def _open_journal(self):
+        if self._fd is None:
+            flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+            self._fd = os.open(self.journal_path, flags, 0o644)
+        return self._fd
+
+    # -- writing -------------------------------------------------------------
+
+    def record(self, deltas, **details):
+        """Queue one event of counter deltas (plus optional details such as a comment)"""
+        event = {'ts': round(time.time(), 3), 'add': deltas}
+        event.update(details)
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._pending.append(line.encode('utf-8'))
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            due = len(self._pending) >= self.sync_every
+        if due:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        """Start the background thread that flushes batches older than sync_interval"""
+        if self._flusher is None or not self._flusher.is_alive():
+            with self._lock:
+                if self._flusher is None or not self._flusher.is_alive():
+                    self._flusher = threading.Thread(target=self._flush_loop, name='stats-journal', daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.sync_interval):
+            with self._lock:
+                due = self._pending_since is not None and time.monotonic() - self._pending_since >= self.sync_interval
+            if due:
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"⚠️  Could not write stats journal: {e}")
+
+    def flush(self):
+        """Append buffered events with a single fsync, compacting if the journal got large"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = b''.join(self._pending)
+            self._pending = []
+            self._pending_since = None
+
+            with self._file_lock(exclusive=True):
+                fd = self._open_journal()
+                size = os.fstat(fd).st_size
+                if size == 0:
+                    os.write(fd, self._header())
+                else:
+                    os.lseek(fd, size - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b'\n':
+                        os.write(fd, b'\n')  # seal a line torn by an earlier crash
+                os.write(fd, batch)
+                os.fsync(fd)
+                if os.fstat(fd).st_size > self.compact_bytes:
+                    self._compact_locked()
+
+    def close(self):
+        """Flush anything buffered and stop the background flusher"""
+        self._closed.set()
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"⚠️  Could not write stats journal: {e}")
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    # -- reading -------------------------------------------------------------
+
+    def _header(self):
+        return (json.dumps({'epoch': uuid.uuid4().hex}) + '\n').encode('utf-8')
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except FileNotFoundError:
+            return {}, None
+        marker = stats.pop(JOURNAL_KEY, None)
+        return stats, marker
+
+    def _read_journal(self):
+        """Return (epoch, bytes after the header line) of the journal"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, b''
+        header, _, body = data.partition(b'\n')
+        try:
+            epoch = json.loads(header)['epoch']
+        except (ValueError, KeyError, TypeError):
+            return None, data
+        return epoch, body
+
+    def _replay(self, stats, body):
+        """Apply every complete event in body; a torn line from a crash is skipped"""
+        for line in body.splitlines():
+            try:
+                event = json.loads(line)
+                deltas = event['add']
+            except (ValueError, KeyError, TypeError):
+                continue
+            for path, delta in deltas.items():
+                apply_delta(stats, path, delta)
+
+    def _load_locked(self):
+        """Return (stats, journal epoch, journal body length); caller holds the file lock"""
+        stats, marker = self._read_snapshot()
+        epoch, body = self._read_journal()
+        start = 0
+        if marker and epoch is not None and marker.get('epoch') == epoch:
+            start = marker.get('offset', 0)
+        self._replay(stats, body[start:])
+        return stats, epoch, len(body)
+
+    def load(self):
+        """Rebuild the stats from the snapshot plus the journal tail"""
+        with self._file_lock(exclusive=False):
+            stats, _, _ = self._load_locked()
+        return stats
+
+    # -- compaction ----------------------------------------------------------
+
+    def compact(self):
+        """Fold the journal into the snapshot and truncate it"""
+        self.flush()
+        with self._lock, self._file_lock(exclusive=True):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        stats, epoch, length = self._load_locked()
+        if epoch is not None:
+            stats[JOURNAL_KEY] = {'epoch': epoch, 'offset': length}
+
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # The snapshot now covers the whole journal, so start a new epoch
+        fd = self._open_journal()
+        os.ftruncate(fd, 0)
+        os.write(fd, self._header())
+        os.fsync(fd)
+
+
+class FileLock:
+    """flock-based lock on a side file; a no-op where fcntl is unavailable"""
+
+    def __init__(self, path, exclusive):
+        self.path = path
+        self.exclusive = exclusive
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Summarizer - extractive summaries for summarize_text
+
+Sentences are ranked with TextRank over TF-IDF cosine similarity. The
+similarity graph is never materialized: with unit-length sentence vectors V,
+the graph is W = V·Vᵀ - I, so each PageRank step is two sparse products
+(Vᵀ·y, then V·z) done with np.bincount. A ranking pass is therefore linear in
+the number of tokens instead of quadratic in the number of sentences.
+
+Large documents are read in blocks of sentences. Each block is ranked on its
+own and only its best candidates are kept; the pooled candidates are ranked
+again at the end. Memory is bounded by the block size and the candidate pool,
+not by the document size, and the input can be a string or any iterable of
+text chunks (for example a file read piece by piece).
+
+ExtractiveSummarizer has one method per prompt style of the handler:
+    summarize(source, count)      brief N-line summary, in document order
+    key_points(source, count)     the N most central points, best first
+    focus(source, count)          challenges and recommendations, keyword-biased
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+SENTENCE_BOUNDARY = re.compile(
+    r'(?<=[.!?])["\')\]]*\s+(?=["\'(\[]?[A-Z0-9])'   # end punctuation before a capital
+    r'|\n[ \t]*\n\s*'                               # blank line
+    r'|\n(?=[ \t]*(?:[-*•]|\d+[.)])\s)'             # start of a list item
+)
+# A line that may turn out to be a list item once the next chunk arrives
+LIST_ITEM_TAIL = re.compile(r'\n[ \t]*(?:[-*•]|\d+[.)]?)?\Z')
+TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over own
+same she so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves
+""".split())
+
+# Word stems that mark a sentence as describing a problem or a proposed action
+CHALLENGE_STEMS = (
+    'challeng', 'problem', 'issue', 'risk', 'barrier', 'obstacle', 'difficult', 'concern',
+    'limitation', 'lack', 'shortage', 'declin', 'fail', 'threat', 'weak', 'gap', 'bottleneck',
+    'delay', 'shortfall', 'struggl', 'unable', 'insufficient', 'constraint'
+)
+RECOMMENDATION_STEMS = (
+    'recommend', 'should', 'suggest', 'propos', 'must', 'improv', 'solution', 'strateg',
+    'prioriti', 'invest', 'implement', 'consider', 'adopt', 'establish', 'introduc', 'ensure',
+    'action', 'encourag', 'expand', 'develop', 'need'
+)
+
+MIN_TOKENS = 3
+MAX_SENTENCE_CHARS = 600
+
+
+@dataclass
+class Candidate:
+    position: int
+    text: str
+    score: float
+    challenge_hits: float = 0.0
+    recommendation_hits: float = 0.0
+
+
+def _rejoin_start(carry):
+    """Where a boundary that the next chunk completes could start in carry
+
+    A boundary is end punctuation, closing quotes or brackets and then
+    whitespace, whitespace alone, or a line break before a list marker, so
+    only that tail needs scanning again.
+    """
+    end = len(carry.rstrip())
+    end = len(carry[:end].rstrip('"\')]'))
+    list_item = LIST_ITEM_TAIL.search(carry, max(0, end - 64))
+    return max(0, min(end - 1, list_item.start() if list_item else end))
+
+
+def _clean(piece):
+    return ' '.join(piece.split())
+
+
+def iter_sentences(source, max_chars=MAX_SENTENCE_CHARS * 4):
+    """Yield sentences from a string or an iterable of text chunks
+
+    Text that runs on for more than max_chars without a boundary is cut (at a
+    space where possible), so an unpunctuated document is never held whole.
+    """
+    if isinstance(source, str):
+        source = (source,)
+    carry = ''
+    for chunk in source:
+        start = _rejoin_start(carry)
+        pieces = SENTENCE_BOUNDARY.split(carry[start:] + chunk)
+        pieces[0] = carry[:start] + pieces[0]
+        carry = pieces.pop()  # may continue in the next chunk
+        for piece in pieces:
+            piece = _clean(piece)
+            if piece:
+                yield piece
+        pos = 0
+        while len(carry) - pos > max_chars:
+            cut = carry.rfind(' ', pos + 1, pos + max_chars)
+            if cut < 0:
+                cut = pos + max_chars
+            piece = _clean(carry[pos:cut])
+            if piece:
+                yield piece
+            pos = cut
+        carry = carry[pos:]
+    carry = _clean(carry)
+    if carry:
+        yield carry
+
+
+class ExtractiveSummarizer:
+    def __init__(self, block_sentences=4000, pool_size=512, damping=0.85, iterations=30, tolerance=1e-6):
+        self.block_sentences = block_sentences
+        self.pool_size = pool_size
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+
+    # -- ranking -------------------------------------------------------------
+
+    def _vectorize(self, sentences):
+        """Sparse unit-length TF-IDF rows as parallel (sentence, term, weight) arrays"""
+        vocab = {}
+        sent_ids = []
+        term_ids = []
+        for i, sentence in enumerate(sentences):
+            for token in TOKEN.findall(sentence.lower()):
+                if token not in STOPWORDS and len(token) > 1:
+                    sent_ids.append(i)
+                    term_ids.append(vocab.setdefault(token, len(vocab)))
+
+        n = len(sentences)
+        if not term_ids:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0), np.zeros(n, dtype=np.int64), vocab
+
+        sent = np.asarray(sent_ids, dtype=np.int64)
+        term = np.asarray(term_ids, dtype=np.int64)
+        vocab_size = len(vocab)
+
+        # Collapse repeated (sentence, term) pairs into term frequencies
+        pair, tf = np.unique(sent * vocab_size + term, return_counts=True)
+        sent = pair // vocab_size
+        term = pair % vocab_size
+
+        df = np.bincount(term, minlength=vocab_size)
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        weight = (1 + np.log(tf)) * idf[term]
+        norms = np.sqrt(np.bincount(sent, weights=weight * weight, minlength=n))
+        weight = weight / norms[sent]
+        token_counts = np.bincount(sent, weights=tf, minlength=n).astype(np.int64)
+        return sent, term, weight, token_counts, vocab
+
+    def _textrank(self, sent, term, weight, n, vocab_size):
+        """PageRank over W = V·Vᵀ - I without building W"""
+        if n == 0:
+            return np.zeros(0)
+        if len(sent) == 0:
+            return np.full(n, 1.0 / n)
+
+        has_terms = np.bincount(sent, minlength=n) > 0
+
+        def graph_dot(y):
+            column = np.bincount(term, weights=weight * y[sent], minlength=vocab_size)
+            return np.bincount(sent, weights=weight * column[term], minlength=n) - y * has_terms
+
+        degree = graph_dot(np.ones(n))
+        inv_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 1e-12)
+        scores = np.full(n, 1.0 / n)
+        base = (1 - self.damping) / n
+        for _ in range(self.iterations):
+            updated = base + self.damping * graph_dot(scores * inv_degree)
+            if np.abs(updated - scores).sum() < self.tolerance:
+                scores = updated
+                break
+            scores = updated
+        return scores
+
+    def _stem_hits(self, sent, term, vocab, n, stems):
+        """Number of keyword-stem tokens in each sentence"""
+        if not vocab:
+            return np.zeros(n)
+        marked = np.zeros(len(vocab))
+        for token, index in vocab.items():
+            if token.startswith(stems):
+                marked[index] = 1.0
+        return np.bincount(sent, weights=marked[term], minlength=n)
+
+    def _rank_block(self, sentences, positions):
+        """Score one block of sentences and return them as candidates"""
+        sent, term, weight, token_counts, vocab = self._vectorize(sentences)
+        n = len(sentences)
+        scores = self._textrank(sent, term, weight, n, len(vocab))
+        challenge = self._stem_hits(sent, term, vocab, n, CHALLENGE_STEMS)
+        recommendation = self._stem_hits(sent, term, vocab, n, RECOMMENDATION_STEMS)
+
+        eligible = token_counts >= MIN_TOKENS
+        if not eligible.any():
+            eligible = token_counts > 0
+        return [
+            Candidate(positions[i], sentences[i], float(scores[i]), float(challenge[i]), float(recommendation[i]))
+            for i in np.flatnonzero(eligible)
+        ]
+
+    # -- block processing ----------------------------------------------------
+
+    def candidates(self, source, keep):
+        """Rank the whole source block by block, keeping at most `keep` candidates per pass"""
+        pool = []
+        block = []
+        positions = []
+
+        def flush():
+            ranked = self._rank_block(block, positions)
+            pool.extend(self._best(ranked, keep))
+            block.clear()
+            positions.clear()
+
+        position = 0
+        blocks = 0
+        for sentence in iter_sentences(source):
+            block.append(sentence[:MAX_SENTENCE_CHARS])
+            positions.append(position)
+            position += 1
+            if len(block) >= self.block_sentences:
+                flush()
+                blocks += 1
+                if len(pool) > self.pool_size:
+                    pool = self._rerank(pool, keep)
+        if block:
+            flush()
+            blocks += 1
+
+        if blocks > 1:
+            pool = self._rerank(pool, keep)
+        return pool
+
+    def _rerank(self, pool, keep):
+        """Rank pooled candidates from several blocks against each other"""
+        ranked = self._rank_block([c.text for c in pool], [c.position for c in pool])
+        return self._best(ranked, keep)
+
+    def _best(self, candidates, keep):
+        """Keep the top candidates overall plus the top ones for each focus category"""
+        by_score = []
+        seen = set()
+        for c in sorted(candidates, key=lambda c: c.score, reverse=True):
+            key = c.text.lower()
+            if key not in seen:  # repeated boilerplate should only be picked once
+                seen.add(key)
+                by_score.append(c)
+        chosen = {id(c): c for c in by_score[:keep]}
+        for attr in ('challenge_hits', 'recommendation_hits'):
+            focused = [c for c in by_score if getattr(c, attr) > 0][:keep]
+            chosen.update((id(c), c) for c in focused)
+        return list(chosen.values())
+
+    # -- modes ---------------------------------------------------------------
+
+    def summarize(self, source, count=3):
+        """The `count` most central sentences, in document order"""
+        pool = self.candidates(source, max(count * 4, 16))
+        best = sorted(pool, key=lambda c: c.score, reverse=True)[:count]
+        return [c.text for c in sorted(best, key=lambda c: c.position)]
+
+    def key_points(self, source, count=5):
+        """The `count` most central sentences, most important first"""
+        pool = self.candidates(source, max(count * 4, 16))
+        return [c.text for c in sorted(pool, key=lambda c: c.score, reverse=True)[:count]]
+
+    def focus(self, source, count=3, boost=0.5):
+        """Challenges and recommendations, ranked by centrality boosted by keyword hits"""
+        pool = self.candidates(source, max(count * 4, 16))
+
+        def pick(attr, accept):
+            scored = [
+                (c.score * (1 + boost * getattr(c, attr)), c)
+                for c in pool
+                if getattr(c, attr) > 0 and accept(c)
+            ]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            return [c for _, c in scored[:count]]
+
+        # A sentence counts as a challenge only if it leans that way; the rest can be recommendations
+        challenges = pick('challenge_hits', lambda c: c.challenge_hits >= c.recommendation_hits)
+        taken = {c.position for c in challenges}
+        recommendations = pick('recommendation_hits', lambda c: c.position not in taken)
+        return {
+            'challenges': [c.text for c in sorted(challenges, key=lambda c: c.position)],
+            'recommendations': [c.text for c in sorted(recommendations, key=lambda c: c.position)]
+        }
+
+
+_default = None
+
+
+def default_summarizer():
+    """Shared summarizer instance with default settings"""
+    global _default
+    if _default is None:
+        _default = ExtractiveSummarizer()
+    return _default
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tracing - per-request timing spans and sampled cProfile captures
+
+A request (one answered query) is opened with Tracer.request(name); inside it,
+code marks its stages with the module-level span():
+
+    with tracer.request('advice'):
+        with span('route'):
+            ...
+
+span() finds the current request through a context variable, so stages deep
+inside the assistant need no tracer passed around. Outside a traced request
+it returns a shared do-nothing context manager, and a Tracer with capturing
+off never opens a request at all, so tracing costs one attribute check and
+one context-variable lookup per stage when it is off.
+
+Captures are opt-in:
+
+    profile_every=N   profile one request in N with cProfile and keep it
+    slow_ms=T         profile every request and keep those slower than T ms
+                      (cProfile roughly doubles handler time while this is on)
+
+Each kept request is written to output_dir as two files with a common stem:
+
+    <stem>.trace.json   the spans, in Chrome trace event format (open in
+                        chrome://tracing, https://ui.perfetto.dev or speedscope)
+    <stem>.prof         the cProfile data (python -m pstats, snakeviz)
+
+Only one request is profiled at a time; a request that starts while another
+is being profiled gets spans but no .prof.
+"""
+
+import contextvars
+import cProfile
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+TRACE_DIR = 'traces'
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Time a stage of the current request; a no-op outside a traced request"""
+    trace = _current.get()
+    if trace is None:
+        return NULL_SPAN
+    return _Span(trace, name)
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans.append((self.name, self.start, time.perf_counter()))
+        return False
+
+
+class Trace:
+    """Spans (and possibly a profile) of one request"""
+
+    def __init__(self, tracer, name, sampled, profile):
+        self.tracer = tracer
+        self.name = name
+        self.sampled = sampled
+        self.profile = profile
+        self.spans = []
+        self.thread = threading.get_ident()
+        self.start = self.end = None
+        self._token = None
+
+    @property
+    def seconds(self):
+        return self.end - self.start
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+        self.end = time.perf_counter()
+        _current.reset(self._token)
+        self.tracer._finish(self)
+        return False
+
+    def chrome_trace(self):
+        """The spans as a Chrome trace event document"""
+        pid = os.getpid()
+        events = [{
+            'name': self.name, 'ph': 'X', 'pid': pid, 'tid': self.thread,
+            'ts': 0, 'dur': round(self.seconds * 1e6, 3)
+        }]
+        for name, start, end in self.spans:
+            events.append({
+                'name': name, 'ph': 'X', 'pid': pid, 'tid': self.thread,
+                'ts': round((start - self.start) * 1e6, 3), 'dur': round((end - start) * 1e6, 3)
+            })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'request': self.name, 'sampled': self.sampled, 'profiled': self.profile is not None}
+        }
+
+
+class Tracer:
+    def __init__(self, profile_every=0, slow_ms=None, output_dir=TRACE_DIR):
+        if profile_every < 0:
+            raise ValueError("profile_every cannot be negative")
+        self.profile_every = profile_every
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self.enabled = bool(profile_every) or slow_ms is not None
+        self.captured = 0
+        self._requests = itertools.count(1)
+        self._captures = itertools.count(1)
+        self._profiling = threading.Lock()
+
+    def request(self, name):
+        """Trace one request; nested inside another request it is just a span"""
+        if not self.enabled:
+            return NULL_SPAN
+        if _current.get() is not None:
+            return span(name)
+
+        sampled = bool(self.profile_every) and next(self._requests) % self.profile_every == 0
+        profile = None
+        if (sampled or self.slow_ms is not None) and self._profiling.acquire(blocking=False):
+            profile = cProfile.Profile()
+        return Trace(self, name, sampled, profile)
+
+    def _finish(self, trace):
+        if trace.profile is not None:
+            self._profiling.release()
+        slow = self.slow_ms is not None and trace.seconds * 1000 >= self.slow_ms
+        if not (trace.sampled or slow):
+            return
+        try:
+            self.write(trace)
+        except OSError as e:
+            print(f"⚠️  Could not write trace: {e}")
+
+    def write(self, trace):
+        """Write a request's spans (and profile) to output_dir; returns the file stem"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        number = next(self._captures)
+        self.captured = max(self.captured, number)
+        label = re.sub(r'[^\w.-]+', '_', trace.name)
+        stem = os.path.join(
+            self.output_dir,
+            f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{number:05d}-{label}-{trace.seconds * 1000:.0f}ms"
+        )
+        with open(stem + '.trace.json', 'w', encoding='utf-8') as f:
+            json.dump(trace.chrome_trace(), f)
+        if trace.profile is not None:
+            trace.profile.dump_stats(stem + '.prof')
+        return stem
+
+
+def add_tracing_arguments(parser):
+    """Add the --profile-every / --profile-slow / --trace-dir options to a CLI"""
+    parser.add_argument('--profile-every', type=int, default=0, metavar='N',
+                        help="profile one request in N and write it to --trace-dir (default: off)")
+    parser.add_argument('--profile-slow', type=float, metavar='MS',
+                        help="profile every request and keep those slower than MS milliseconds")
+    parser.add_argument('--trace-dir', default=TRACE_DIR, help=f"where captures are written (default: {TRACE_DIR})")
+
+
+def tracer_from_args(args):
+    """Tracer for options added by add_tracing_arguments; raises ValueError on bad values"""
+    if args.profile_slow is not None and args.profile_slow < 0:
+        raise ValueError("--profile-slow cannot be negative")
+    return Tracer(args.profile_every, args.profile_slow, args.trace_dir)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Warm Start - snapshots of compiled structures, so start-up skips rebuilding them
+
+Building the routing tables (the keyword trie and its regex, see
+intent_router) and the fuzzy matchers (see fuzzy_matcher) takes time that
+grows with the route tables. The first process to build one saves it here, and
+later processes load it instead:
+
+    warm_start/
+        <kind>-<key>.json         the structure's plain data
+        <kind>-<key>.<name>.bin   raw array('I'/...) data, read straight into an array
+        <kind>-<key>.<name>.npy   NumPy arrays, memory-mapped on load
+
+The key is a hash of the structure's sources (for example the route table),
+the code that builds it, the Python version and FORMAT_VERSION, so editing a
+route, upgrading Python or changing the building code starts a new snapshot;
+older snapshots of the same kind are removed when it is written. Files are
+written to temporary names and renamed, the .json last, so a reader never sees
+a half-written snapshot. A snapshot that cannot be read or written is simply
+rebuilt.
+
+Compiled regexes cannot be pickled (a pattern pickles as its source and is
+recompiled), so compile_regex keeps the compiled program of the regex engine
+and hands it back to it on load. Where this Python's `re` internals differ, it
+falls back to an ordinary re.compile.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import uuid
+from array import array
+
+try:
+    import _sre
+    from re import _compiler, _parser
+except ImportError:   # before Python 3.11 these modules had other names
+    _sre = None
+
+SNAPSHOT_PATH = 'warm_start'
+FORMAT_VERSION = 1
+
+
+def compile_regex(source, compiled=None):
+    """Return (pattern, compiled) for a regex source
+
+    compiled is (program, info): the regex engine's program as an array plus
+    the flags and groups it needs. Passing it back skips parsing and compiling
+    the source. It is None where this Python's regex internals are not
+    available, and then the source is compiled as usual.
+    """
+    if _sre is not None:
+        try:
+            if compiled is None:
+                parsed = _parser.parse(source, 0)
+                program = array('I', _compiler._code(parsed, 0))
+                info = {'flags': parsed.state.flags, 'groups': parsed.state.groups - 1,
+                        'groupindex': dict(parsed.state.groupdict)}
+            else:
+                program, info = compiled
+            indexgroup = [None] * (info['groups'] + 1)
+            for name, index in info['groupindex'].items():
+                indexgroup[index] = name
+            pattern = _sre.compile(source, info['flags'], program.tolist(), info['groups'],
+                                   info['groupindex'], tuple(indexgroup))
+            return pattern, (program, info)
+        except Exception:
+            pass
+    return re.compile(source), None
+
+
+class SnapshotCache:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._warned = False
+
+    def key(self, kind, sources, code_files=()):
+        """Content hash of everything a snapshot is built from"""
+        digest = hashlib.sha256()
+        header = [FORMAT_VERSION, sys.version, kind, sources]
+        digest.update(json.dumps(header, sort_keys=True, default=repr).encode('utf-8'))
+        for path in code_files:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:24]
+
+    def _stem(self, kind, key):
+        return os.path.join(self.path, f'{kind}-{key}')
+
+    def load(self, kind, key):
+        """Return (state, arrays) of a snapshot, or None if there is no usable one"""
+        stem = self._stem(kind, key)
+        try:
+            with open(stem + '.json', 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            arrays = {}
+            for name, typecode in snapshot['arrays'].items():
+                if typecode == 'npy':
+                    import numpy as np
+                    arrays[name] = np.load(f'{stem}.{name}.npy', mmap_mode='r', allow_pickle=False)
+                else:
+                    arrays[name] = array(typecode)
+                    with open(f'{stem}.{name}.bin', 'rb') as f:
+                        arrays[name].frombytes(f.read())
+            return snapshot['state'], arrays
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, kind, key, state, arrays=None):
+        """Write a snapshot and remove older ones of the same kind; failures are reported once, never raised"""
+        stem = self._stem(kind, key)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            typecodes = {}
+            for name, values in (arrays or {}).items():
+                tmp_path = f'{stem}.{name}.{uuid.uuid4().hex}.tmp'
+                if isinstance(values, array):
+                    typecodes[name] = values.typecode
+                    with open(tmp_path, 'wb') as f:
+                        values.tofile(f)
+                    os.replace(tmp_path, f'{stem}.{name}.bin')
+                else:
+                    import numpy as np
+                    typecodes[name] = 'npy'
+                    with open(tmp_path, 'wb') as f:
+                        np.save(f, values, allow_pickle=False)
+                    os.replace(tmp_path, f'{stem}.{name}.npy')
+            tmp_path = f'{stem}.{uuid.uuid4().hex}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'kind': kind, 'state': state, 'arrays': typecodes}, f, separators=(',', ':'))
+            os.replace(tmp_path, stem + '.json')
+            self._remove_stale(kind, key)
+        except (OSError, ValueError, TypeError) as e:
+            if not self._warned:
+                print(f"⚠️  Could not write warm-start snapshot to {self.path}: {e}")
+                self._warned = True
+
+    def _remove_stale(self, kind, key):
+        prefix = f'{kind}-'
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and not name.startswith(f'{prefix}{key}.') and '-' not in name[len(prefix):]:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
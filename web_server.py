@@ -0,0 +1,839 @@
+#!/usr/bin/env python3
+"""
+AI Assistant - Web Server
+A stdlib-only asyncio HTTP/1.1 server that puts the real AIAssistant handlers
+behind the web page, so ai_assistant.html no longer needs its own copy of the
+responses.
+
+Endpoints:
+    GET  /                      the chat page (ai_assistant.html)
+    GET  /api/prompts           sample prompts for every function
+    POST /api/<function>        {"text": "...", "session": "..."} -> {"function", "response", "session", "stats"}
+                                function is questions, summarize, creative or advice;
+                                "session" is optional (a new id is returned without one)
+    POST /api/<function>/stream same body; the response arrives as Server-Sent
+                                Events over chunked encoding: one "chunk" event
+                                per paragraph (?unit=token for tokens), then
+                                "done" with the session and stats, or "error"
+    POST /api/feedback          {"helpful": true|false, "comment": "...", "session": "..."} -> {"stats"}
+    GET  /api/session?id=...    the session's recent turns, oldest first
+    GET  /api/stats             usage statistics, with the last 5 and 60 minutes under "recent"
+    GET  /metrics               Prometheus text format: per-function requests, latency
+                                histograms and feedback, plus cache, session and queue gauges
+
+Connections are kept alive between requests (HTTP/1.1 default). Handler calls
+go through a Scheduler (see scheduler.py): per-function queues served by worker
+threads in weighted fair order, so a slow handler never blocks other
+connections and a burst of one function cannot starve the others. Overload is
+answered right away: 429 when a client exceeds --rate, 503 when a function's
+queue is full, 504 when a request is not answered within --request-timeout.
+
+The page and the sample prompts are gzipped and tagged with an ETag once, and
+answered 304 when a client sends that ETag back; larger API answers and
+streams are gzipped per request for clients that accept it (see payloads.py).
+
+With --processes N, N worker processes share the listening socket, each
+session is served by the worker that owns it and the statistics and metrics
+add up across workers (see prefork.py). SIGHUP restarts the workers.
+
+Usage: python web_server.py [--host 127.0.0.1] [--port 8000] [--latency fixed:0.5]
+                            [--backend http://127.0.0.1:9000/v1/batch] [--profile-every N] [--profile-slow MS] [--trace-dir traces]
+                            [--workers 8] [--weights questions=4,summarize=1] [--queue-depth 64]
+                            [--rate 5 --burst 10] [--request-timeout 30]
+                            [--session-budget 64] [--session-turns 8] [--session-dir sessions]
+                            [--processes 4]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import signal
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlencode
+
+from ai_assistant import AIAssistant
+from backends import parse_backend
+from latency import parse_latency
+from metrics import format_metric
+from payloads import (GZIP_MIN_BYTES, HTTP_COUNTERS, Payload, PayloadStats, accepts_gzip, etag_matches, gzip_bytes,
+                      gzip_stream, http_summary)
+from scheduler import DeadlineExceeded, Overloaded, Scheduler, add_averages, parse_weights
+from sessions import SessionStore
+from tracing import add_tracing_arguments, tracer_from_args
+
+HTML_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_assistant.html')
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+REQUEST_TIMEOUT = 30
+
+# Carries the client address on requests one prefork worker forwards to another
+FORWARDED_FOR = 'x-forwarded-for'
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
+def sse_event(event, data):
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body', 'client')
+
+    def __init__(self, method, path, query, version, headers, body, client=None):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.client = client
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+        """Parse the request body as a JSON object"""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return data
+
+
+class AssistantServer:
+    # Numbers of runtime_report() that are levels rather than running counts, and ones not added up across workers
+    RUNTIME_GAUGES = ('queued', 'sessions', 'bytes', 'budget', 'entries')
+    RUNTIME_LOCAL = ('weight', 'avg_wait_ms', 'avg_service_ms')
+
+    def __init__(self, assistant=None, host='127.0.0.1', port=8000, html_path=HTML_PATH, max_workers=None,
+                 scheduler=None, request_timeout=REQUEST_TIMEOUT, sock=None):
+        self.assistant = assistant or AIAssistant()
+        self.host = host
+        self.port = port
+        self.html_path = html_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='assistant')
+        self.scheduler = scheduler or Scheduler(workers=max_workers or min(32, (os.cpu_count() or 1) + 4))
+        self.request_timeout = request_timeout
+        # A listening socket to accept from instead of binding host:port (prefork workers share one)
+        self.sock = sock
+        # Session ownership across prefork workers; None in a single process
+        self.affinity = None
+        # Every prefork worker's runtime_report(), to add them up; None in a single process
+        self.shared_report = None
+        self._server = None
+        self._peer_server = None
+        self._peers = {}
+        self._html = None
+        self._page = None
+        self._prompts = (None, None)   # (catalog revision, Payload of its sample prompts)
+        self.payload_stats = PayloadStats()
+        self._http_counted = dict.fromkeys(HTTP_COUNTERS, 0)
+        self._connections = {}
+        self._busy = set()
+        self._fresh = set()    # connections that have not been answered yet
+        self._draining = False
+
+    # -- connection handling -------------------------------------------------
+
+    async def handle_connection(self, reader, writer, forwarded=False):
+        """Serve requests on one connection until it closes or goes idle
+
+        forwarded: the connection comes from another prefork worker, which
+        has already picked this one as the owner of the requests' sessions.
+        """
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        self._fresh.add(task)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {'error': e.message}, keep_alive=False)
+                    break
+                if request is None or writer.is_closing():
+                    break   # closed by shutdown() as the request came in; the client will retry it
+                peer = writer.get_extra_info('peername')
+                if forwarded:
+                    request.client = request.headers.get(FORWARDED_FOR) or None
+                else:
+                    request.client = peer[0] if peer else None
+
+                self._busy.add(task)
+                try:
+                    owner = self.affinity.owner(self.session_of(request)) if self.affinity and not forwarded else None
+                    if owner is not None:
+                        status, content_type, body = await self.forward(owner, request)
+                    else:
+                        status, content_type, body = await self.route(request)
+                except HTTPError as e:
+                    status, content_type, body = self.json_payload(e.status, {'error': e.message})
+                except Exception as e:
+                    status, content_type, body = self.json_payload(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+
+                headers = None
+                if not forwarded:   # the worker facing the client encodes and counts it
+                    status, body, headers = self.encode(request, status, body)
+                keep_alive = request.keep_alive and not self._draining
+                try:
+                    await self.send(writer, status, content_type, body, keep_alive, headers)
+                finally:
+                    self._busy.discard(task)
+                    self._fresh.discard(task)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            self._fresh.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read_request(self, reader):
+        """Read one request, or return None if the client closed the connection"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Incomplete request")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, path, version = lines[0].split(' ', 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b''
+
+        path, _, query = path.partition('?')
+        return Request(method.upper(), path, parse_qs(query), version, headers, body)
+
+    def session_of(self, request):
+        """The session a request names, if any"""
+        if request.path.rstrip('/') == '/api/session':
+            return request.query.get('id', [None])[0]
+        if request.method == 'POST' and request.path.startswith('/api/'):
+            try:
+                session_id = json.loads(request.body or b'{}').get('session')
+            except (ValueError, AttributeError):
+                return None
+            return session_id if isinstance(session_id, str) else None
+        return None
+
+    def json_payload(self, status, data):
+        return status, 'application/json; charset=utf-8', json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def encode(self, request, status, body):
+        """Answer conditional requests and gzip bodies for clients that accept it; returns (status, body, headers)
+
+        A Payload is sent as its precompressed copy, or 304 Not Modified when
+        If-None-Match names its ETag. Other bodies of GZIP_MIN_BYTES or more
+        and event streams are gzipped as they are sent.
+        """
+        stats = self.payload_stats
+        gzip_ok = accepts_gzip(request.headers.get('accept-encoding', ''))
+        if isinstance(body, Payload):
+            data, etag, encoding = body.variant(gzip_ok)
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+            if encoding:
+                headers['Content-Encoding'] = encoding
+            stats.static += 1
+            if_none_match = request.headers.get('if-none-match')
+            if if_none_match:
+                stats.conditional += 1
+                if etag_matches(if_none_match, etag):
+                    stats.not_modified += 1
+                    stats.record(len(body.body), 0)
+                    return HTTPStatus.NOT_MODIFIED, b'', headers
+            stats.record(len(body.body), len(data), encoding is not None)
+            return status, data, headers
+        if not isinstance(body, bytes):
+            if not gzip_ok:
+                return status, body, None
+            return status, gzip_stream(body, stats), {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+        if gzip_ok and len(body) >= GZIP_MIN_BYTES:
+            data = gzip_bytes(body)
+            if len(data) < len(body):
+                stats.record(len(body), len(data), True)
+                return status, data, {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+        stats.record(len(body), len(body))
+        return status, body, None
+
+    async def send(self, writer, status, content_type, body, keep_alive=True, headers=None):
+        """Write a response; bytes are sent whole, async iterables chunk by chunk"""
+        connection = f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) if headers else ''
+        if isinstance(body, bytes):
+            # A 304 has no body, and a Content-Length would describe the one it stands for
+            length = f"Content-Length: {len(body)}\r\n" if status != HTTPStatus.NOT_MODIFIED else ''
+            head = (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"{length}"
+                f"{extra}"
+                f"{connection}"
+                "\r\n"
+            )
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+            return
+
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            "Cache-Control: no-cache\r\n"
+            f"{extra}"
+            f"{connection}"
+            "\r\n"
+        )
+        writer.write(head.encode('latin-1'))
+        async for piece in body:
+            writer.write(b'%x\r\n%s\r\n' % (len(piece), piece))
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def send_json(self, writer, status, data, keep_alive=True):
+        await self.send(writer, *self.json_payload(status, data), keep_alive=keep_alive)
+
+    # -- forwarding between prefork workers ----------------------------------
+
+    async def forward(self, worker, request):
+        """Pass a request to the worker that owns its session and relay the answer
+
+        Idle connections to each worker are kept for reuse. One that turns out
+        to be closed (the worker was restarted) before any answer arrives is
+        replaced and the request sent again.
+        """
+        target = request.path + ('?' + urlencode(request.query, doseq=True) if request.query else '')
+        head = (
+            f"{request.method} {target} HTTP/1.1\r\n"
+            f"Content-Type: {request.headers.get('content-type', 'application/json')}\r\n"
+            f"Content-Length: {len(request.body)}\r\n"
+            f"X-Forwarded-For: {request.client or ''}\r\n"
+            "\r\n"
+        ).encode('latin-1') + request.body
+        idle = self._peers.setdefault(worker, [])
+        while True:
+            reused = bool(idle)
+            try:
+                if reused:
+                    reader, writer = idle.pop()
+                else:
+                    reader, writer = await asyncio.open_unix_connection(self.affinity.paths[worker],
+                                                                        limit=MAX_HEADER_BYTES)
+                writer.write(head)
+                await writer.drain()
+                response = await reader.readuntil(b'\r\n\r\n')
+                break
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                if reused:
+                    writer.close()
+                    continue
+                raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker} did not answer: {e}")
+            except OSError as e:
+                raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker} is not reachable: {e}")
+
+        lines = response.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        status = HTTPStatus(int(lines[0].split(' ', 2)[1]))
+        content_type = headers.get('content-type', 'application/octet-stream')
+        keep = headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            return status, content_type, self.relay_chunks(worker, reader, writer, keep)
+        try:
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker} closed the connection mid-answer: {e}")
+        self._release_peer(worker, reader, writer, keep)
+        return status, content_type, body
+
+    async def relay_chunks(self, worker, reader, writer, keep):
+        """Yield a chunked answer from another worker piece by piece, as it arrives"""
+        done = False
+        try:
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if not size:
+                    await reader.readuntil(b'\r\n')
+                    done = True
+                    return
+                yield (await reader.readexactly(size + 2))[:-2]
+        finally:
+            if done:
+                self._release_peer(worker, reader, writer, keep)
+            else:
+                writer.close()
+
+    def _release_peer(self, worker, reader, writer, keep):
+        if keep and not self._draining:
+            self._peers.setdefault(worker, []).append((reader, writer))
+        else:
+            writer.close()
+
+    # -- routing -------------------------------------------------------------
+
+    async def route(self, request):
+        """Map a request to a (status, content type, body) triple"""
+        path = request.path.rstrip('/') or '/'
+
+        if path in ('/', '/ai_assistant.html'):
+            self.require_method(request, 'GET')
+            page = self.page_payload()
+            return HTTPStatus.OK, page.content_type, page
+
+        if path == '/api/prompts':
+            self.require_method(request, 'GET')
+            prompts = self.prompts_payload()
+            return HTTPStatus.OK, prompts.content_type, prompts
+
+        if path == '/api/stats':
+            self.require_method(request, 'GET')
+            self.sync_http_stats()
+            stats = self.assistant.get_stats()
+            stats['http'] = http_summary(stats['http'])
+            runtime = self.runtime_stats()
+            stats['scheduler'] = runtime['scheduler']
+            stats['sessions'] = runtime['sessions']
+            stats['recent'] = {'5m': self.assistant.metrics.window(300), '60m': self.assistant.metrics.window(3600)}
+            return self.json_payload(HTTPStatus.OK, stats)
+
+        if path == '/metrics':
+            self.require_method(request, 'GET')
+            return HTTPStatus.OK, 'text/plain; version=0.0.4; charset=utf-8', self.prometheus_metrics().encode('utf-8')
+
+        if path == '/api/feedback':
+            self.require_method(request, 'POST')
+            data = request.json()
+            if not isinstance(data.get('helpful'), bool):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'helpful' must be true or false")
+            session_id = data.get('session')
+            if session_id is not None and not self.assistant.sessions.valid_id(session_id):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'session' must be 1-64 letters, digits, '-' or '_'")
+            comment = data.get('comment')
+            if comment is not None and not isinstance(comment, str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'comment' must be a string")
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.assistant.record_feedback, data['helpful'], comment, session_id
+            )
+            return self.json_payload(HTTPStatus.OK, {'stats': self.assistant.get_stats()})
+
+        if path == '/api/session':
+            self.require_method(request, 'GET')
+            session_id = request.query.get('id', [''])[0]
+            if not self.assistant.sessions.valid_id(session_id):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'id' must be 1-64 letters, digits, '-' or '_'")
+            # A spilled session is read back from disk
+            turns = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.assistant.sessions.history, session_id
+            )
+            return self.json_payload(HTTPStatus.OK, {'session': session_id, 'turns': turns})
+
+        if path.startswith('/api/') and path.endswith('/stream'):
+            function = path[len('/api/'):-len('/stream')]
+            if function not in self.assistant.handlers:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown function '{function}'")
+            self.require_method(request, 'POST')
+            data = request.json()
+            text = self.require_text(data)
+            session_id = self.require_session(data)
+            unit = request.query.get('unit', ['paragraph'])[0]
+            if unit not in ('paragraph', 'token'):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'unit' must be paragraph or token")
+            started = time.perf_counter()
+            chunks = self.assistant.stream_response(function, text, unit)
+            # The first chunk carries the computation, so it is scheduled like any other request
+            try:
+                first = await self.scheduled(function, request.client, lambda: next(chunks, None))
+            except BaseException:
+                try:
+                    chunks.close()
+                except ValueError:
+                    pass  # still running on a worker; it will be dropped
+                raise
+            return HTTPStatus.OK, 'text/event-stream; charset=utf-8', self.stream_events(
+                function, text, session_id, chunks, first, started
+            )
+
+        if path.startswith('/api/'):
+            function = path[len('/api/'):]
+            if function not in self.assistant.handlers:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown function '{function}'")
+            self.require_method(request, 'POST')
+            data = request.json()
+            text = self.require_text(data)
+            session_id = self.require_session(data)
+            response = await self.run_handler(function, text, request.client)
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.assistant.record_turn, session_id, function, text, response
+            )
+            return self.json_payload(HTTPStatus.OK, {
+                'function': function,
+                'response': response,
+                'session': session_id,
+                'stats': self.assistant.get_stats()
+            })
+
+        raise HTTPError(HTTPStatus.NOT_FOUND)
+
+    def prometheus_metrics(self):
+        """The assistant's metrics plus gauges of the cache, sessions and scheduler queues"""
+        runtime = self.runtime_stats()
+        cache = runtime['cache']
+        sessions = runtime['sessions']
+        scheduler = runtime['scheduler']
+        queues = scheduler['functions'].items()
+        self.sync_http_stats()
+        http = self.assistant.get_stats()['http']
+        return (
+            self.assistant.metrics.prometheus()
+            + format_metric('assistant_cache_lookups_total', 'counter', 'Response cache lookups, by result.',
+                            [('', {'result': 'hit'}, cache['hits']), ('', {'result': 'miss'}, cache['misses'])])
+            + format_metric('assistant_cache_bytes', 'gauge', 'Bytes of cached responses.', [('', {}, cache['bytes'])])
+            + format_metric('assistant_sessions', 'gauge', 'Sessions held in memory.', [('', {}, sessions['sessions'])])
+            + format_metric('assistant_session_bytes', 'gauge', 'Estimated bytes of sessions in memory.',
+                            [('', {}, sessions['bytes'])])
+            + format_metric('assistant_queued_requests', 'gauge', 'Requests waiting for a worker, by function.',
+                            [('', {'function': function}, stats['queued']) for function, stats in queues])
+            + format_metric('assistant_rate_limited_total', 'counter', 'Requests refused by the per-client rate limit.',
+                            [('', {}, scheduler['rate_limited'])])
+            + format_metric('assistant_http_not_modified_total', 'counter',
+                            'Requests for the page or sample prompts answered 304 Not Modified.',
+                            [('', {}, http['not_modified'])])
+            + format_metric('assistant_http_body_bytes_total', 'counter',
+                            'Response body bytes before 304s and gzip, and as sent.',
+                            [('', {'stage': 'uncompressed'}, http['bytes_uncompressed']),
+                             ('', {'stage': 'sent'}, http['bytes_sent'])])
+        )
+
+    def require_method(self, request, method):
+        if request.method != method:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {method} for {request.path}")
+
+    def require_text(self, data):
+        text = data.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'text' must be a non-empty string")
+        return text.strip()
+
+    def require_session(self, data):
+        """The request's session id, or a new one if it has none"""
+        session_id = data.get('session')
+        if session_id is None:
+            return self.affinity.new_key() if self.affinity is not None else uuid.uuid4().hex
+        if not self.assistant.sessions.valid_id(session_id):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'session' must be 1-64 letters, digits, '-' or '_'")
+        return session_id
+
+    async def scheduled(self, function, client, fn):
+        """Run fn() through the scheduler, mapping overload to HTTP errors"""
+        try:
+            job = functools.partial(contextvars.copy_context().run, fn)
+            return await self.scheduler.run_async(function, job, client, self.request_timeout)
+        except Overloaded as e:
+            status = HTTPStatus.TOO_MANY_REQUESTS if e.reason == 'rate_limited' else HTTPStatus.SERVICE_UNAVAILABLE
+            raise HTTPError(status, str(e))
+        except DeadlineExceeded as e:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, str(e))
+
+    async def run_handler(self, function, text, client=None):
+        """Answer and count a query on a scheduler worker (counting may write the stats journal)
+
+        Identical concurrent queries wait here for one scheduled computation
+        instead of each taking a queue slot and a worker.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            self.scheduler.admit(client)
+        except Overloaded as e:
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS, str(e))
+        deadline = self.scheduler.clock() + self.request_timeout
+
+        def compute():
+            job = functools.partial(contextvars.copy_context().run, self.assistant.answer, function, text)
+            return asyncio.wrap_future(self.scheduler.submit(function, job, deadline=deadline))
+
+        try:
+            response, shared = await asyncio.wait_for(
+                self.assistant.flights.do_async(self.assistant.request_key(function, text), compute),
+                self.request_timeout
+            )
+        except Overloaded as e:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        except (DeadlineExceeded, asyncio.TimeoutError):
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f"No answer within {self.request_timeout:g}s")
+        if shared:
+            await loop.run_in_executor(self.executor, self.assistant.record_query,
+                                       function, text, time.perf_counter() - started)
+        return response
+
+    async def stream_events(self, function, text, session_id, chunks, first, started):
+        """Emit a response's chunks as SSE, pulling the rest from the assistant on the thread pool"""
+        loop = asyncio.get_running_loop()
+        end = object()
+        chunk = end if first is None else first
+        parts = []
+        try:
+            while chunk is not end:
+                yield sse_event('chunk', {'text': chunk})
+                parts.append(chunk)
+                chunk = await loop.run_in_executor(self.executor, next, chunks, end)
+            await loop.run_in_executor(self.executor, self.assistant.record_query,
+                                       function, text, time.perf_counter() - started)
+            await loop.run_in_executor(self.executor, self.assistant.record_turn,
+                                       session_id, function, text, ''.join(parts))
+            yield sse_event('done', {'session': session_id, 'stats': self.assistant.get_stats()})
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+        finally:
+            try:
+                chunks.close()
+            except ValueError:
+                pass  # a chunk is still being produced on the pool; it will be dropped
+
+    def load_html(self):
+        """Read the page once and keep it in memory"""
+        if self._html is None:
+            with open(self.html_path, 'rb') as f:
+                self._html = f.read()
+        return self._html
+
+    def runtime_report(self):
+        """This process's scheduler, session and cache numbers"""
+        cache = self.assistant.cache.stats()
+        return {
+            'scheduler': self.scheduler.stats(),
+            'sessions': self.assistant.sessions.stats(),
+            'cache': {name: cache[name] for name in ('hits', 'misses', 'entries', 'bytes')},
+        }
+
+    def runtime_stats(self):
+        """runtime_report(), added up over all prefork workers when there are several"""
+        report = self.runtime_report()
+        if self.shared_report is None:
+            return report
+        report = self.shared_report.combined(report)
+        for stats in report['scheduler']['functions'].values():
+            add_averages(stats)
+        return report
+
+    def sync_http_stats(self):
+        """Fold the compression and 304 counters into the assistant's statistics (journaled, shared by workers)"""
+        self.assistant.sync_counters('http', self.payload_stats.counts(), self._http_counted)
+
+    async def sync_stats_periodically(self, interval=1.0):
+        """Fold counters kept by the server into the statistics, and publish runtime_report() to the
+        other prefork workers, every interval seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self.shared_report is not None:
+                self.shared_report.publish(self.runtime_report())
+            # Counting may write the stats journal, so not on the event loop
+            await loop.run_in_executor(self.executor, self.sync_http_stats)
+
+    def page_payload(self):
+        """The page, compressed and tagged once"""
+        if self._page is None:
+            self._page = Payload(self.load_html(), 'text/html; charset=utf-8')
+        return self._page
+
+    def prompts_payload(self):
+        """The sample prompts, compressed and tagged once per catalog revision"""
+        revision = self.assistant.catalog.snapshot()
+        cached_revision, payload = self._prompts
+        if cached_revision is not revision:
+            _, content_type, body = self.json_payload(HTTPStatus.OK, self.assistant.sample_prompts)
+            payload = Payload(body, content_type)
+            self._prompts = (revision, payload)
+        return payload
+
+    # -- lifecycle -------------------------------------------------------------
+
+    async def start(self):
+        if self.sock is not None:
+            self._server = await asyncio.start_server(self.handle_connection, sock=self.sock,
+                                                      limit=MAX_HEADER_BYTES, backlog=1024)
+        else:
+            self._server = await asyncio.start_server(
+                self.handle_connection, self.host, self.port,
+                limit=MAX_HEADER_BYTES, backlog=1024
+            )
+        if self.affinity is not None:
+            self._peer_server = await asyncio.start_unix_server(
+                functools.partial(self.handle_connection, forwarded=True), sock=self.affinity.listen(),
+                limit=MAX_HEADER_BYTES, backlog=1024
+            )
+        sockname = self._server.sockets[0].getsockname()
+        self.port = sockname[1]
+        return self._server
+
+    async def serve_forever(self, ready=None):
+        """Serve until SIGINT/SIGTERM; ready() is called once listening (default: print the address)"""
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl-C still raises KeyboardInterrupt
+        if ready is None:
+            print(f"🌐 AI Assistant running at http://{self.host}:{self.port}/")
+        else:
+            ready()
+        syncing = asyncio.create_task(self.sync_stats_periodically())
+        await stop.wait()
+        syncing.cancel()
+        await self.shutdown()
+
+    async def shutdown(self, timeout=5):
+        """Stop accepting, close idle connections and let busy ones finish
+
+        Connections that were accepted but not answered yet get their first
+        request answered (with Connection: close), since a client only retries
+        a request on a connection that has served one before.
+        """
+        self._draining = True
+        servers = [server for server in (self._server, self._peer_server) if server is not None]
+        for server in servers:
+            server.close()
+        await asyncio.sleep(0)   # let connections accepted just now register
+        for task, writer in self._connections.items():
+            if task not in self._busy and task not in self._fresh:
+                writer.close()
+        for idle in self._peers.values():
+            for _, writer in idle:
+                writer.close()
+            idle.clear()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._connections and loop.time() < deadline:
+            await asyncio.wait(list(self._connections), timeout=deadline - loop.time())
+        for server in servers:
+            await server.wait_closed()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=False)
+        self.scheduler.close(wait=False)
+        self.assistant.backend.close()
+        self.assistant.sessions.spill_all()
+        if self.shared_report is not None:
+            self.shared_report.publish(self.runtime_report())
+        self.sync_http_stats()
+        self.assistant.save_stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the AI Assistant over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', default='none',
+                        help="emulated backend latency, e.g. fixed:0.5 or lognormal:0.8,0.5 (default: none)")
+    parser.add_argument('--backend', default='canned',
+                        help="where responses come from: canned or an inference server URL (see backends.py)")
+    parser.add_argument('--workers', type=int, default=None, help="handler worker threads (default: cores + 4)")
+    parser.add_argument('--weights', default='',
+                        help="scheduling weights, e.g. questions=4,summarize=1 (default: questions=4, "
+                             "summarize=1, creative=2, advice=2)")
+    parser.add_argument('--queue-depth', type=int, default=64, help="queued requests per function before 503s")
+    parser.add_argument('--rate', type=float, default=None, help="requests per second per client (default: unlimited)")
+    parser.add_argument('--burst', type=float, default=None, help="requests a client may burst (default: 2 x rate)")
+    parser.add_argument('--request-timeout', type=float, default=REQUEST_TIMEOUT,
+                        help=f"seconds before a request is answered with 504 (default: {REQUEST_TIMEOUT})")
+    parser.add_argument('--session-budget', type=float, default=64,
+                        help="memory for multi-turn sessions in MB; idle sessions beyond it are evicted (default: 64)")
+    parser.add_argument('--session-turns', type=int, default=8, help="recent turns kept per session (default: 8)")
+    parser.add_argument('--session-dir', default=None,
+                        help="spill evicted sessions here and restore them on use (default: drop them)")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="worker processes sharing the port, each session served by one of them (default: 1)")
+    add_tracing_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        latency = parse_latency(args.latency)
+        tracer = tracer_from_args(args)
+        backend = parse_backend(args.backend)
+        workers = args.workers or min(32, (os.cpu_count() or 1) + 4)
+        scheduler = Scheduler(workers, parse_weights(args.weights), args.queue_depth, args.rate, args.burst)
+        if args.session_budget <= 0 or args.session_turns < 1:
+            raise ValueError("--session-budget must be positive and --session-turns at least 1")
+        sessions = SessionStore(args.session_turns, int(args.session_budget * 1024 * 1024), args.session_dir)
+        if args.processes < 1:
+            raise ValueError("--processes must be at least 1")
+        if args.processes > 1 and not hasattr(os, 'fork'):
+            raise ValueError("--processes needs os.fork, which this platform does not have")
+    except ValueError as e:
+        parser.error(str(e))
+
+    assistant = AIAssistant(latency=latency, tracer=tracer, backend=backend, sessions=sessions)
+    server = AssistantServer(assistant, host=args.host, port=args.port, scheduler=scheduler,
+                             request_timeout=args.request_timeout)
+    try:
+        if args.processes > 1:
+            from prefork import Supervisor
+            Supervisor(server, args.processes).run()
+        else:
+            asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n👋 Shutting down...")
+        server.close()
+
+
+if __name__ == "__main__":
+    main()